@@ -59,7 +59,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'corsheaders.middleware.CorsMiddleware'
+    'corsheaders.middleware.CorsMiddleware',
+    'forum.middleware.ReplicaPinningMiddleware',
+    'forum.middleware.PresenceMiddleware',
 ]
 
 ROOT_URLCONF = 'WSU_Forum.urls'
@@ -92,6 +94,96 @@ DATABASES = {
     }
 }
 
+# FORUM_DB_PROFILE=production tunes SQLite for concurrent writers: WAL so readers
+# never block the writer, a busy timeout instead of immediate "database is locked",
+# and BEGIN IMMEDIATE so a transaction takes the write lock up front
+FORUM_DB_PROFILE = os.environ.get('FORUM_DB_PROFILE', 'development')
+
+if FORUM_DB_PROFILE == 'production':
+    DATABASES['default']['OPTIONS'] = {
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA mmap_size=134217728;'
+            'PRAGMA cache_size=-20000;'
+            'PRAGMA temp_store=MEMORY;'
+        ),
+        'transaction_mode': 'IMMEDIATE',
+        # The busy timeout (seconds); a busy_timeout PRAGMA above would override it
+        'timeout': 20,
+    }
+
+# Read replicas: FORUM_DB_REPLICAS is a comma-separated list of SQLite files kept in
+# sync with the primary by `manage.py sync_replicas`. Safe requests read from a replica;
+# a user's reads stay on the primary for FORUM_READ_YOUR_WRITES_SECONDS after they write
+FORUM_REPLICAS = []
+
+for index, path in enumerate(filter(None, os.environ.get('FORUM_DB_REPLICAS', '').split(','))):
+    alias = f'replica_{index + 1}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path.strip(),
+        'OPTIONS': {'timeout': 20},
+        'TEST': {'MIRROR': 'default'},
+    }
+    FORUM_REPLICAS.append(alias)
+
+if FORUM_REPLICAS:
+    DATABASE_ROUTERS = ['forum.routers.ReplicaRouter']
+
+FORUM_READ_YOUR_WRITES_SECONDS = 5
+
+# Send like/save toggles through a single writer thread that batches them into shared transactions
+FORUM_WRITE_QUEUE = os.environ.get('FORUM_WRITE_QUEUE') == '1'
+FORUM_WRITE_QUEUE_BATCH = 100
+
+
+# Cache
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) when running
+# more than one process.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'wsu-forum'),
+    }
+}
+
+FORUM_CACHE_ALIAS = 'default'
+
+# Subforum counters: buffer F() deltas in memory and flush them in batches
+FORUM_COUNTER_BUFFER = os.environ.get('FORUM_COUNTER_BUFFER') == '1'
+FORUM_COUNTER_FLUSH_INTERVAL = 5
+FORUM_COUNTER_FLUSH_SIZE = 100
+
+# Run background jobs (presence heartbeats, ...) inline instead of on the worker thread
+FORUM_BACKGROUND_SYNC = os.environ.get('FORUM_BACKGROUND_SYNC') == '1'
+
+# Posts older than this many days (and all posts of archived subforums) move to the archive tables
+FORUM_ARCHIVE_AFTER_DAYS = int(os.environ.get('FORUM_ARCHIVE_AFTER_DAYS', 365))
+
+# Home feed and the first FORUM_SNAPSHOT_PAGES pages of each subforum are kept rendered
+# and precompressed (gzip, brotli if installed) for FORUM_SNAPSHOT_TIMEOUT seconds
+FORUM_SNAPSHOT_PAGES = 3
+FORUM_SNAPSHOT_TIMEOUT = 300
+
+# Delta sync (GET /sync): change log rows kept for this long (prune_changelog), changes per response
+FORUM_SYNC_RETENTION_HOURS = 72
+FORUM_SYNC_MAX_CHANGES = 500
+
+# sort=hot feeds: decay_hot_scores rescores posts created within this many days
+FORUM_HOT_WINDOW_DAYS = 14
+
+# Near-duplicate detection for new posts and comments (MinHash/LSH over the last WINDOW_DAYS):
+# ACTION 'reject' refuses them with 409, 'flag' only logs them
+FORUM_DUPLICATES = {
+    'ACTION': os.environ.get('FORUM_DUPLICATE_ACTION', 'flag'),
+    'THRESHOLD': 0.8,
+    'WINDOW_DAYS': 7,
+    'MAX_ENTRIES': 50000,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -142,6 +234,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated'
     ],
+    # Same output as DRF's JSONRenderer, encoded with orjson (see requirements.txt)
+    'DEFAULT_RENDERER_CLASSES': [
+        'forum.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.FormParser',
@@ -149,6 +246,21 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Token-bucket throttling for expensive and write endpoints (forum.throttling)
+# A request takes COSTS[view.throttle_scope] tokens from both the user and IP buckets
+FORUM_THROTTLE = {
+    'USER_CAPACITY': 60,
+    'USER_REFILL_PER_SECOND': 1.0,
+    'IP_CAPACITY': 120,
+    'IP_REFILL_PER_SECOND': 2.0,
+    'COSTS': {
+        'search': 5,
+        'register': 10,
+        'comment': 2,
+        'like': 1,
+    },
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
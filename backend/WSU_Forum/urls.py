@@ -24,10 +24,11 @@ from rest_framework_simplejwt.views import (
 )
 
 urlpatterns = [
+    # Forum routes come first so its admin/... API paths are not swallowed by the admin site
+    path('', include('forum.urls')),
     path('admin/', admin.site.urls),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('', include('forum.urls'))
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,8 +1,9 @@
 from django.contrib import admin
-from django.utils import timezone
+from .services.moderation import ModerationQueueService
 from .models import (
-    Subforum, SubforumTag, SubforumModerator, SubforumReport,
-    SubforumSubscription, SubforumStat, Post, Comments, Likes, SavePost
+    Subforum, SubforumTag, SubforumModerator, SubforumReport, ModerationQueueItem,
+    SubforumSubscription, SubforumStat, SubforumActivityBucket, AccountDeletionJob,
+    ArchivedPost, Post, Comments, Likes, SavePost
 )
 
 #register models here
@@ -15,13 +16,11 @@ class SubforumAdmin(admin.ModelAdmin):
     actions = ['approve_selected', 'reject_selected']
     
     def approve_selected(self, request, queryset):
-        queryset.update(status='approved')
-        self.message_user(request, f"{queryset.count()} subforums approved.")
+        self.message_user(request, f"{set_status(queryset, 'approved')} subforums approved.")
     approve_selected.short_description = "Approve selected subforums"
     
     def reject_selected(self, request, queryset):
-        queryset.update(status='rejected')
-        self.message_user(request, f"{queryset.count()} subforums rejected.")
+        self.message_user(request, f"{set_status(queryset, 'rejected')} subforums rejected.")
     reject_selected.short_description = "Reject selected subforums"
 
 @admin.register(SubforumTag)
@@ -41,15 +40,33 @@ class SubforumReportAdmin(admin.ModelAdmin):
     actions = ['mark_as_resolved', 'mark_as_dismissed']
     
     def mark_as_resolved(self, request, queryset):
-        queryset.update(status='resolved', reviewed_by=request.user, reviewed_at=timezone.now())
-        self.message_user(request, f"{queryset.count()} reports marked as resolved.")
+        updated = ModerationQueueService(request.user).close_reports(list(queryset.values_list('id', flat=True)), 'resolve')
+        self.message_user(request, f"{updated} reports marked as resolved.")
     mark_as_resolved.short_description = "Mark selected reports as resolved"
     
     def mark_as_dismissed(self, request, queryset):
-        queryset.update(status='dismissed', reviewed_by=request.user, reviewed_at=timezone.now())
-        self.message_user(request, f"{queryset.count()} reports marked as dismissed.")
+        updated = ModerationQueueService(request.user).close_reports(list(queryset.values_list('id', flat=True)), 'dismiss')
+        self.message_user(request, f"{updated} reports marked as dismissed.")
     mark_as_dismissed.short_description = "Mark selected reports as dismissed"
 
+@admin.register(ModerationQueueItem)
+class ModerationQueueItemAdmin(admin.ModelAdmin):
+    list_display = ['subforum', 'status', 'report_count', 'priority', 'last_reported_at']
+    list_filter = ['status']
+    ordering = ['-priority', '-id']
+    readonly_fields = ['report_count', 'priority', 'first_reported_at', 'last_reported_at', 'reviewed_by', 'reviewed_at']
+    actions = ['resolve_selected', 'dismiss_selected']
+
+    def resolve_selected(self, request, queryset):
+        closed = ModerationQueueService(request.user).bulk(list(queryset.values_list('id', flat=True)), 'resolve')
+        self.message_user(request, f"{closed} queue items resolved.")
+    resolve_selected.short_description = "Resolve selected items and their reports"
+
+    def dismiss_selected(self, request, queryset):
+        closed = ModerationQueueService(request.user).bulk(list(queryset.values_list('id', flat=True)), 'dismiss')
+        self.message_user(request, f"{closed} queue items dismissed.")
+    dismiss_selected.short_description = "Dismiss selected items and their reports"
+
 @admin.register(SubforumSubscription)
 class SubforumSubscriptionAdmin(admin.ModelAdmin):
     list_display = ['user', 'subforum', 'created_at']
@@ -58,4 +75,39 @@ class SubforumSubscriptionAdmin(admin.ModelAdmin):
 @admin.register(SubforumStat)
 class SubforumStatAdmin(admin.ModelAdmin):
     list_display = ['subforum', 'posts_today', 'active_users_this_week', 'updated_at']
-    readonly_fields = ['updated_at']
\ No newline at end of file
+    readonly_fields = ['updated_at']
+
+@admin.register(SubforumActivityBucket)
+class SubforumActivityBucketAdmin(admin.ModelAdmin):
+    list_display = ['subforum', 'granularity', 'bucket_start', 'posts', 'comments', 'new_subscribers']
+    list_filter = ['granularity']
+    date_hierarchy = 'bucket_start'
+
+@admin.register(AccountDeletionJob)
+class AccountDeletionJobAdmin(admin.ModelAdmin):
+    list_display = ['user_id', 'username', 'status', 'step', 'deleted_rows', 'updated_at']
+    list_filter = ['status']
+    readonly_fields = ['created_at', 'updated_at']
+
+@admin.register(ArchivedPost)
+class ArchivedPostAdmin(admin.ModelAdmin):
+    list_display = ['id', 'title', 'subforum', 'user', 'created_at', 'archived_at']
+    search_fields = ['title']
+
+    #The archive is only written by the archive_posts command
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+def set_status(queryset, status):
+    #Saved one by one so the post_save signals update tag facets, search terms, the
+    #approved-subforum and search caches and feed snapshots; a queryset.update() would skip them
+    changed = 0
+    for subforum in queryset.exclude(status=status):
+        subforum.status = status
+        subforum.save(update_fields=['status', 'updated_at'])
+        changed += 1
+    return changed
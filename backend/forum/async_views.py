@@ -0,0 +1,152 @@
+import asyncio
+import json
+import math
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from .models import Post, Subforum, Comments
+from .services.projection import PostProjection, collect, post_rows, timestamp
+from .services.service import SearchService
+from .throttling import TokenBucketThrottle
+
+## Native async versions of the hot read endpoints, for ASGI deployments ##
+# Same payloads as the DRF views in views.py, built on the async ORM so a request
+# never hops between the event loop and a worker thread; the one exception is the
+# throttle, whose token bucket shares its blocking cache lock with the DRF views
+
+
+#Base view: JWT authentication and token-bucket throttling without DRF
+class AsyncAPIView(View):
+    throttle_scope = None
+    jwt = JWTAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        #Token-authenticated API, so no CSRF (DRF's APIView does the same)
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await self.authenticate(request)
+        if not request.user.is_authenticated:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        throttle = TokenBucketThrottle()
+        #allow_request may sleep waiting for the bucket lock, so it runs in a worker thread
+        if self.throttle_scope and not await sync_to_async(throttle.allow_request, thread_sensitive=False)(request, self):
+            wait = math.ceil(throttle.wait() or 0)
+            response = JsonResponse({'detail': f'Request was throttled. Expected available in {wait} seconds.'}, status=429)
+            response['Retry-After'] = str(wait)
+            return response
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def authenticate(self, request):
+        header = self.jwt.get_header(request)
+        raw_token = self.jwt.get_raw_token(header) if header else None
+        if raw_token is None:
+            return AnonymousUser()
+        try:
+            user_id = self.jwt.get_validated_token(raw_token)[api_settings.USER_ID_CLAIM]
+        except (InvalidToken, TokenError, KeyError):
+            return AnonymousUser()
+        user = await User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}, is_active=True).afirst()
+        return user or AnonymousUser()
+
+
+#Homepage feed: every post that is not in a subforum
+class AsyncAllPostsViews(AsyncAPIView):
+    async def get(self, request):
+        rows = await collect(post_rows(Post.objects.filter(subforum__isnull=True)))
+        projection = await PostProjection(rows, request.user, request).aload()
+        return JsonResponse(projection.posts(), safe=False)
+
+#Single post with its comments
+class AsyncSinglePostViews(AsyncAPIView):
+    async def get(self, request, post_id):
+        row, comments = await asyncio.gather(
+            post_rows(Post.objects.filter(id=post_id)).afirst(),
+            collect(Comments.objects.filter(post_id=post_id).order_by('-created_at').values(
+                'id', 'user_id', 'user__first_name', 'user__last_name', 'user__username', 'body', 'created_at', 'updated_at'
+            )),
+        )
+        if row is None:
+            return JsonResponse({'detail': 'No Post matches the given query.'}, status=404)
+        projection = await PostProjection([row], request.user, request, author_ids=[comment['user_id'] for comment in comments]).aload()
+        data = projection.post(row)
+        data['comments'] = [
+            {
+                'id': comment['id'],
+                'author': projection.author(comment['user_id'], comment['user__first_name'], comment['user__last_name'], comment['user__username']),
+                'body': comment['body'],
+                'created_at': timestamp(comment['created_at']),
+                'updated_at': timestamp(comment['updated_at']),
+            }
+            for comment in comments
+        ]
+        return JsonResponse(data)
+
+#Posts in a subforum, paginated like SubforumPostsViews
+class AsyncSubforumPostsViews(AsyncAPIView):
+    async def get(self, request, subforum_id):
+        per_page = positive_int(request.GET.get('per_page'), 20)
+        page = positive_int(request.GET.get('page'), 1)
+        posts = post_rows(Post.objects.filter(subforum_id=subforum_id).order_by('-created_at'))
+        #The subforum check, the total and the requested page do not depend on each other
+        exists, total, rows = await asyncio.gather(
+            Subforum.objects.filter(id=subforum_id, status='approved').aexists(),
+            posts.acount(),
+            collect(posts[(page - 1) * per_page:page * per_page]),
+        )
+        if not exists:
+            return JsonResponse({'error': 'Subforum not found'}, status=404)
+        total_pages = max(1, math.ceil(total / per_page))
+        if page > total_pages:
+            #Past the end: serve the last page, as Paginator does
+            page = total_pages
+            rows = await collect(posts[(page - 1) * per_page:page * per_page])
+        projection = await PostProjection(rows, request.user, request, subforum_ids=[subforum_id]).aload()
+        return JsonResponse({
+            'subforum': projection.subforum(subforum_id),
+            'posts': projection.posts(),
+            'page': page,
+            'total_pages': total_pages,
+            'total_posts': total,
+        })
+
+#Search bar
+class AsyncSearchViews(AsyncAPIView):
+    throttle_scope = 'search'
+
+    async def post(self, request):
+        data = request_data(request)
+        text = data.get('searchText')
+        if not isinstance(text, str) or not text.strip() or len(text) > 100:
+            return JsonResponse({"message": "error"})
+        search = await SearchService(data).asearch()
+        subforum_ids = [subforum.id for subforum in search["Subforums"]]
+        projection = await PostProjection(search["Posts"], request.user, request, subforum_ids=subforum_ids).aload()
+        return JsonResponse({
+            "People": [{"id": user.id, "username": user.username} for user in search["People"]],
+            "Posts": projection.posts(),
+            "Subforums": [projection.subforum(subforum_id) for subforum_id in subforum_ids],
+        })
+
+
+def positive_int(value, default):
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST
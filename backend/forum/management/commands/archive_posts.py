@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from forum.services.archive import ArchiveService
+
+
+class Command(BaseCommand):
+    help = "Move old posts and posts of archived subforums into the archive tables (run periodically)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help="Archive posts older than this (default FORUM_ARCHIVE_AFTER_DAYS)")
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        moved = ArchiveService(options['days'], chunk_size=options['chunk_size']).run()
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} posts"))
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from forum.models import Post
+
+
+class Command(BaseCommand):
+    help = "Compare feed throughput: DRF view under WSGI, DRF view under ASGI, async view under ASGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=20, help="Feed size to seed")
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(f"bench-asgi-{time.time_ns()}")
+        Post.objects.bulk_create([Post(user=user, title="benchmark", body="benchmark") for _ in range(options['posts'])])
+        headers = {'Authorization': f"Bearer {RefreshToken.for_user(user).access_token}"}
+        total, concurrency = options['requests'], options['concurrency']
+        try:
+            #The test clients drive the real WSGI and ASGI handlers in process
+            with override_settings(ALLOWED_HOSTS=['*'], FORUM_BACKGROUND_SYNC=True, FORUM_THROTTLE={'IP_CAPACITY': 10 ** 9, 'USER_CAPACITY': 10 ** 9}):
+                self.__report("WSGI  /posts (DRF)", self.__wsgi('/posts', headers, total, concurrency), total)
+                self.__report("ASGI  /posts (DRF)", asyncio.run(self.__asgi('/posts', headers, total, concurrency)), total)
+                self.__report("ASGI  /async/posts", asyncio.run(self.__asgi('/async/posts', headers, total, concurrency)), total)
+        finally:
+            User.objects.filter(id=user.id).delete()
+
+    def __wsgi(self, path, headers, total, concurrency):
+        def fetch(_):
+            return Client().get(path, headers=headers).status_code
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            statuses = list(pool.map(fetch, range(total)))
+        return time.perf_counter() - started, statuses
+
+    async def __asgi(self, path, headers, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch():
+            async with semaphore:
+                return (await client.get(path, headers=headers)).status_code
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*[fetch() for _ in range(total)])
+        return time.perf_counter() - started, statuses
+
+    def __report(self, label, result, total):
+        elapsed, statuses = result
+        failed = sum(1 for code in statuses if code != 200)
+        line = f"{label}: {total / elapsed:.0f} req/s ({elapsed:.2f}s for {total})"
+        if failed:
+            line += f", {failed} non-200"
+        self.stdout.write(line)
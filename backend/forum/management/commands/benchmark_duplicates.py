@@ -0,0 +1,65 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from forum.services.duplicates import DuplicateIndex, shingles
+
+
+class Command(BaseCommand):
+    help = "Recall, precision and query latency of the near-duplicate index on a synthetic spam corpus"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--docs', type=int, default=5000, help="Distinct texts in the index")
+        parser.add_argument('--queries', type=int, default=1000, help="Edited copies of indexed texts to look up")
+        parser.add_argument('--words', type=int, default=60, help="Words per text")
+        parser.add_argument('--threshold', type=float, default=0.8)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(3, 9))) for _ in range(20000)]
+        docs = [[rng.choice(vocabulary) for _ in range(options['words'])] for _ in range(options['docs'])]
+        index = DuplicateIndex(threshold=options['threshold'], window_days=36500, max_entries=len(docs), from_db=False)
+
+        started = time.perf_counter()
+        for number, words in enumerate(docs):
+            index.add(('post', number), ' '.join(words))
+        self.stdout.write(f"Indexed {len(docs)} texts in {time.perf_counter() - started:.2f}s")
+
+        #Each query is an indexed text with 0-30% of its words replaced, so its true
+        #similarity to the source spans both sides of the threshold
+        true_positive = false_positive = false_negative = 0
+        timings = []
+        for _ in range(options['queries']):
+            source = rng.randrange(len(docs))
+            words = list(docs[source])
+            for position in rng.sample(range(len(words)), rng.randint(0, len(words) * 3 // 10)):
+                words[position] = rng.choice(vocabulary)
+            text = ' '.join(words)
+            begin = time.perf_counter()
+            found = {pk for (_, pk), _ in index.query(text)}
+            timings.append(time.perf_counter() - begin)
+
+            #Ground truth is the exact shingle Jaccard similarity; random texts from a
+            #20k-word vocabulary do not overlap, so only the source can truly match
+            expected = {source} if jaccard(text, ' '.join(docs[source])) >= options['threshold'] else set()
+            for pk in found:
+                if pk in expected or jaccard(text, ' '.join(docs[pk])) >= options['threshold']:
+                    true_positive += 1
+                else:
+                    false_positive += 1
+            false_negative += len(expected - found)
+
+        recall = true_positive / max(1, true_positive + false_negative)
+        precision = true_positive / max(1, true_positive + false_positive)
+        timings.sort()
+        self.stdout.write(f"Recall {recall:.3f}, precision {precision:.3f} (tp {true_positive}, fp {false_positive}, fn {false_negative})")
+        self.stdout.write(
+            f"Query latency: mean {statistics.mean(timings) * 1000:.3f}ms, "
+            f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.3f}ms"
+        )
+
+
+def jaccard(first, second):
+    first, second = shingles(first), shingles(second)
+    return len(first & second) / len(first | second)
@@ -0,0 +1,56 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from forum.models import Post, Subforum, Likes, Comments
+from forum.renderers import FastJSONRenderer, orjson
+from forum.serializers import PostSerializer
+from forum.services.projection import PostProjection, post_rows
+
+
+class Command(BaseCommand):
+    help = "Rows per second for a post list: PostSerializer + JSONRenderer vs projection + FastJSONRenderer"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        stamp = time.time_ns()
+        user = User.objects.create_user(f"bench-serializer-{stamp}")
+        subforum = Subforum.objects.create(name=f"bench-serializer-{stamp}", description="benchmark", creator=user, status='approved')
+        try:
+            posts = Post.objects.bulk_create([
+                Post(user=user, subforum=subforum if n % 2 else None, title=f"benchmark {n}", body="benchmark")
+                for n in range(options['rows'])
+            ])
+            Likes.objects.bulk_create([Likes(user=user, post=post) for post in posts[::3]])
+            Comments.objects.bulk_create([Comments(user=user, post=post, body="benchmark") for post in posts[::4]])
+            queryset = Post.objects.filter(user=user).order_by('id')
+            request = Request(APIRequestFactory().get('/posts'))
+            request.user = user
+
+            with override_settings(ALLOWED_HOSTS=['*']):
+                def before():
+                    return JSONRenderer().render(PostSerializer(queryset, many=True, context={'request': request}).data)
+
+                def after():
+                    return FastJSONRenderer().render(PostProjection(post_rows(queryset), user, request).load().posts())
+
+                expected, actual = before(), after()
+                if expected != actual:
+                    raise CommandError("Projection output differs from PostSerializer output")
+                self.stdout.write(f"Output identical ({len(actual)} bytes), orjson {'on' if orjson else 'off'}")
+                for label, render in (("PostSerializer + JSONRenderer", before), ("Projection + FastJSONRenderer", after)):
+                    elapsed = min(self.__time(render) for _ in range(options['repeat']))
+                    self.stdout.write(f"{label}: {options['rows'] / elapsed:.0f} rows/s ({elapsed * 1000:.0f}ms)")
+        finally:
+            User.objects.filter(id=user.id).delete()
+
+    def __time(self, render):
+        started = time.perf_counter()
+        render()
+        return time.perf_counter() - started
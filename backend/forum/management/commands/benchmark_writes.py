@@ -0,0 +1,82 @@
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test.utils import override_settings
+from forum.models import Post
+from forum.services.service import LikeService, SaveService
+
+
+class Command(BaseCommand):
+    help = "Hammer like/save toggles from concurrent threads and report throughput, latency and lock errors"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--ops', type=int, default=200, help="Toggles per thread")
+        parser.add_argument('--posts', type=int, default=10)
+        parser.add_argument('--queue', action='store_true', help="Route toggles through the single-writer queue")
+
+    def handle(self, *args, **options):
+        journal = 'n/a'
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode")
+                journal = cursor.fetchone()[0]
+        self.stdout.write(
+            f"profile={settings.FORUM_DB_PROFILE} journal_mode={journal} "
+            f"transaction_mode={connection.settings_dict.get('OPTIONS', {}).get('transaction_mode', 'DEFERRED')} "
+            f"queue={options['queue']}"
+        )
+
+        users = [User.objects.create_user(f"bench-writer-{i}-{time.time_ns()}") for i in range(options['threads'])]
+        posts = [Post.objects.create(user=users[0], title="benchmark", body="benchmark") for _ in range(options['posts'])]
+        latencies = []
+        errors = {}
+        lock = threading.Lock()
+
+        def worker(user):
+            mine, failed = [], {}
+            try:
+                for n in range(options['ops']):
+                    post = posts[n % len(posts)]
+                    service = LikeService(user, post.id).like_post if n % 2 else SaveService(user, post.id).save
+                    started = time.perf_counter()
+                    try:
+                        service()
+                        mine.append(time.perf_counter() - started)
+                    except Exception as error:
+                        name = type(error).__name__ + ": " + str(error)
+                        failed[name] = failed.get(name, 0) + 1
+            finally:
+                close_old_connections()
+            with lock:
+                latencies.extend(mine)
+                for name, count in failed.items():
+                    errors[name] = errors.get(name, 0) + count
+
+        with override_settings(FORUM_WRITE_QUEUE=options['queue'], FORUM_BACKGROUND_SYNC=False):
+            threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+        User.objects.filter(id__in=[user.id for user in users]).delete()
+
+        latencies.sort()
+        done = len(latencies)
+        self.stdout.write(f"{done} toggles in {elapsed:.2f}s ({done / elapsed:.0f}/s)")
+        if latencies:
+            self.stdout.write(
+                f"latency p50={latencies[done // 2] * 1000:.1f}ms "
+                f"p95={latencies[int(done * 0.95)] * 1000:.1f}ms "
+                f"max={latencies[-1] * 1000:.1f}ms"
+            )
+        for name, count in errors.items():
+            self.stdout.write(self.style.ERROR(f"{count} x {name}"))
+        if not errors:
+            self.stdout.write(self.style.SUCCESS("No errors"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from forum.services.cache import ALL_CACHES
+from forum.throttling import rejection_counts
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters for the reference data caches and throttle rejections"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--invalidate', action='store_true', help="Invalidate every namespace")
+
+    def handle(self, *args, **options):
+        for reference_cache in ALL_CACHES:
+            if options['invalidate']:
+                reference_cache.invalidate()
+            stats = reference_cache.stats()
+            self.stdout.write(
+                f"{stats['namespace']}: version={stats['version']} hits={stats['hits']} misses={stats['misses']}"
+            )
+        scopes = list(settings.FORUM_THROTTLE.get('COSTS', {})) + ['default']
+        for scope, rejected in rejection_counts(scopes).items():
+            self.stdout.write(f"throttle {scope}: rejected={rejected}")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from forum.services import activity
+
+
+class Command(BaseCommand):
+    help = "Roll old hourly subforum activity buckets into daily buckets (run daily)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=activity.HOURLY_RETENTION_DAYS)
+        parser.add_argument('--rebuild', action='store_true', help="Regenerate all buckets from post/comment/subscription history first")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            compacted = activity.rebuild()
+        else:
+            compacted = activity.compact(older_than_days=options['older_than_days'])
+        self.stdout.write(self.style.SUCCESS(f"Compacted {compacted} hourly buckets"))
@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+from forum.services.recommendations import rebuild, TOP_K
+
+
+class Command(BaseCommand):
+    help = "Recompute co-subscription neighbours for every approved subforum (run nightly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=TOP_K, help="Neighbours kept per subforum")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        subforums = rebuild(k=options['k'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Ranked neighbours for {subforums} subforums in {time.perf_counter() - started:.2f}s"
+        ))
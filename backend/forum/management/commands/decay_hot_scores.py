@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from forum.services import ranking
+
+
+class Command(BaseCommand):
+    help = "Rescore recent posts for the hot sort as they age (run every few minutes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-days', type=int, default=None, help="Only rescore posts this recent (default FORUM_HOT_WINDOW_DAYS)")
+        parser.add_argument('--recount', action='store_true', help="First recompute like and comment counts from the source tables")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['recount']:
+            self.stdout.write(f"Recounted likes and comments on {ranking.recount()} posts")
+        rescored = ranking.decay(options['window_days'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {rescored} posts in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from forum.services.export import ExportService, DATASETS, FORMATS
+
+
+class Command(BaseCommand):
+    help = "Stream posts, comments, likes, subforums or reports as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson')
+        parser.add_argument('--start', help="Only rows created on/after this date or datetime")
+        parser.add_argument('--end', help="Only rows created on/before this date or datetime")
+        parser.add_argument('--subforum', type=int, help="Only rows belonging to this subforum id")
+        parser.add_argument('--output', help="Write to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        try:
+            export = ExportService(
+                options['dataset'],
+                fmt=options['format'],
+                start=options['start'],
+                end=options['end'],
+                subforum_id=options['subforum'],
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+        if not options['output']:
+            for chunk in export.stream():
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', newline='') as out:
+            for chunk in export.stream():
+                out.write(chunk)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from forum.services.importer import LegacyImporter, rebuild_derived_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load a legacy forum dump (NDJSON records typed user/subforum/post/comment/like/follow). "
+        "Rerunning with the same --name resumes after the last committed chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="NDJSON file, read line by line")
+        parser.add_argument('--name', help="Import run name used for resuming (defaults to the path)")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Records per transaction")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per bulk_create INSERT")
+        parser.add_argument('--skip-rebuild', action='store_true', help="Leave counters and indexes for a later run")
+
+    def handle(self, *args, **options):
+        importer = LegacyImporter(
+            options['name'] or options['path'],
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        with open(options['path'], encoding='utf-8') as lines:
+            stats = importer.run(lines)
+        self.stdout.write(", ".join(f"{kind}={count}" for kind, count in stats.items()))
+        if not options['skip_rebuild']:
+            rebuild_derived_data(log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS("Import complete"))
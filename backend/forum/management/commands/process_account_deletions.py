@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from forum.services.deletion import run_pending
+
+
+class Command(BaseCommand):
+    help = "Run account deletion jobs that are pending or failed (e.g. after a restart)"
+
+    def handle(self, *args, **options):
+        processed = run_pending()
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} account deletion jobs"))
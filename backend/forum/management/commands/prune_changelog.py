@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from forum.services.sync import prune
+
+
+class Command(BaseCommand):
+    help = "Delete delta-sync change log rows older than FORUM_SYNC_RETENTION_HOURS"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=None)
+
+    def handle(self, *args, **options):
+        deleted = prune(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} change log rows"))
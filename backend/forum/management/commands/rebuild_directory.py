@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from forum.services.directory import rebuild_directory
+
+
+class Command(BaseCommand):
+    help = "Recompute subforum tag facet counts and the subforum search index"
+
+    def handle(self, *args, **options):
+        rebuild_directory()
+        self.stdout.write(self.style.SUCCESS("Subforum directory rebuilt"))
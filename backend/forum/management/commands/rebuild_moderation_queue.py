@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from forum.services.moderation import ModerationQueueService
+
+
+class Command(BaseCommand):
+    help = "Regroup pending subforum reports into moderation queue items"
+
+    def handle(self, *args, **options):
+        items = ModerationQueueService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Moderation queue rebuilt: {items} pending items"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from forum.services.counters import CounterService
+
+
+class Command(BaseCommand):
+    help = "Recompute Subforum.post_count and subscriber_count from the source tables (run periodically)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        fixed = CounterService.reconcile(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Reconciled counters, {fixed} subforums corrected"))
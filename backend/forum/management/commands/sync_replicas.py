@@ -0,0 +1,39 @@
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database onto every replica in FORUM_REPLICAS (online backup)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help="Keep syncing every N seconds")
+        parser.add_argument('--pages', type=int, default=1024, help="Pages copied per backup step")
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        replicas = getattr(settings, 'FORUM_REPLICAS', [])
+        if not replicas:
+            raise CommandError("No replicas configured (set FORUM_DB_REPLICAS)")
+        for alias in ['default'] + replicas:
+            if settings.DATABASES[alias]['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(f"{alias} is not a SQLite database")
+        while True:
+            for alias in replicas:
+                started = time.perf_counter()
+                self.__copy(str(primary['NAME']), str(settings.DATABASES[alias]['NAME']), options['pages'])
+                self.stdout.write(f"Synced {alias} in {(time.perf_counter() - started) * 1000:.0f}ms")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def __copy(self, source_path, target_path, pages):
+        #The backup API copies a consistent snapshot while the primary stays writable
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path, timeout=20)
+        try:
+            source.backup(target, pages=pages)
+        finally:
+            target.close()
+            source.close()
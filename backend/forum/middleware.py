@@ -0,0 +1,124 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from . import routers
+from .services.presence import presence
+
+#Records a presence heartbeat for every authenticated API request
+#DRF authenticates inside the view and copies the user onto the Django request,
+#so the user is only known after the response has been produced
+class PresenceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall(request)
+        response = self.get_response(request)
+        self.__heartbeat(request, getattr(request, 'user', None))
+        return response
+
+    async def __acall(self, request):
+        response = await self.get_response(request)
+        #Never resolve the lazy session user here: that is a sync query on the event loop
+        user = resolved_user(request)
+        if getattr(settings, 'FORUM_BACKGROUND_SYNC', False):
+            #The heartbeat job runs inline and writes to the database
+            await sync_to_async(self.__heartbeat)(request, user)
+        else:
+            self.__heartbeat(request, user)
+        return response
+
+    def __heartbeat(self, request, user):
+        if user is not None and user.is_authenticated:
+            match = request.resolver_match
+            subforum_id = match.kwargs.get('subforum_id') if match else None
+            presence.heartbeat(user.id, subforum_id)
+
+#Sets up replica routing for the request (see forum.routers)
+#Safe requests read from replicas unless the user made an unsafe (POST/PUT/PATCH/DELETE)
+#request that wrote within the read-your-writes window; the user is taken from the JWT
+#here because DRF has not authenticated yet
+class ReplicaPinningMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.__jwt = JWTAuthentication()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall(request)
+        if not getattr(settings, 'FORUM_REPLICAS', []):
+            return self.get_response(request)
+        user_id, token = self.__begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end_request(token)
+        self.__finish(request, user_id, wrote, getattr(request, 'user', None))
+        return response
+
+    async def __acall(self, request):
+        if not getattr(settings, 'FORUM_REPLICAS', []):
+            return await self.get_response(request)
+        user_id, token = self.__begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = routers.end_request(token)
+        self.__finish(request, user_id, wrote, resolved_user(request))
+        return response
+
+    def __begin(self, request):
+        user_id = self.__user_id(request)
+        pinned = request.method not in SAFE_METHODS or (
+            user_id is not None and self.__cache().get(self.__pin_key(user_id)) is not None
+        )
+        return user_id, routers.begin_request(pinned)
+
+    def __finish(self, request, user_id, wrote, user):
+        #Incidental writes on safe requests (stats rows, counters) are not the user's writes
+        #and would otherwise pin nearly every reader to the primary
+        if not wrote or request.method in SAFE_METHODS:
+            return
+        user_id = user.id if user is not None and user.is_authenticated else user_id
+        if user_id is not None:
+            self.__cache().set(self.__pin_key(user_id), 1, getattr(settings, 'FORUM_READ_YOUR_WRITES_SECONDS', 5))
+
+    def __cache(self):
+        return caches[getattr(settings, 'FORUM_CACHE_ALIAS', 'default')]
+
+    def __pin_key(self, user_id):
+        return f"replica:pin:{user_id}"
+
+    def __user_id(self, request):
+        header = self.__jwt.get_header(request)
+        raw_token = self.__jwt.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            return self.__jwt.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+        except (InvalidToken, TokenError):
+            return None
+
+
+def resolved_user(request):
+    #The user if a view has set one, None while it is still AuthenticationMiddleware's lazy object
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return user
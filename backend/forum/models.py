@@ -36,6 +36,12 @@ class Subforum(models.Model):
         permissions = [
             ("moderate_subforum", "Can moderate subforum content"),
         ]
+        # Back the directory's keyset pagination for each sort mode
+        indexes = [
+            models.Index(fields=['status', '-post_count', '-id']),
+            models.Index(fields=['status', '-subscriber_count', '-id']),
+            models.Index(fields=['status', '-created_at', '-id']),
+        ]
     
     def __str__(self):
         return self.name
@@ -44,6 +50,8 @@ class SubforumTag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     description = models.CharField(max_length=200, blank=True)
     color = models.CharField(max_length=7, default='#007bff')  # Hex color
+    # Facet count: approved subforums carrying this tag (kept up by signals)
+    subforum_count = models.IntegerField(default=0)
     
     def __str__(self):
         return self.name
@@ -55,6 +63,14 @@ class SubforumTagging(models.Model):
     class Meta:
         unique_together = ['subforum', 'tag']
 
+class SubforumSearchTerm(models.Model):
+    # Inverted index over subforum name/description words, prefix-searched by range
+    term = models.CharField(max_length=50)
+    subforum = models.ForeignKey(Subforum, on_delete=models.CASCADE, related_name='search_terms')
+
+    class Meta:
+        unique_together = ['term', 'subforum']
+
 class SubforumModerator(models.Model):
     ROLE_CHOICES = [
         ('creator', 'Creator (Full Permissions)'),
@@ -74,6 +90,30 @@ class SubforumModerator(models.Model):
     class Meta:
         unique_together = ['subforum', 'user']
 
+class ModerationQueueItem(models.Model):
+    # One row per reported subforum while it waits for review; reports pile onto it
+    subforum = models.ForeignKey(Subforum, on_delete=models.CASCADE, related_name='queue_items')
+    status = models.CharField(max_length=20, default='pending', choices=[
+        ('pending', 'Pending'),
+        ('resolved', 'Resolved'),
+        ('dismissed', 'Dismissed'),
+    ])
+    report_count = models.IntegerField(default=0)
+    # Sum of the report reason weights, bumped with F() as reports arrive
+    priority = models.IntegerField(default=0)
+    first_reported_at = models.DateTimeField(auto_now_add=True)
+    last_reported_at = models.DateTimeField(auto_now_add=True)
+    reviewed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='reviewed_queue_items')
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', '-id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['subforum'], condition=models.Q(status='pending'), name='one_pending_queue_item_per_subforum'),
+        ]
+
 class SubforumReport(models.Model):
     REPORT_CHOICES = [
         ('spam', 'Spam'),
@@ -96,6 +136,7 @@ class SubforumReport(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     reviewed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='reviewed_reports')
     reviewed_at = models.DateTimeField(null=True, blank=True)
+    item = models.ForeignKey(ModerationQueueItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='reports')
 
 class SubforumSubscription(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='subscribed_subforums')
@@ -121,6 +162,38 @@ class SubforumStat(models.Model):
     peak_users_online = models.IntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
+class SubforumNeighbor(models.Model):
+    # Precomputed co-subscription neighbours (cosine similarity), read back in rank order
+    subforum = models.ForeignKey(Subforum, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Subforum, on_delete=models.CASCADE, related_name='neighbor_of')
+    rank = models.IntegerField()
+    score = models.FloatField()
+    overlap = models.IntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['subforum', 'neighbor']
+        indexes = [
+            models.Index(fields=['subforum', 'rank']),
+        ]
+
+class SubforumActivityBucket(models.Model):
+    # Append-only activity counts per subforum and hour; old hours are rolled up into days
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    subforum = models.ForeignKey(Subforum, on_delete=models.CASCADE, related_name='activity_buckets')
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES, default='hour')
+    bucket_start = models.DateTimeField()
+    posts = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+    new_subscribers = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['subforum', 'granularity', 'bucket_start']
+
 
 class Post(models.Model):
     subforum = models.ForeignKey(Subforum, on_delete=models.CASCADE, null=True, blank=True)
@@ -133,6 +206,20 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Ranking (denormalized for performance): counts move with F() deltas, hot_score
+    # is recomputed on each like/comment and decayed by decay_hot_scores
+    like_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+    hot_score = models.FloatField(default=0)
+
+    class Meta:
+        # sort=hot|top|new feeds, keyset-paginated within a subforum (or the home feed)
+        indexes = [
+            models.Index(fields=['subforum', '-hot_score', '-id']),
+            models.Index(fields=['subforum', '-like_count', '-id']),
+            models.Index(fields=['subforum', '-created_at', '-id']),
+        ]
+
 class Comments(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -152,6 +239,12 @@ class SavePost(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # A user's saves, newest first, for the keyset-paginated saved-posts list
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id']),
+        ]
+
 class FollowPerson(models.Model):
     follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')
     following = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers')
@@ -161,6 +254,22 @@ class FollowPerson(models.Model):
     class Meta:
         unique_together = ("follower", "following")
 
+class FollowSuggestion(models.Model):
+    # Precomputed "people you may know" rows, read back in rank order
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='follow_suggestions')
+    suggested = models.ForeignKey(User, on_delete=models.CASCADE, related_name='suggested_to')
+    rank = models.IntegerField()
+    score = models.FloatField()
+    mutual_count = models.IntegerField(default=0)
+    same_group = models.BooleanField(default=False)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'suggested']
+        indexes = [
+            models.Index(fields=['user', 'rank']),
+        ]
+
 class Student(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=40, null=True, blank=True)
@@ -176,3 +285,86 @@ class Faculty(models.Model):
     profile_picture = models.ImageField(blank=True)
     bio = models.CharField(max_length=200, blank=True)
 
+class ImportRun(models.Model):
+    # Progress of a legacy import, committed with each chunk so a rerun can resume
+    name = models.CharField(max_length=200, unique=True)
+    lines_done = models.IntegerField(default=0)
+    finished = models.BooleanField(default=False)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class ImportIdMap(models.Model):
+    # Legacy id -> new id, reloaded into memory when an import resumes
+    run = models.ForeignKey(ImportRun, on_delete=models.CASCADE, related_name='id_maps')
+    kind = models.CharField(max_length=20)
+    legacy_id = models.CharField(max_length=64)
+    new_id = models.BigIntegerField()
+
+    class Meta:
+        unique_together = ['run', 'kind', 'legacy_id']
+
+class AccountDeletionJob(models.Model):
+    # Background removal of a disabled account; plain ids so the job outlives the user row
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    user_id = models.BigIntegerField(db_index=True)
+    username = models.CharField(max_length=150)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    step = models.CharField(max_length=50, blank=True)
+    deleted_rows = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class ArchivedPost(models.Model):
+    # Cold copy of a Post moved out of the hot tables; keeps the original id
+    id = models.BigIntegerField(primary_key=True)
+    subforum = models.ForeignKey(Subforum, on_delete=models.CASCADE, null=True, blank=True, related_name='archived_posts')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_posts')
+    title = models.CharField(max_length=75)
+    body = models.CharField(max_length=1000)
+    event_start = models.DateTimeField(null=True, blank=True)
+    link = models.URLField(max_length=500, blank=True, null=True)
+    image = models.ImageField(upload_to='post_media/', null=True, blank=True)
+    # Likes are not archived, only their count at archival time
+    like_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subforum', '-created_at', '-id']),
+        ]
+
+class ArchivedComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    post = models.ForeignKey(ArchivedPost, on_delete=models.CASCADE, related_name='comments')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_comments')
+    body = models.CharField(max_length=1000)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+class ChangeLog(models.Model):
+    # Append-only record of feed changes for delta sync; the id is the client's watermark
+    KIND_CHOICES = [
+        ('post', 'Post'),
+        ('comment', 'Comment'),
+        ('like', 'Like count'),
+        ('save', 'Save state'),
+    ]
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # Plain ids rather than foreign keys: tombstones outlive the rows they describe
+    post_id = models.BigIntegerField(null=True, blank=True)
+    subforum_id = models.BigIntegerField(null=True, blank=True)
+    # Set only for changes visible to a single user (their saves)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
@@ -0,0 +1,52 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+
+PRIMARY = 'default'
+
+# Per-request routing state, set by ReplicaPinningMiddleware:
+# {'pinned': reads must go to the primary, 'wrote': this request has written}
+# Outside a request (background jobs, commands) there is no state and everything uses the primary
+_request_state = ContextVar('forum_replica_state', default=None)
+
+#Reads go to a random replica from FORUM_REPLICAS, writes to the primary
+#A request is pinned to the primary when it is a write, when it has already written,
+#or when its user made a writing unsafe request within FORUM_READ_YOUR_WRITES_SECONDS
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        replicas = getattr(settings, 'FORUM_REPLICAS', [])
+        if state is None or state['pinned'] or not replicas:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state['pinned'] = state['wrote'] = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        #Replicas are copies of the primary, so any two objects can be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        #Replicas get their schema from the copy job
+        return db == PRIMARY
+
+
+def begin_request(pinned):
+    return _request_state.set({'pinned': pinned, 'wrote': False})
+
+
+def mark_written():
+    """For writes made on this request's behalf outside its context, e.g. by the write queue thread"""
+    state = _request_state.get()
+    if state is not None:
+        state['pinned'] = state['wrote'] = True
+
+
+def end_request(token):
+    state = _request_state.get()
+    _request_state.reset(token)
+    return state['wrote']
@@ -2,6 +2,8 @@ from django.contrib.auth.models import User
 from rest_framework import serializers
 from .models import *
 from .services.service import *
+from .services.cache import get_approved_subforums, get_subforum_moderators
+from .services.permissions import PermissionService
 
 class SubforumTagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,7 +14,7 @@ class SubforumTagSerializer(serializers.ModelSerializer):
 class SubforumSerializer(serializers.ModelSerializer):
     creator = serializers.SerializerMethodField()
     moderators = serializers.SerializerMethodField()
-    tags = SubforumTagSerializer(many=True, read_only=True)
+    tags = serializers.SerializerMethodField()
     tag_ids = serializers.PrimaryKeyRelatedField(
         queryset=SubforumTag.objects.all(),
         source='tags',
@@ -41,8 +43,12 @@ class SubforumSerializer(serializers.ModelSerializer):
         }
     
     def get_moderators(self, obj):
-        moderators = obj.moderators.all()[:5]  # Limit for performance
-        return UserSerializer([mod.user for mod in moderators], many=True).data
+        moderators = get_subforum_moderators(obj.id)[:5]  # Limit for performance
+        return [{'id': mod['user_id'], 'username': mod['username']} for mod in moderators]
+
+    def get_tags(self, obj):
+        # obj.tags holds SubforumTagging rows; expose the tags themselves
+        return SubforumTagSerializer([tagging.tag for tagging in obj.tags.all()], many=True).data
     
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
@@ -53,7 +59,7 @@ class SubforumSerializer(serializers.ModelSerializer):
     def get_is_moderator(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.moderators.filter(user=request.user).exists()
+            return PermissionService(request.user).is_moderator(obj)
         return False
     
     def get_banner_url(self, obj):
@@ -67,6 +73,17 @@ class SubforumSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("A subforum with this name already exists.")
         return value
 
+#Validates subforum_id against the cached approved subforums instead of a query per post
+class ApprovedSubforumField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        try:
+            subforum = get_approved_subforums().get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if subforum is None:
+            self.fail('does_not_exist', pk_value=data)
+        return subforum
+
 class SubforumCreateSerializer(serializers.ModelSerializer):
     tag_ids = serializers.PrimaryKeyRelatedField(
         queryset=SubforumTag.objects.all(),
@@ -106,7 +123,8 @@ class SubforumCreateSerializer(serializers.ModelSerializer):
         )
         
         # Add tags
-        subforum.tags.set(tags)
+        for tag in tags:
+            SubforumTagging.objects.create(subforum=subforum, tag=tag)
         
         # Create stats entry
         SubforumStat.objects.create(subforum=subforum)
@@ -123,7 +141,7 @@ class SubforumReportSerializer(serializers.ModelSerializer):
             'id', 'subforum', 'subforum_name', 'reporter', 'reason',
             'details', 'status', 'created_at', 'reviewed_by', 'reviewed_at'
         ]
-        read_only_fields = ['reporter', 'created_at', 'reviewed_by', 'reviewed_at']
+        read_only_fields = ['subforum', 'reporter', 'status', 'created_at', 'reviewed_by', 'reviewed_at']
     
     def get_reporter(self, obj):
         return obj.reporter.username
@@ -219,7 +237,7 @@ class PostSerializer(serializers.ModelSerializer):
     saved = serializers.SerializerMethodField()
 
     subforum = SubforumSerializer(read_only=True)
-    subforum_id = serializers.PrimaryKeyRelatedField(
+    subforum_id = ApprovedSubforumField(
         queryset=Subforum.objects.filter(status="approved"),
         source="subforum",
         write_only=True,
@@ -229,7 +247,7 @@ class PostSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Post
-        exclude = ["user"]
+        exclude = ["user", "like_count", "comment_count", "hot_score"]
 
     #Returns amount of likes on a post
     def get_like_amt(self, obj):
@@ -243,7 +261,6 @@ class PostSerializer(serializers.ModelSerializer):
         return Likes.objects.filter(post=obj, user=request.user).exists()
 
     def get_saved(self, obj):
-        print(self.context)
         request = self.context.get("request")
         if not request or request.user and not request.user.is_authenticated:
             return False
@@ -272,7 +289,7 @@ class SinglePostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
-        fields = "__all__"
+        exclude = ['like_count', 'comment_count', 'hot_score']
 
     #Returns likes, comments, profile pic, and user
     def get_likes(self, obj):
@@ -340,6 +357,7 @@ class PostLikeSerializer(serializers.ModelSerializer):
 #Validates text for search bar 
 class SearchSerializer(serializers.Serializer):
     searchText = serializers.CharField(max_length=100)
+    page = serializers.IntegerField(min_value=1, required=False)
 
 #Validates user
 class UserSerializer(serializers.ModelSerializer):
@@ -465,3 +483,38 @@ class FollowerSerializer(serializers.ModelSerializer):
         return {"id": obj.follower.id, "username": obj.follower.username} 
 
     
+
+#Read-only output for the archive; archived rows are never written through the API
+class ArchivedCommentSerializer(serializers.ModelSerializer):
+    author = AuthorSerializer(source="user", read_only=True)
+
+    class Meta:
+        model = ArchivedComment
+        fields = ["id", "author", "body", "created_at", "updated_at"]
+        read_only_fields = fields
+
+class ArchivedPostSerializer(serializers.ModelSerializer):
+    author = AuthorSerializer(source="user", read_only=True)
+    user_id = serializers.IntegerField(read_only=True)
+    subforum_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ArchivedPost
+        fields = [
+            "id", "author", "user_id", "subforum_id", "like_count", "title", "body",
+            "event_start", "link", "image", "created_at", "updated_at", "archived_at",
+        ]
+        read_only_fields = fields
+
+class ModerationQueueItemSerializer(serializers.ModelSerializer):
+    subforum_name = serializers.CharField(source="subforum.name", read_only=True)
+    reviewed_by = serializers.CharField(source="reviewed_by.username", read_only=True, default=None)
+    reasons = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = ModerationQueueItem
+        fields = [
+            "id", "subforum", "subforum_name", "status", "report_count", "priority", "reasons",
+            "first_reported_at", "last_reported_at", "reviewed_by", "reviewed_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,128 @@
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+from forum.models import SubforumActivityBucket, Post, Comments, SubforumSubscription
+
+KINDS = ('posts', 'comments', 'new_subscribers')
+HOURLY_RETENTION_DAYS = 8
+
+#Hourly activity buckets per subforum, written with upserts and summed for stats
+class ActivityService:
+    def __init__(self, subforum_id):
+        self.__subforumID = subforum_id
+
+    #public
+    def record(self, kind, delta=1, at=None):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown activity kind: {kind}")
+        hour = truncate_hour(at or timezone.now())
+        self.add('hour', hour, {kind: delta})
+
+    def summary(self, now=None):
+        #Reads at most a week of hourly buckets plus a week of daily rollups
+        now = now or timezone.now()
+        today = start_of_day(now)
+        week = today - timedelta(days=6)
+        buckets = SubforumActivityBucket.objects.filter(subforum_id=self.__subforumID)
+        hourly_today = Q(granularity='hour', bucket_start__gte=today)
+        this_week = Q(bucket_start__gte=week)
+        totals = buckets.filter(this_week).aggregate(
+            posts_today=Sum('posts', filter=hourly_today),
+            comments_today=Sum('comments', filter=hourly_today),
+            new_subscribers_today=Sum('new_subscribers', filter=hourly_today),
+            posts_this_week=Sum('posts'),
+        )
+        return {key: value or 0 for key, value in totals.items()}
+
+    def total_comments(self):
+        #Counted from the table so deletes show up and no bucket backfill is needed
+        return Comments.objects.filter(post__subforum_id=self.__subforumID).count()
+
+    def chart(self, days=30, now=None):
+        #One point per day: rollups for compacted days, summed hours for recent ones
+        now = now or timezone.now()
+        start = start_of_day(now) - timedelta(days=days - 1)
+        rows = (
+            SubforumActivityBucket.objects
+            .filter(subforum_id=self.__subforumID, bucket_start__gte=start)
+            .annotate(day=TruncDay('bucket_start'))
+            .values('day')
+            .annotate(posts=Sum('posts'), comments=Sum('comments'), new_subscribers=Sum('new_subscribers'))
+            .order_by('day')
+        )
+        return [
+            {
+                'day': row['day'].date().isoformat(),
+                'posts': row['posts'],
+                'comments': row['comments'],
+                'new_subscribers': row['new_subscribers'],
+            }
+            for row in rows
+        ]
+
+    def add(self, granularity, bucket_start, deltas):
+        #Upsert: bump the bucket if it exists, otherwise create it
+        updates = {kind: F(kind) + delta for kind, delta in deltas.items()}
+        lookup = dict(subforum_id=self.__subforumID, granularity=granularity, bucket_start=bucket_start)
+        if SubforumActivityBucket.objects.filter(**lookup).update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                SubforumActivityBucket.objects.create(**lookup, **deltas)
+        except IntegrityError:
+            #Lost the race to create the bucket; it exists now
+            SubforumActivityBucket.objects.filter(**lookup).update(**updates)
+
+
+def truncate_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def start_of_day(moment):
+    #Days are local days, matching TruncDay in chart()
+    return timezone.localtime(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def compact(older_than_days=HOURLY_RETENTION_DAYS, chunk_size=1000):
+    #Roll hourly buckets older than the cutoff into daily buckets, a chunk at a time
+    cutoff = start_of_day(timezone.now()) - timedelta(days=older_than_days)
+    compacted = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                SubforumActivityBucket.objects
+                .filter(granularity='hour', bucket_start__lt=cutoff)
+                .order_by('id')[:chunk_size]
+            )
+            if not chunk:
+                return compacted
+            days = {}
+            for bucket in chunk:
+                key = (bucket.subforum_id, start_of_day(bucket.bucket_start))
+                totals = days.setdefault(key, dict.fromkeys(KINDS, 0))
+                for kind in KINDS:
+                    totals[kind] += getattr(bucket, kind)
+            for (subforum_id, day), totals in days.items():
+                ActivityService(subforum_id).add('day', day, totals)
+            SubforumActivityBucket.objects.filter(id__in=[bucket.id for bucket in chunk]).delete()
+            compacted += len(chunk)
+
+
+def rebuild(chunk_size=2000):
+    #Regenerate every bucket from Post/Comments/SubforumSubscription history
+    SubforumActivityBucket.objects.all().delete()
+    sources = [
+        ('posts', Post.objects.filter(subforum__isnull=False).values_list('id', 'subforum_id', 'created_at')),
+        ('comments', Comments.objects.filter(post__subforum__isnull=False).values_list('id', 'post__subforum_id', 'created_at')),
+        ('new_subscribers', SubforumSubscription.objects.values_list('id', 'subforum_id', 'created_at')),
+    ]
+    for kind, rows in sources:
+        hours = {}
+        for _, subforum_id, created_at in rows.order_by('id').iterator(chunk_size=chunk_size):
+            key = (subforum_id, truncate_hour(created_at))
+            hours[key] = hours.get(key, 0) + 1
+        for (subforum_id, hour), count in hours.items():
+            ActivityService(subforum_id).add('hour', hour, {kind: count})
+    return compact()
@@ -0,0 +1,86 @@
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from forum.models import Post, Comments, Likes, SavePost, ArchivedPost, ArchivedComment
+from .counters import CounterService
+from .deletion import raw_delete, removed_without_signals
+from .pagination import KeysetPaginator
+from .sync import record_deleted_posts
+
+CHUNK_SIZE = 500
+POST_COLUMNS = ['id', 'subforum_id', 'user_id', 'title', 'body', 'event_start', 'link', 'image', 'created_at', 'updated_at']
+COMMENT_COLUMNS = ['id', 'post_id', 'user_id', 'body', 'created_at', 'updated_at']
+
+#Moves old posts, and every post of an archived subforum, out of the hot Post/Comments
+#tables into ArchivedPost/ArchivedComment, one chunk of posts per transaction
+class ArchiveService:
+    def __init__(self, older_than_days=None, chunk_size=CHUNK_SIZE):
+        if older_than_days is None:
+            older_than_days = getattr(settings, 'FORUM_ARCHIVE_AFTER_DAYS', 365)
+        self.__cutoff = timezone.now() - timedelta(days=older_than_days)
+        self.__chunk_size = chunk_size
+
+    #public
+    def candidates(self):
+        return Post.objects.filter(Q(created_at__lt=self.__cutoff) | Q(subforum__status='archived'))
+
+    def run(self):
+        moved = 0
+        while True:
+            count = self.__move_chunk()
+            if not count:
+                break
+            moved += count
+        return moved
+
+    #private
+    def __move_chunk(self):
+        with transaction.atomic():
+            posts = list(self.candidates().order_by('id').values(*POST_COLUMNS)[:self.__chunk_size])
+            if not posts:
+                return 0
+            post_ids = [post['id'] for post in posts]
+            like_counts = dict(
+                Likes.objects.filter(post_id__in=post_ids).values('post_id')
+                .annotate(total=Count('id')).values_list('post_id', 'total')
+            )
+            comments = list(Comments.objects.filter(post_id__in=post_ids).values(*COMMENT_COLUMNS))
+            #ignore_conflicts keeps a re-run after a crash from failing on rows already copied
+            ArchivedPost.objects.bulk_create([
+                ArchivedPost(like_count=like_counts.get(post['id'], 0), **post) for post in posts
+            ], ignore_conflicts=True)
+            ArchivedComment.objects.bulk_create([ArchivedComment(**comment) for comment in comments], ignore_conflicts=True)
+
+            raw_delete(Comments, [comment['id'] for comment in comments])
+            for model in (Likes, SavePost):
+                raw_delete(model, list(model.objects.filter(post_id__in=post_ids).values_list('id', flat=True)))
+            raw_delete(Post, post_ids)
+            rows = [(post['id'], post['subforum_id']) for post in posts]
+            record_deleted_posts(rows)
+            #Snapshots, duplicate index and search cache forget the archived posts
+            removed_without_signals(posts=rows, comment_ids=[comment['id'] for comment in comments])
+            for subforum_id, count in Counter(post['subforum_id'] for post in posts if post['subforum_id']).items():
+                CounterService.incr(subforum_id, 'post_count', -count)
+            return len(posts)
+
+
+#Read-only access to archived content; nothing here writes
+class ArchiveReader:
+    PAGE_SIZE = 20
+
+    #public
+    @staticmethod
+    def get_post(post_id):
+        return ArchivedPost.objects.select_related('user', 'subforum').filter(id=post_id).first()
+
+    @staticmethod
+    def comments(post_id):
+        return ArchivedComment.objects.select_related('user').filter(post_id=post_id).order_by('-created_at')
+
+    @classmethod
+    def subforum_posts(cls, subforum_id, cursor=None):
+        queryset = ArchivedPost.objects.select_related('user').filter(subforum_id=subforum_id)
+        return KeysetPaginator(queryset, ('-created_at', '-id'), cls.PAGE_SIZE).paginate(cursor)
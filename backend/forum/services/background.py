@@ -0,0 +1,46 @@
+import logging
+import queue
+import threading
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+#Single daemon worker that runs small jobs off the request path
+#FORUM_BACKGROUND_SYNC runs jobs inline instead (tests, management commands)
+class BackgroundQueue:
+    def __init__(self, name):
+        self.__name = name
+        self.__queue = queue.SimpleQueue()
+        self.__worker = None
+        self.__lock = threading.Lock()
+
+    #public
+    def submit(self, func, *args, **kwargs):
+        if getattr(settings, 'FORUM_BACKGROUND_SYNC', False):
+            func(*args, **kwargs)
+            return
+        self.__ensure_worker()
+        self.__queue.put((func, args, kwargs))
+
+    #private
+    def __ensure_worker(self):
+        if self.__worker is not None and self.__worker.is_alive():
+            return
+        with self.__lock:
+            if self.__worker is None or not self.__worker.is_alive():
+                self.__worker = threading.Thread(target=self.__run, name=self.__name, daemon=True)
+                self.__worker.start()
+
+    def __run(self):
+        while True:
+            func, args, kwargs = self.__queue.get()
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                logger.exception("Background job %s failed", getattr(func, '__name__', func))
+            finally:
+                close_old_connections()
+
+
+background = BackgroundQueue("forum-background")
@@ -0,0 +1,215 @@
+import asyncio
+import threading
+import time
+import weakref
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from forum.models import Subforum, SubforumTag, SubforumModerator
+
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+
+#Read-through cache for rarely changing reference data
+#Keys are versioned per namespace, so invalidating a namespace is a single incr
+class ReferenceCache:
+    _local_locks = {}
+    _local_locks_guard = threading.Lock()
+    #event loop -> {key: asyncio.Lock}; asyncio locks belong to one loop
+    _async_locks = weakref.WeakKeyDictionary()
+
+    def __init__(self, namespace, timeout=300):
+        self.__namespace = namespace
+        self.__timeout = timeout
+
+    #public
+    def get_or_set(self, key, loader):
+        full_key = self.__key(key)
+        value = self.__backend().get(full_key)
+        if value is not None:
+            self.__count("hits")
+            return value
+        self.__count("misses")
+        return self.__recompute(full_key, loader)
+
+    async def aget_or_set(self, key, loader):
+        #Async twin of get_or_set for async views; loader is a coroutine function.
+        #Nothing here blocks the event loop: cache calls are async or run in a worker thread
+        full_key = await self.__akey(key)
+        value = await self.__backend().aget(full_key)
+        if value is not None:
+            await self.__acount("hits")
+            return value
+        await self.__acount("misses")
+        return await self.__arecompute(full_key, loader)
+
+    def get(self, key):
+        return self.__backend().get(self.__key(key))
+
+    def set(self, key, value, timeout=None):
+        self.__backend().set(self.__key(key), value, timeout or self.__timeout)
+
+    def delete(self, key):
+        self.__backend().delete(self.__key(key))
+
+    def invalidate(self):
+        #Every existing key becomes unreachable and ages out of the backend
+        backend = self.__backend()
+        try:
+            backend.incr(self.__version_key())
+        except ValueError:
+            backend.set(self.__version_key(), 1, None)
+
+    def version(self):
+        return self.__backend().get_or_set(self.__version_key(), 1, None)
+
+    async def aversion(self):
+        return await self.__backend().aget_or_set(self.__version_key(), 1, None)
+
+    def stats(self):
+        backend = self.__backend()
+        return {
+            "namespace": self.__namespace,
+            "version": self.version(),
+            "hits": backend.get(self.__counter_key("hits"), 0),
+            "misses": backend.get(self.__counter_key("misses"), 0),
+        }
+
+    #private
+    def __backend(self):
+        return caches[getattr(settings, "FORUM_CACHE_ALIAS", "default")]
+
+    def __key(self, key):
+        return f"ref:{self.__namespace}:v{self.version()}:{key}"
+
+    async def __akey(self, key):
+        return f"ref:{self.__namespace}:v{await self.aversion()}:{key}"
+
+    def __version_key(self):
+        return f"ref:{self.__namespace}:version"
+
+    def __counter_key(self, name):
+        return f"ref:{self.__namespace}:{name}"
+
+    def __count(self, name):
+        backend = self.__backend()
+        key = self.__counter_key(name)
+        if not backend.add(key, 1, None):
+            try:
+                backend.incr(key)
+            except ValueError:
+                backend.set(key, 1, None)
+
+    async def __acount(self, name):
+        #The base backend's aincr is a get then a set and loses concurrent increments,
+        #so the atomic sync counter runs in a worker thread instead
+        await sync_to_async(self.__count, thread_sensitive=False)(name)
+
+    def __recompute(self, full_key, loader):
+        #Single flight: one thread per process, and one process per key, runs the loader
+        with self.__local_lock(full_key):
+            backend = self.__backend()
+            value = backend.get(full_key)
+            if value is not None:
+                return value
+            lock_key = f"{full_key}:lock"
+            if backend.add(lock_key, 1, LOCK_TIMEOUT):
+                try:
+                    value = loader()
+                    backend.set(full_key, value, self.__timeout)
+                finally:
+                    backend.delete(lock_key)
+                return value
+            #Another process is computing; wait for it, then fall back to loading
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while time.monotonic() < deadline and backend.get(lock_key) is not None:
+                time.sleep(WAIT_INTERVAL)
+                value = backend.get(full_key)
+                if value is not None:
+                    return value
+            return loader()
+
+    async def __arecompute(self, full_key, loader):
+        #Same single flight as __recompute: one task per event loop, and one process per key
+        async with self.__async_lock(full_key):
+            backend = self.__backend()
+            value = await backend.aget(full_key)
+            if value is not None:
+                return value
+            lock_key = f"{full_key}:lock"
+            if await backend.aadd(lock_key, 1, LOCK_TIMEOUT):
+                try:
+                    value = await loader()
+                    await backend.aset(full_key, value, self.__timeout)
+                finally:
+                    await backend.adelete(lock_key)
+                return value
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while time.monotonic() < deadline and await backend.aget(lock_key) is not None:
+                await asyncio.sleep(WAIT_INTERVAL)
+                value = await backend.aget(full_key)
+                if value is not None:
+                    return value
+            return await loader()
+
+    def __local_lock(self, full_key):
+        with ReferenceCache._local_locks_guard:
+            lock = ReferenceCache._local_locks.get(full_key)
+            if lock is None:
+                if len(ReferenceCache._local_locks) > 1000:
+                    ReferenceCache._local_locks.clear()
+                lock = ReferenceCache._local_locks[full_key] = threading.Lock()
+            return lock
+
+    def __async_lock(self, full_key):
+        #Only touched from its own loop's thread, so no guard is needed
+        locks = ReferenceCache._async_locks.setdefault(asyncio.get_running_loop(), {})
+        lock = locks.get(full_key)
+        if lock is None:
+            if len(locks) > 1000:
+                locks.clear()
+            lock = locks[full_key] = asyncio.Lock()
+        return lock
+
+
+subforum_tags_cache = ReferenceCache("subforum_tags")
+approved_subforums_cache = ReferenceCache("approved_subforums")
+moderators_cache = ReferenceCache("subforum_moderators")
+directory_cache = ReferenceCache("subforum_directory", timeout=60)
+search_cache = ReferenceCache("search", timeout=30)
+
+ALL_CACHES = [subforum_tags_cache, approved_subforums_cache, moderators_cache, directory_cache, search_cache]
+
+
+#Loaders for the cached reference data
+
+def get_subforum_tags():
+    return subforum_tags_cache.get_or_set("all", lambda: list(
+        SubforumTag.objects.order_by('id').values('id', 'name', 'description', 'color')
+    ))
+
+
+def get_approved_subforums():
+    #id -> Subforum, used to validate subforum_id on post creation
+    return approved_subforums_cache.get_or_set("all", lambda: {
+        subforum.id: subforum
+        for subforum in Subforum.objects.filter(status='approved').select_related('creator')
+    })
+
+
+def subforum_moderators_query(subforum_id):
+    return SubforumModerator.objects.filter(subforum_id=subforum_id).order_by('id').values(
+        'user_id', 'role', 'can_delete_posts', 'can_ban_users', 'can_edit_rules',
+        username=F('user__username'),
+    )
+
+
+def get_subforum_moderators(subforum_id):
+    return moderators_cache.get_or_set(subforum_id, lambda: list(subforum_moderators_query(subforum_id)))
+
+
+async def aget_subforum_moderators(subforum_id):
+    async def load():
+        return [row async for row in subforum_moderators_query(subforum_id)]
+    return await moderators_cache.aget_or_set(subforum_id, load)
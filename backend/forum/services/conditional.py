@@ -0,0 +1,137 @@
+import hashlib
+from calendar import timegm
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from forum.models import (
+    Subforum, Post, Comments, Likes, SavePost, SubforumSubscription, SubforumTagging, SubforumStat
+)
+from . import ranking, snapshots
+from .presence import presence
+
+#Conditional GET support: a Validator is built from cheap stand-ins for everything a
+#response reads, so checking If-None-Match costs a few indexed lookups instead of the
+#serializer. A single post uses aggregates (row count and newest updated_at) over its
+#own rows; feeds and subforums use the FeedSnapshot scope version, which every write in
+#the scope bumps, plus the Subforum counters. Those carry no timestamp, so feeds send
+#an ETag only, and a single post's Last-Modified misses deletes: prefer the ETag
+class Validator:
+    def __init__(self, request, *parts):
+        #Absolute media URLs and the renderer change the body, so they are part of the tag
+        renderer = getattr(request, 'accepted_renderer', None)
+        self.__parts = [request.get_host(), getattr(renderer, 'format', None), *parts]
+        self.__modified = []
+
+    #public
+    def add(self, queryset, field='updated_at'):
+        row = queryset.aggregate(total=Count('id'), latest=Max(field))
+        self.__parts += [row['total'], row['latest']]
+        if row['latest'] is not None:
+            self.__modified.append(row['latest'])
+        return self
+
+    def value(self, *values):
+        self.__parts.extend(values)
+        return self
+
+    def etag(self):
+        digest = hashlib.blake2b(repr(self.__parts).encode(), digest_size=16).hexdigest()
+        return f'W/"{digest}"'
+
+    def last_modified(self):
+        return max(self.__modified) if self.__modified else None
+
+    def not_modified(self, request):
+        """A 304 response when the client's copy is current, else None"""
+        last_modified = self.last_modified()
+        return get_conditional_response(
+            request,
+            etag=self.etag(),
+            last_modified=timegm(last_modified.utctimetuple()) if last_modified else None,
+        )
+
+    def apply(self, response):
+        if response.status_code == 200:
+            response['ETag'] = self.etag()
+            if self.last_modified():
+                response['Last-Modified'] = http_date(timegm(self.last_modified().utctimetuple()))
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+def post_validator(request, post_id):
+    #SinglePostSerializer: the post, its subforum, comments and likes
+    validator = Validator(request, 'post', post_id)
+    validator.add(Post.objects.filter(id=post_id))
+    validator.add(Comments.objects.filter(post_id=post_id))
+    validator.add(Likes.objects.filter(post_id=post_id))
+    subforum_id = Post.objects.filter(id=post_id).values_list('subforum_id', flat=True).first()
+    if subforum_id:
+        subforum_parts(validator, subforum_id, request.user)
+    return validator
+
+
+def feed_validator(request):
+    validator = Validator(request, 'feed', request.user.id)
+    feed_parts(validator, request.user, subforum_id=None)
+    sort_parts(validator, request, subforum_id=None)
+    return validator
+
+
+def subforum_validator(request, subforum_id):
+    #The statistics block counts "today" and "this week", so the date is part of the tag.
+    #Posts, comments and subscriptions all bump the scope version in subforum_parts
+    validator = Validator(request, 'subforum', request.user.id, timezone.localdate())
+    subforum_parts(validator, subforum_id, request.user)
+    validator.value(
+        presence.online(subforum_id),
+        SubforumStat.objects.filter(subforum_id=subforum_id).values_list('peak_users_online', flat=True).first(),
+    )
+    return validator
+
+
+def subforum_posts_validator(request, subforum_id):
+    validator = Validator(
+        request, 'subforum_posts', request.user.id,
+        request.query_params.get('page', 1), request.query_params.get('per_page', 20),
+    )
+    subforum_parts(validator, subforum_id, request.user)
+    feed_parts(validator, request.user, subforum_id=subforum_id)
+    sort_parts(validator, request, subforum_id=subforum_id)
+    return validator
+
+
+def feed_parts(validator, user, subforum_id):
+    #Posts plus the counts and viewer flags PostProjection adds to each of them. Posts,
+    #likes and comments bump the scope version; the newest post comes off the
+    #(subforum, -created_at, -id) index in case the cache lost the version.
+    #Saves are the viewer's own, counted over the (user, -created_at, -id) index
+    scope = {'subforum_id': subforum_id} if subforum_id else {'subforum__isnull': True}
+    validator.value(
+        snapshots.scope_version(subforum_id),
+        Post.objects.filter(**scope).order_by('-created_at', '-id').values_list('id', flat=True).first(),
+    )
+    saves = SavePost.objects.filter(user=user).aggregate(total=Count('id'), latest=Max('created_at'))
+    validator.value(saves['total'], saves['latest'])
+
+
+def sort_parts(validator, request, subforum_id):
+    #?sort=hot|top|new pages; decay_hot_scores reorders hot pages without bumping the version
+    sort = request.query_params.get('sort')
+    validator.value(sort, request.query_params.get('cursor'))
+    if sort == 'hot':
+        validator.value(ranking.rescored_at())
+
+
+def subforum_parts(validator, subforum_id, user):
+    #Counters move with F() updates that leave updated_at alone, so they are read directly.
+    #Moderator, tagging and subscription writes bump the scope version
+    validator.value(*Subforum.objects.filter(id=subforum_id).values_list(
+        'updated_at', 'status', 'post_count', 'subscriber_count'
+    ).first() or ())
+    validator.value(snapshots.scope_version(subforum_id))
+    validator.value(list(SubforumTagging.objects.filter(subforum_id=subforum_id).order_by('id').values_list(
+        'tag_id', 'tag__name', 'tag__description', 'tag__color'
+    )))
+    validator.value(SubforumSubscription.objects.filter(subforum_id=subforum_id, user=user).exists())
@@ -0,0 +1,99 @@
+import atexit
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Count
+from django.db.models.functions import Greatest
+from forum.models import Subforum, Post, SubforumSubscription
+
+FIELDS = ('post_count', 'subscriber_count')
+
+#Denormalized Subforum counters, applied as atomic F() deltas
+#With FORUM_COUNTER_BUFFER on, deltas collect in memory and are flushed in one
+#transaction every FORUM_COUNTER_FLUSH_INTERVAL seconds or FORUM_COUNTER_FLUSH_SIZE deltas
+class CounterService:
+    _pending = defaultdict(lambda: defaultdict(int))
+    _pending_size = 0
+    _last_flush = time.monotonic()
+    _lock = threading.Lock()
+
+    #public
+    @classmethod
+    def incr(cls, subforum_id, field, delta=1):
+        if field not in FIELDS:
+            raise ValueError(f"Unknown counter: {field}")
+        if not subforum_id or not delta:
+            return
+        if not getattr(settings, 'FORUM_COUNTER_BUFFER', False):
+            cls.__apply({subforum_id: {field: delta}})
+            return
+        with cls._lock:
+            cls._pending[subforum_id][field] += delta
+            cls._pending_size += 1
+            due = (
+                cls._pending_size >= getattr(settings, 'FORUM_COUNTER_FLUSH_SIZE', 100) or
+                time.monotonic() - cls._last_flush >= getattr(settings, 'FORUM_COUNTER_FLUSH_INTERVAL', 5)
+            )
+        if due:
+            cls.flush()
+
+    @classmethod
+    def flush(cls):
+        with cls._lock:
+            pending = {subforum_id: dict(deltas) for subforum_id, deltas in cls._pending.items()}
+            cls._pending.clear()
+            cls._pending_size = 0
+            cls._last_flush = time.monotonic()
+        if pending:
+            cls.__apply(pending)
+
+    @classmethod
+    def reconcile(cls, chunk_size=500):
+        #Recompute both counters from the source tables, one chunk of subforums at a time
+        cls.flush()
+        fixed = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Subforum.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                return fixed
+            last_id = ids[-1]
+            posts = dict(
+                Post.objects.filter(subforum_id__in=ids).values('subforum_id')
+                .annotate(total=Count('id')).values_list('subforum_id', 'total')
+            )
+            subscribers = dict(
+                SubforumSubscription.objects.filter(subforum_id__in=ids).values('subforum_id')
+                .annotate(total=Count('id')).values_list('subforum_id', 'total')
+            )
+            stale = []
+            for subforum in Subforum.objects.filter(id__in=ids).only('id', *FIELDS):
+                post_count = posts.get(subforum.id, 0)
+                subscriber_count = subscribers.get(subforum.id, 0)
+                if (subforum.post_count, subforum.subscriber_count) != (post_count, subscriber_count):
+                    subforum.post_count = post_count
+                    subforum.subscriber_count = subscriber_count
+                    stale.append(subforum)
+            #bulk_update leaves updated_at alone
+            Subforum.objects.bulk_update(stale, FIELDS)
+            fixed += len(stale)
+
+    #private
+    @classmethod
+    def __apply(cls, pending):
+        with transaction.atomic():
+            for subforum_id, deltas in pending.items():
+                updates = {
+                    field: Greatest(F(field) + delta, 0)
+                    for field, delta in deltas.items() if delta
+                }
+                if updates:
+                    #queryset.update() is a single UPDATE and does not touch updated_at
+                    Subforum.objects.filter(id=subforum_id).update(**updates)
+
+
+atexit.register(CounterService.flush)
@@ -0,0 +1,181 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from forum.models import (
+    AccountDeletionJob, Post, Comments, Likes, SavePost, FollowPerson, Subforum,
+    SubforumSubscription, SubforumModerator, SubforumReport
+)
+from . import ranking, snapshots
+from .background import background
+from .cache import moderators_cache, search_cache
+from .counters import CounterService
+from .duplicates import duplicate_index
+from .permissions import invalidate_user
+from .sync import record_deleted_posts, record_deleted_comments, record_deleted_likes
+
+CHUNK_SIZE = 500
+#A running job that has not reported progress for this long is assumed dead
+STALE_AFTER = timedelta(minutes=10)
+
+logger = logging.getLogger(__name__)
+
+#Deletes an account's rows in bounded chunks instead of one cascading transaction
+#Each chunk is a raw DELETE ... WHERE id IN (...) in its own short transaction
+class AccountDeletionService:
+    def __init__(self, job):
+        self.__job = job
+        self.__userID = job.user_id
+
+    #public
+    @staticmethod
+    def schedule(user):
+        #Disable now (JWT auth rejects inactive users), delete in the background
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        job = AccountDeletionJob.objects.create(user_id=user.id, username=user.username)
+        background.submit(run_job, job.id)
+        return job
+
+    def run(self):
+        self.__progress('running', 'starting')
+        user_id = self.__userID
+        self.__delete('likes', Likes.objects.filter(user_id=user_id))
+        self.__delete('saved posts', SavePost.objects.filter(user_id=user_id))
+        self.__delete('follows', FollowPerson.objects.filter(Q(follower_id=user_id) | Q(following_id=user_id)))
+        self.__delete('subscriptions', SubforumSubscription.objects.filter(user_id=user_id), counter='subscriber_count')
+        self.__delete_moderator_rows()
+        self.__delete('comments', Comments.objects.filter(user_id=user_id))
+        self.__delete('reports', SubforumReport.objects.filter(reporter_id=user_id))
+        SubforumReport.objects.filter(reviewed_by_id=user_id).update(reviewed_by=None)
+        SubforumModerator.objects.filter(assigned_by_id=user_id).update(assigned_by=None)
+        self.__delete_posts('posts', Post.objects.filter(user_id=user_id))
+        for subforum in Subforum.objects.filter(creator_id=user_id):
+            self.__delete_posts(f'subforum {subforum.id} posts', Post.objects.filter(subforum_id=subforum.id))
+            #What is left under the subforum is small; let the ORM cascade it
+            subforum.delete()
+        self.__progress('running', 'account')
+        User.objects.filter(id=user_id).delete()
+        search_cache.invalidate()
+        self.__progress('done', 'done')
+
+    #private
+    def __delete(self, step, queryset, counter=None):
+        model = queryset.model
+        while True:
+            columns = ('id', 'subforum_id') if counter else ('id', 'post_id') if model in (Likes, Comments) else ('id',)
+            rows = list(queryset.order_by('id').values_list(*columns)[:CHUNK_SIZE])
+            if not rows:
+                return
+            ids = [row[0] for row in rows]
+            with transaction.atomic():
+                if model is Comments:
+                    record_deleted_comments(ids)
+                elif model is Likes:
+                    record_deleted_likes(row[1] for row in rows)
+                raw_delete(model, ids)
+                if counter:
+                    for subforum_id, removed in Counter(row[1] for row in rows).items():
+                        CounterService.incr(subforum_id, counter, -removed)
+                if model in (Likes, Comments):
+                    removed_without_signals(
+                        comment_ids=ids if model is Comments else (), post_ids=[row[1] for row in rows]
+                    )
+                self.__progress('running', step, len(rows))
+
+    def __delete_moderator_rows(self):
+        subforum_ids = list(SubforumModerator.objects.filter(user_id=self.__userID).values_list('subforum_id', flat=True))
+        self.__delete('moderator roles', SubforumModerator.objects.filter(user_id=self.__userID))
+        invalidate_user(self.__userID)
+        for subforum_id in subforum_ids:
+            moderators_cache.delete(subforum_id)
+
+    def __delete_posts(self, step, posts):
+        #Dependents from other users go first, then the posts, then post_count
+        while True:
+            rows = list(posts.order_by('id').values_list('id', 'subforum_id')[:CHUNK_SIZE])
+            if not rows:
+                return
+            post_ids = [row[0] for row in rows]
+            with transaction.atomic():
+                removed = 0
+                comment_ids = []
+                for model in (Comments, Likes, SavePost):
+                    dependent_ids = list(model.objects.filter(post_id__in=post_ids).values_list('id', flat=True))
+                    raw_delete(model, dependent_ids)
+                    removed += len(dependent_ids)
+                    if model is Comments:
+                        comment_ids = dependent_ids
+                raw_delete(Post, post_ids)
+                record_deleted_posts(rows)
+                removed_without_signals(posts=rows, comment_ids=comment_ids)
+                for subforum_id, count in Counter(row[1] for row in rows).items():
+                    CounterService.incr(subforum_id, 'post_count', -count)
+                self.__progress('running', step, removed + len(post_ids))
+
+    def __progress(self, status, step, deleted=0):
+        job = self.__job
+        job.status = status
+        job.step = step
+        job.deleted_rows += deleted
+        job.save(update_fields=['status', 'step', 'deleted_rows', 'updated_at'])
+
+
+def raw_delete(model, ids):
+    #No collector, no per-row signals: one DELETE per batch of ids
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        #Stay under the backend's bound-parameter limit
+        for start in range(0, len(ids), CHUNK_SIZE):
+            batch = ids[start:start + CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", batch)
+
+
+def removed_without_signals(posts=(), comment_ids=(), post_ids=()):
+    """Does in bulk what signals would have done for rows removed with raw_delete: posts are
+    (id, subforum id) pairs that are gone, post_ids are surviving posts that lost likes or comments"""
+    post_ids = set(post_ids) - {post_id for post_id, _ in posts}
+    if post_ids:
+        ranking.recount(post_ids)
+    scopes = {subforum_id for _, subforum_id in posts}
+    scopes |= set(Post.objects.filter(id__in=post_ids).values_list('subforum_id', flat=True).distinct())
+    for subforum_id in scopes:
+        snapshots.invalidate(subforum_id)
+    for post_id, _ in posts:
+        duplicate_index.remove(('post', post_id))
+    for comment_id in comment_ids:
+        duplicate_index.remove(('comment', comment_id))
+    if posts:
+        search_cache.invalidate()
+
+
+def run_job(job_id):
+    #Claiming is one conditional UPDATE, so a job queued twice or resumed elsewhere runs once
+    if not AccountDeletionJob.objects.filter(claimable(), id=job_id).update(status='running', updated_at=timezone.now()):
+        return
+    job = AccountDeletionJob.objects.get(id=job_id)
+    try:
+        AccountDeletionService(job).run()
+    except Exception as error:
+        logger.exception("Account deletion job %s failed", job_id)
+        job.status = 'failed'
+        job.error = str(error)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+
+
+def run_pending():
+    #Picks up jobs that never ran, failed, or stopped reporting progress (e.g. the process
+    #restarted mid-job); a job still running elsewhere is left alone
+    job_ids = list(AccountDeletionJob.objects.filter(claimable()).order_by('id').values_list('id', flat=True))
+    for job_id in job_ids:
+        run_job(job_id)
+    return len(job_ids)
+
+
+def claimable():
+    stale = Q(status='running', updated_at__lt=timezone.now() - STALE_AFTER)
+    return Q(status__in=['pending', 'failed']) | stale
@@ -0,0 +1,127 @@
+import re
+from django.db.models import F
+from forum.models import Subforum, SubforumTag, SubforumTagging, SubforumSearchTerm, SubforumSubscription
+from .pagination import KeysetPaginator
+from .cache import directory_cache
+from .permissions import PermissionService
+
+SORT_FIELDS = ['post_count', 'subscriber_count', 'created_at']
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+WORD_RE = re.compile(r"\w+")
+
+#Paginated, faceted subforum directory
+class SubforumDirectoryService:
+    def __init__(self, user, params):
+        self.__user = user
+        self.__params = params
+
+    #public
+    def is_default_listing(self):
+        #The no-filter listing is shared by every viewer and is served from cache
+        return not (
+            self.__params.get('tag') or
+            self.__params.get('search') or
+            self.__params.get('cursor') or
+            (self.__user.is_staff and self.__params.get('status', 'approved') != 'approved')
+        )
+
+    def queryset(self):
+        subforums = Subforum.objects.select_related('creator').prefetch_related('tags__tag')
+        return self.__filter(subforums)
+
+    def paginator(self):
+        return KeysetPaginator(self.queryset(), (f'-{self.order_by()}', '-id'), self.page_size())
+
+    def order_by(self):
+        order_by = self.__params.get('order_by', 'post_count')
+        return order_by if order_by in SORT_FIELDS else 'post_count'
+
+    def page_size(self):
+        try:
+            page_size = int(self.__params.get('page_size', DEFAULT_PAGE_SIZE))
+        except (TypeError, ValueError):
+            page_size = DEFAULT_PAGE_SIZE
+        return max(1, min(page_size, MAX_PAGE_SIZE))
+
+    def cache_key(self):
+        return f"{self.order_by()}:{self.page_size()}"
+
+    def viewer_flags(self, subforum_ids):
+        #One indexed lookup plus the cached moderator map instead of two queries per row
+        if not self.__user.is_authenticated:
+            return set(), set()
+        subscribed = set(SubforumSubscription.objects.filter(
+            user=self.__user, subforum_id__in=subforum_ids
+        ).values_list('subforum_id', flat=True))
+        moderated = set(PermissionService(self.__user).moderator_map()) & set(subforum_ids)
+        return subscribed, moderated
+
+    @staticmethod
+    def facets():
+        return list(
+            SubforumTag.objects.filter(subforum_count__gt=0)
+            .order_by('-subforum_count', 'name')
+            .values('id', 'name', 'color', count=F('subforum_count'))
+        )
+
+    #private
+    def __filter(self, subforums):
+        # Filter by status (admin can see all, users only approved)
+        status_filter = self.__params.get('status', 'approved')
+        if not self.__user.is_staff:
+            subforums = subforums.filter(status='approved')
+        elif status_filter:
+            subforums = subforums.filter(status=status_filter)
+
+        # Filter by tag; EXISTS-style subquery so a subforum never repeats
+        tag_filter = self.__params.get('tag')
+        if tag_filter:
+            subforums = subforums.filter(id__in=SubforumTagging.objects.filter(
+                tag_id=tag_filter
+            ).values('subforum_id'))
+
+        # Search: every word must prefix-match an indexed term
+        search_query = self.__params.get('search')
+        if search_query:
+            for word in tokenize(search_query):
+                subforums = subforums.filter(id__in=SubforumSearchTerm.objects.filter(
+                    term__gte=word, term__lt=word + '\U0010ffff'
+                ).values('subforum_id'))
+        return subforums
+
+
+def tokenize(text):
+    return {word[:50] for word in WORD_RE.findall((text or "").lower())}
+
+
+def index_subforum(subforum):
+    #Rewrites the search terms for a single subforum
+    terms = tokenize(f"{subforum.name} {subforum.description}")
+    SubforumSearchTerm.objects.filter(subforum=subforum).exclude(term__in=terms).delete()
+    existing = set(SubforumSearchTerm.objects.filter(subforum=subforum).values_list('term', flat=True))
+    SubforumSearchTerm.objects.bulk_create([
+        SubforumSearchTerm(term=term, subforum=subforum) for term in terms - existing
+    ])
+
+
+def adjust_tag_counts(tag_ids, delta):
+    if tag_ids:
+        SubforumTag.objects.filter(id__in=tag_ids).update(subforum_count=F('subforum_count') + delta)
+
+
+def rebuild_tag_facets():
+    #Recompute facet counts (after queryset.update() calls that skip signals)
+    for tag in SubforumTag.objects.all():
+        tag.subforum_count = SubforumTagging.objects.filter(tag=tag, subforum__status='approved').count()
+        tag.save(update_fields=['subforum_count'])
+    directory_cache.invalidate()
+
+
+def rebuild_directory():
+    #Full recompute of facet counts and search terms (after bulk updates/imports)
+    rebuild_tag_facets()
+    for subforum in Subforum.objects.all().iterator(chunk_size=500):
+        index_subforum(subforum)
+    directory_cache.invalidate()
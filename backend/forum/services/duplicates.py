@@ -0,0 +1,308 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from forum.models import Post, Comments
+from .background import background
+
+logger = logging.getLogger(__name__)
+
+BANDS = 16
+ROWS = 4
+SHINGLE_SIZE = 5
+#Texts shorter than this (after normalizing) are never treated as duplicates
+MIN_LENGTH = 30
+DEFAULTS = {
+    'ACTION': 'flag',
+    'THRESHOLD': 0.8,
+    'WINDOW_DAYS': 7,
+    'MAX_ENTRIES': 50000,
+    #How often a serving process looks for a reload requested by rebuild_duplicate_index
+    'RELOAD_CHECK_SECONDS': 30,
+}
+SIGNATURE_SIZE = BANDS * ROWS
+HASH_MASK = (1 << 64) - 1
+EMPTY = 1 << 64
+VERSION_KEY = 'duplicates:version'
+
+NON_WORD_RE = re.compile(r"[\W_]+")
+
+#In-process near-duplicate index over recent posts and comments: a MinHash signature
+#per text, bucketed by LSH bands so a lookup only compares texts sharing a band.
+#Loaded from the tables by the background worker when the process starts serving,
+#then kept current by signals in this process. Writes that land during a load are
+#buffered and replayed onto the fresh index before it is swapped in. Bumping the
+#shared version (bump_version) makes every serving process reload in the background
+class DuplicateIndex:
+    def __init__(self, threshold=None, window_days=None, max_entries=None, from_db=True):
+        #from_db=False gives a standalone index that only holds what is add()ed (benchmarks)
+        self.__threshold = threshold
+        self.__windowDays = window_days
+        self.__maxEntries = max_entries
+        self.__entries = OrderedDict()
+        self.__buckets = [{} for _ in range(BANDS)]
+        self.__fromDB = from_db
+        self.__loaded = not from_db
+        self.__warming = False
+        self.__buffers = []
+        self.__version = None
+        self.__checkedAt = time.monotonic()
+        self.__lock = threading.RLock()
+
+    #public
+    def add(self, key, text, created_at=None):
+        """Indexes text under key, e.g. ('post', 12); a no-op until the index has loaded"""
+        with self.__lock:
+            for buffer in self.__buffers:
+                buffer.append((key, text, created_at))
+            if not self.__loaded:
+                return
+            self.__remove(key)
+            if len(normalize(text)) < MIN_LENGTH:
+                return
+            signature = minhash(text)
+            self.__entries[key] = (signature, created_at or timezone.now())
+            for band, bucket in enumerate(band_keys(signature)):
+                self.__buckets[band].setdefault(bucket, set()).add(key)
+            self.__evict()
+
+    def remove(self, key):
+        with self.__lock:
+            for buffer in self.__buffers:
+                buffer.append((key, None, None))
+            self.__remove(key)
+
+    def query(self, text, exclude=None):
+        """Recent (key, estimated similarity) pairs at or above the threshold, most similar first.
+        Nothing matches until the index has loaded; a request never waits for the load"""
+        if len(normalize(text)) < MIN_LENGTH:
+            return []
+        if not self.__loaded:
+            self.warm()
+            if not self.__loaded:
+                return []
+        self.__check_version()
+        signature = minhash(text)
+        with self.__lock:
+            return self.__matches(signature, exclude)
+
+    def load(self):
+        if not self.__loaded:
+            self.rebuild()
+
+    def warm(self):
+        """Queues a load on the background worker unless one is loaded or pending"""
+        if self.__loaded:
+            return
+        with self.__lock:
+            if self.__loaded or self.__warming:
+                return
+            self.__warming = True
+        background.submit(self.__warm)
+
+    def rebuild(self):
+        """Reloads the newest MAX_ENTRIES posts and comments inside the window"""
+        buffer = []
+        with self.__lock:
+            self.__buffers.append(buffer)
+        try:
+            version = shared_version()
+            fresh = self.__read()
+            with self.__lock:
+                #add()/remove() calls made while the tables were read are replayed in order
+                for key, text, created_at in buffer:
+                    if text is None:
+                        fresh.remove(key)
+                    else:
+                        fresh.add(key, text, created_at)
+                self.__entries, self.__buckets = fresh.__entries, fresh.__buckets
+                self.__version = version
+                self.__loaded = True
+        finally:
+            with self.__lock:
+                self.__buffers.remove(buffer)
+        return len(self.__entries)
+
+    def reset(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__buckets = [{} for _ in range(BANDS)]
+            self.__loaded = False
+
+    def groups(self):
+        """(type, id, matches) for every indexed text with an older near-duplicate"""
+        with self.__lock:
+            position = {key: index for index, key in enumerate(self.__entries)}
+            groups = []
+            for key, (signature, _) in self.__entries.items():
+                matches = [match for match in self.__matches(signature, key) if position[match[0]] < position[key]]
+                if matches:
+                    groups.append((key[0], key[1], matches))
+        return groups
+
+    def size(self):
+        return len(self.__entries)
+
+    def threshold(self):
+        return self.__threshold if self.__threshold is not None else config('THRESHOLD')
+
+    def window_days(self):
+        return self.__windowDays if self.__windowDays is not None else config('WINDOW_DAYS')
+
+    def max_entries(self):
+        return self.__maxEntries if self.__maxEntries is not None else config('MAX_ENTRIES')
+
+    #private
+    def __warm(self):
+        try:
+            self.load()
+        finally:
+            self.__warming = False
+
+    def __read(self):
+        since = timezone.now() - timedelta(days=self.window_days())
+        posts = Post.objects.filter(created_at__gte=since).order_by('-created_at').values_list('id', 'title', 'body', 'created_at')
+        comments = Comments.objects.filter(created_at__gte=since).order_by('-created_at').values_list('id', 'body', 'created_at')
+        rows = [(('post', pk), post_text(title, body), created_at) for pk, title, body, created_at in posts[:self.max_entries()]]
+        rows += [(('comment', pk), body, created_at) for pk, body, created_at in comments[:self.max_entries()]]
+        rows.sort(key=lambda row: row[2])
+        #Signatures are built into a fresh index, so queries only wait for the swap
+        fresh = DuplicateIndex(self.__threshold, self.__windowDays, self.__maxEntries, from_db=False)
+        for key, text, created_at in rows[-self.max_entries():]:
+            fresh.add(key, text, created_at)
+        return fresh
+
+    def __reload(self):
+        try:
+            self.rebuild()
+        finally:
+            self.__warming = False
+
+    def __check_version(self):
+        #At most one cache read per RELOAD_CHECK_SECONDS; a changed version queues a reload
+        if not self.__fromDB or time.monotonic() - self.__checkedAt < config('RELOAD_CHECK_SECONDS'):
+            return
+        self.__checkedAt = time.monotonic()
+        if shared_version() == self.__version:
+            return
+        with self.__lock:
+            if self.__warming:
+                return
+            self.__warming = True
+        background.submit(self.__reload)
+
+    def __remove(self, key):
+        entry = self.__entries.pop(key, None)
+        if entry is None:
+            return
+        for band, bucket in enumerate(band_keys(entry[0])):
+            keys = self.__buckets[band].get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.__buckets[band][bucket]
+
+    def __matches(self, signature, exclude):
+        candidates = set()
+        for band, bucket in enumerate(band_keys(signature)):
+            candidates |= self.__buckets[band].get(bucket, set())
+        candidates.discard(exclude)
+        cutoff = timezone.now() - timedelta(days=self.window_days())
+        matches = []
+        for key in candidates:
+            other, created_at = self.__entries[key]
+            if created_at < cutoff:
+                continue
+            similarity = sum(a == b for a, b in zip(signature, other)) / len(signature)
+            if similarity >= self.threshold():
+                matches.append((key, similarity))
+        return sorted(matches, key=lambda match: -match[1])
+
+    def __evict(self):
+        #Entries go in roughly oldest first, so the front of the dict is the oldest
+        cutoff = timezone.now() - timedelta(days=self.window_days())
+        while self.__entries:
+            key, (_, created_at) = next(iter(self.__entries.items()))
+            if len(self.__entries) <= self.max_entries() and created_at >= cutoff:
+                break
+            self.__remove(key)
+
+
+duplicate_index = DuplicateIndex()
+
+
+def rejects(key_type, text, user):
+    """True when text should be refused as a near-duplicate; in 'flag' mode it is only logged"""
+    matches = duplicate_index.query(text)
+    if not matches:
+        return False
+    (match_type, match_id), similarity = matches[0]
+    logger.warning(
+        "Near-duplicate %s by user %s: %.2f similar to %s %s", key_type, user.id, similarity, match_type, match_id
+    )
+    return config('ACTION') == 'reject'
+
+
+def post_text(title, body):
+    return f"{title or ''}\n{body or ''}"
+
+
+def normalize(text):
+    return NON_WORD_RE.sub(' ', (text or '').lower()).strip()
+
+
+def shingles(text):
+    text = normalize(text)
+    return {text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+
+
+def minhash(text):
+    #One-permutation MinHash: each shingle is hashed once and kept as the minimum of one
+    #of SIGNATURE_SIZE bins; empty bins borrow the next filled bin's value (rotation
+    #densification). hash() is salted per process, like the index itself
+    signature = [EMPTY] * SIGNATURE_SIZE
+    for shingle in shingles(text):
+        value = hash(shingle) & HASH_MASK
+        slot, value = value % SIGNATURE_SIZE, value // SIGNATURE_SIZE
+        if value < signature[slot]:
+            signature[slot] = value
+    if EMPTY in signature:
+        filled = [slot for slot, value in enumerate(signature) if value != EMPTY]
+        for slot in range(SIGNATURE_SIZE):
+            if signature[slot] == EMPTY:
+                distance = next(((other - slot) % SIGNATURE_SIZE for other in filled if other > slot), None)
+                if distance is None:
+                    distance = filled[0] + SIGNATURE_SIZE - slot
+                signature[slot] = signature[(slot + distance) % SIGNATURE_SIZE] + distance * EMPTY
+    return tuple(signature)
+
+
+def band_keys(signature):
+    return [hash(signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+def config(name):
+    return getattr(settings, 'FORUM_DUPLICATES', {}).get(name, DEFAULTS[name])
+
+
+def shared_version():
+    return backend().get(VERSION_KEY, 1)
+
+
+def bump_version():
+    """Makes every serving process reload its index from the tables"""
+    cache = backend()
+    if not cache.add(VERSION_KEY, 2, None):
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 2, None)
+
+
+def backend():
+    return caches[getattr(settings, 'FORUM_CACHE_ALIAS', 'default')]
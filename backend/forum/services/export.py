@@ -0,0 +1,120 @@
+import csv
+import json
+from datetime import datetime, time
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from forum.models import Post, Comments, Likes, Subforum, SubforumReport
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# dataset -> (model, exported columns, lookup that holds the subforum id)
+DATASETS = {
+    'posts': (
+        Post,
+        ['id', 'user_id', 'subforum_id', 'title', 'body', 'event_start', 'link', 'image', 'created_at', 'updated_at'],
+        'subforum_id',
+    ),
+    'comments': (
+        Comments,
+        ['id', 'post_id', 'user_id', 'body', 'created_at', 'updated_at'],
+        'post__subforum_id',
+    ),
+    'likes': (
+        Likes,
+        ['id', 'post_id', 'user_id', 'created_at', 'updated_at'],
+        'post__subforum_id',
+    ),
+    'subforums': (
+        Subforum,
+        ['id', 'name', 'description', 'rules', 'creator_id', 'status', 'post_count', 'subscriber_count', 'created_at', 'updated_at'],
+        'id',
+    ),
+    'reports': (
+        SubforumReport,
+        ['id', 'subforum_id', 'reporter_id', 'reason', 'details', 'status', 'created_at', 'reviewed_by_id', 'reviewed_at'],
+        'subforum_id',
+    ),
+}
+
+#Streams a table as NDJSON or CSV without holding it in memory
+class ExportService:
+    def __init__(self, dataset, fmt='ndjson', start=None, end=None, subforum_id=None):
+        if dataset not in DATASETS:
+            raise ValueError(f"Unknown dataset: {dataset}")
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format: {fmt}")
+        self.__dataset = dataset
+        self.__format = fmt
+        self.__start = parse_moment(start)
+        self.__end = parse_moment(end, end_of_day=True)
+        self.__subforumID = parse_id(subforum_id)
+
+    #public
+    def content_type(self):
+        return FORMATS[self.__format]
+
+    def filename(self):
+        return f"{self.__dataset}.{self.__format}"
+
+    def stream(self):
+        if self.__format == 'csv':
+            return self.__csv()
+        return self.__ndjson()
+
+    def rows(self):
+        model, columns, subforum_lookup = DATASETS[self.__dataset]
+        queryset = model.objects.all()
+        if self.__start:
+            queryset = queryset.filter(created_at__gte=self.__start)
+        if self.__end:
+            queryset = queryset.filter(created_at__lte=self.__end)
+        if self.__subforumID:
+            queryset = queryset.filter(**{subforum_lookup: self.__subforumID})
+        #values() skips model instantiation; iterator() fetches CHUNK_SIZE rows at a time
+        return queryset.order_by('id').values(*columns).iterator(chunk_size=CHUNK_SIZE)
+
+    #private
+    def __ndjson(self):
+        for row in self.rows():
+            yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+    def __csv(self):
+        _, columns, _ = DATASETS[self.__dataset]
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(columns)
+        for row in self.rows():
+            yield writer.writerow([row[column] for column in columns])
+
+
+class EchoBuffer:
+    #csv.writer target that hands each encoded line straight back
+    def write(self, value):
+        return value
+
+
+def parse_moment(value, end_of_day=False):
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_id(value):
+    #Checked up front: a bad id inside the streamed generator would truncate a 200 response
+    if value in (None, ''):
+        return None
+    if not str(value).isdigit():
+        raise ValueError(f"Invalid subforum id: {value}")
+    return int(value)
@@ -0,0 +1,269 @@
+import json
+from contextlib import contextmanager
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from forum.models import (
+    Subforum, Post, Comments, Likes, FollowPerson, Student, Faculty, ImportRun, ImportIdMap
+)
+from . import activity, directory, ranking
+from .cache import ALL_CACHES
+from .counters import CounterService
+
+KINDS = ['user', 'subforum', 'post', 'comment', 'like', 'follow']
+TIMESTAMPED = [Subforum, Post, Comments, Likes, FollowPerson]
+
+#Loads a legacy forum dump (NDJSON, one {"type": ..., "id": ...} record per line)
+#Foreign keys are resolved through in-memory legacy id -> new id maps; rows go in
+#with bulk_create, one transaction per chunk, and progress is committed with the chunk
+class LegacyImporter:
+    def __init__(self, name, chunk_size=5000, batch_size=500, log=None):
+        self.__run, _ = ImportRun.objects.get_or_create(name=name)
+        self.__chunk_size = chunk_size
+        self.__batch_size = batch_size
+        self.__log = log or (lambda message: None)
+        self.__maps = {kind: {} for kind in KINDS}
+        self.stats = {kind: 0 for kind in KINDS}
+        self.stats['skipped'] = 0
+
+    #public
+    def run(self, lines):
+        if self.__run.finished:
+            self.__log(f"Import '{self.__run.name}' already finished")
+            return self.stats
+        self.__load_maps()
+        resume_at = self.__run.lines_done
+        if resume_at:
+            self.__log(f"Resuming after line {resume_at}")
+        chunk = []
+        line_no = 0
+        with preserve_timestamps():
+            for line_no, line in enumerate(lines, start=1):
+                if line_no <= resume_at or not line.strip():
+                    continue
+                chunk.append(json.loads(line))
+                if len(chunk) >= self.__chunk_size:
+                    self.__import_chunk(chunk, line_no)
+                    chunk = []
+            self.__import_chunk(chunk, line_no)
+        self.__run.finished = True
+        self.__run.save(update_fields=['finished', 'updated_at'])
+        return self.stats
+
+    #private
+    def __load_maps(self):
+        rows = ImportIdMap.objects.filter(run=self.__run).values_list('kind', 'legacy_id', 'new_id')
+        for kind, legacy_id, new_id in rows.iterator(chunk_size=10000):
+            self.__maps[kind][legacy_id] = new_id
+
+    def __import_chunk(self, records, line_no):
+        by_kind = {kind: [] for kind in KINDS}
+        for record in records:
+            if record.get('type') in by_kind:
+                by_kind[record['type']].append(record)
+            else:
+                self.stats['skipped'] += 1
+        with transaction.atomic():
+            #Dependency order, so a record can point at one earlier in the same chunk
+            self.__import_users(by_kind['user'])
+            self.__import_subforums(by_kind['subforum'])
+            self.__import_posts(by_kind['post'])
+            self.__import_comments(by_kind['comment'])
+            self.__import_likes(by_kind['like'])
+            self.__import_follows(by_kind['follow'])
+            self.__run.lines_done = line_no
+            self.__run.save(update_fields=['lines_done', 'updated_at'])
+        self.__log(f"Imported through line {line_no}")
+
+    def __resolve(self, kind, legacy_id):
+        if legacy_id is None:
+            return None
+        return self.__maps[kind].get(str(legacy_id))
+
+    def __remember(self, kind, pairs):
+        new_maps = []
+        for legacy_id, new_id in pairs:
+            self.__maps[kind][str(legacy_id)] = new_id
+            new_maps.append(ImportIdMap(run=self.__run, kind=kind, legacy_id=str(legacy_id), new_id=new_id))
+        ImportIdMap.objects.bulk_create(new_maps, batch_size=self.__batch_size)
+
+    def __create(self, kind, records, objects):
+        #objects line up with records; None marks a record that could not be resolved
+        pairs = [(record, obj) for record, obj in zip(records, objects) if obj is not None]
+        self.stats['skipped'] += len(records) - len(pairs)
+        model = type(pairs[0][1]) if pairs else None
+        if model is not None:
+            model.objects.bulk_create([obj for _, obj in pairs], batch_size=self.__batch_size)
+        self.stats[kind] += len(pairs)
+        return pairs
+
+    def __import_users(self, records):
+        records = [record for record in records if str(record['id']) not in self.__maps['user']]
+        existing = dict(User.objects.filter(
+            username__in=[record['username'] for record in records]
+        ).values_list('username', 'id'))
+        self.__remember('user', [
+            (record['id'], existing[record['username']]) for record in records if record['username'] in existing
+        ])
+        records = [record for record in records if record['username'] not in existing]
+        users = []
+        for record in records:
+            user = User(
+                username=text(record, 'username', 150),
+                email=text(record, 'email', 254),
+                first_name=text(record, 'first_name', 150),
+                last_name=text(record, 'last_name', 150),
+                date_joined=moment(record.get('date_joined')),
+            )
+            user.set_unusable_password()
+            users.append(user)
+        pairs = self.__create('user', records, users)
+        self.__remember('user', [(record['id'], user.id) for record, user in pairs])
+
+        profiles = {Student: [], Faculty: []}
+        for record, user in pairs:
+            role = (record.get('role') or '').lower()
+            if role == 'student':
+                profiles[Student].append(Student(user_id=user.id, major=text(record, 'major', 75), classification=text(record, 'classification', 20)))
+            elif role == 'faculty':
+                profiles[Faculty].append(Faculty(user_id=user.id, department=text(record, 'department', 100)))
+        for model, objects in profiles.items():
+            model.objects.bulk_create(objects, batch_size=self.__batch_size)
+
+    def __import_subforums(self, records):
+        records = [record for record in records if str(record['id']) not in self.__maps['subforum']]
+        existing = dict(Subforum.objects.filter(
+            name__in=[record['name'] for record in records]
+        ).values_list('name', 'id'))
+        self.__remember('subforum', [
+            (record['id'], existing[record['name']]) for record in records if record['name'] in existing
+        ])
+        records = [record for record in records if record['name'] not in existing]
+        subforums = []
+        for record in records:
+            creator_id = self.__resolve('user', record.get('creator'))
+            subforums.append(None if creator_id is None else Subforum(
+                name=text(record, 'name', 100),
+                description=text(record, 'description', 500),
+                rules=record.get('rules') or "Be respectful to other members.",
+                creator_id=creator_id,
+                status=record.get('status', 'approved'),
+                created_at=moment(record.get('created_at')),
+                updated_at=moment(record.get('updated_at') or record.get('created_at')),
+            ))
+        pairs = self.__create('subforum', records, subforums)
+        self.__remember('subforum', [(record['id'], subforum.id) for record, subforum in pairs])
+
+    def __import_posts(self, records):
+        records = [record for record in records if str(record['id']) not in self.__maps['post']]
+        posts = []
+        for record in records:
+            user_id = self.__resolve('user', record.get('user'))
+            subforum_id = self.__resolve('subforum', record.get('subforum'))
+            missing_subforum = record.get('subforum') is not None and subforum_id is None
+            posts.append(None if user_id is None or missing_subforum else Post(
+                user_id=user_id,
+                subforum_id=subforum_id,
+                title=text(record, 'title', 75),
+                body=text(record, 'body', 1000),
+                link=record.get('link'),
+                created_at=moment(record.get('created_at')),
+                updated_at=moment(record.get('updated_at') or record.get('created_at')),
+            ))
+        pairs = self.__create('post', records, posts)
+        self.__remember('post', [(record['id'], post.id) for record, post in pairs])
+
+    def __import_comments(self, records):
+        records = [record for record in records if str(record['id']) not in self.__maps['comment']]
+        comments = []
+        for record in records:
+            post_id = self.__resolve('post', record.get('post'))
+            user_id = self.__resolve('user', record.get('user'))
+            comments.append(None if post_id is None or user_id is None else Comments(
+                post_id=post_id,
+                user_id=user_id,
+                body=text(record, 'body', 1000),
+                created_at=moment(record.get('created_at')),
+                updated_at=moment(record.get('updated_at') or record.get('created_at')),
+            ))
+        pairs = self.__create('comment', records, comments)
+        self.__remember('comment', [(record['id'], comment.id) for record, comment in pairs])
+
+    def __import_likes(self, records):
+        resolved = [
+            (self.__resolve('post', record.get('post')), self.__resolve('user', record.get('user')))
+            for record in records
+        ]
+        #Likes has no unique constraint, so repeats within the dump or of rows already imported are dropped here
+        seen = set(Likes.objects.filter(
+            post_id__in={post_id for post_id, _ in resolved if post_id is not None},
+            user_id__in={user_id for _, user_id in resolved if user_id is not None},
+        ).values_list('post_id', 'user_id'))
+        likes = []
+        for record, (post_id, user_id) in zip(records, resolved):
+            if post_id is None or user_id is None or (post_id, user_id) in seen:
+                likes.append(None)
+                continue
+            seen.add((post_id, user_id))
+            created_at = moment(record.get('created_at'))
+            likes.append(Likes(post_id=post_id, user_id=user_id, created_at=created_at, updated_at=created_at))
+        self.__create('like', records, likes)
+
+    def __import_follows(self, records):
+        follows = []
+        for record in records:
+            follower_id = self.__resolve('user', record.get('follower'))
+            following_id = self.__resolve('user', record.get('following'))
+            created_at = moment(record.get('created_at'))
+            valid = follower_id is not None and following_id is not None and follower_id != following_id
+            follows.append(FollowPerson(
+                follower_id=follower_id, following_id=following_id, created_at=created_at, updated_at=created_at,
+            ) if valid else None)
+        pairs = [(record, follow) for record, follow in zip(records, follows) if follow is not None]
+        self.stats['skipped'] += len(records) - len(pairs)
+        FollowPerson.objects.bulk_create([follow for _, follow in pairs], batch_size=self.__batch_size, ignore_conflicts=True)
+        self.stats['follow'] += len(pairs)
+
+
+def text(record, key, length):
+    return str(record.get(key) or '')[:length]
+
+
+def moment(value):
+    parsed = parse_datetime(value) if value else None
+    if parsed is None:
+        return timezone.now()
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+@contextmanager
+def preserve_timestamps():
+    #auto_now/auto_now_add would overwrite the legacy created_at/updated_at on insert
+    fields = [
+        field for model in TIMESTAMPED for field in model._meta.fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def rebuild_derived_data(log=None):
+    #Counters, search index, facets and activity were skipped during the import
+    log = log or (lambda message: None)
+    log(f"Reconciled {CounterService.reconcile()} subforum counters")
+    log(f"Recounted likes and comments on {ranking.recount()} posts")
+    directory.rebuild_directory()
+    log("Rebuilt subforum directory")
+    activity.rebuild()
+    log("Rebuilt activity buckets")
+    for reference_cache in ALL_CACHES:
+        reference_cache.invalidate()
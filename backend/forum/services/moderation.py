@@ -0,0 +1,117 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Case, When, Value, IntegerField
+from django.utils import timezone
+from forum.models import ModerationQueueItem, SubforumReport
+from .pagination import KeysetPaginator
+
+#Priority added to a subforum's queue item per report, by reason
+REASON_WEIGHTS = {
+    'harassment': 5,
+    'inappropriate': 4,
+    'rules_violation': 3,
+    'spam': 2,
+    'other': 1,
+}
+ACTIONS = {'resolve': 'resolved', 'dismiss': 'dismissed'}
+STATUSES = ['pending', 'resolved', 'dismissed']
+PAGE_SIZE = 50
+MAX_BULK = 500
+
+#Moderation queue: reports are grouped into one pending item per subforum whose count and
+#priority are bumped as reports arrive, listed by (status, priority) and closed in bulk
+class ModerationQueueService:
+    def __init__(self, user):
+        self.__user = user
+
+    #public
+    @staticmethod
+    def record(report):
+        """Attaches a new report to its subforum's pending item, creating the item if needed"""
+        weight = REASON_WEIGHTS.get(report.reason, 1)
+        pending = ModerationQueueItem.objects.filter(subforum_id=report.subforum_id, status='pending')
+        while True:
+            updated = pending.update(
+                report_count=F('report_count') + 1,
+                priority=F('priority') + weight,
+                last_reported_at=timezone.now(),
+            )
+            if updated:
+                break
+            try:
+                with transaction.atomic():
+                    ModerationQueueItem.objects.create(subforum_id=report.subforum_id, report_count=1, priority=weight)
+                break
+            except IntegrityError:
+                #Another report created the pending item first; bump that one instead
+                continue
+        item_id = pending.values_list('id', flat=True).first()
+        SubforumReport.objects.filter(id=report.id).update(item_id=item_id)
+        return item_id
+
+    def page(self, status='pending', cursor=None):
+        queryset = ModerationQueueItem.objects.filter(status=status).select_related('subforum', 'reviewed_by')
+        items, next_cursor = KeysetPaginator(queryset, ('-priority', '-id'), PAGE_SIZE).paginate(cursor)
+        reasons = {}
+        for row in SubforumReport.objects.filter(item_id__in=[item.id for item in items]).values('item_id', 'reason').annotate(total=Count('id')):
+            reasons.setdefault(row['item_id'], {})[row['reason']] = row['total']
+        for item in items:
+            item.reasons = reasons.get(item.id, {})
+        return items, next_cursor
+
+    def bulk(self, item_ids, action):
+        """Closes pending items and their pending reports: one UPDATE per table; returns items closed"""
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        now = timezone.now()
+        with transaction.atomic():
+            closed = ModerationQueueItem.objects.filter(id__in=item_ids, status='pending').update(
+                status=ACTIONS[action], reviewed_by=self.__user, reviewed_at=now
+            )
+            SubforumReport.objects.filter(item_id__in=item_ids, status='pending').update(
+                status=ACTIONS[action], reviewed_by=self.__user, reviewed_at=now
+            )
+        return closed
+
+    def close_reports(self, report_ids, action):
+        """Closes single pending reports and takes them off their items; returns reports closed"""
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        now = timezone.now()
+        with transaction.atomic():
+            reports = SubforumReport.objects.filter(id__in=report_ids, status='pending')
+            groups = list(reports.filter(item__isnull=False).values('item_id').annotate(
+                total=Count('id'), weight=Sum(reason_weight())
+            ).order_by())
+            closed = reports.update(status=ACTIONS[action], reviewed_by=self.__user, reviewed_at=now)
+            for group in groups:
+                ModerationQueueItem.objects.filter(id=group['item_id'], status='pending').update(
+                    report_count=F('report_count') - group['total'], priority=F('priority') - group['weight']
+                )
+            #An item with no reports left is closed the same way as its last report
+            ModerationQueueItem.objects.filter(
+                id__in=[group['item_id'] for group in groups], status='pending', report_count__lte=0
+            ).update(status=ACTIONS[action], reviewed_by=self.__user, reviewed_at=now)
+        return closed
+
+    @staticmethod
+    def rebuild():
+        """Regroups every pending report into fresh pending items (for reports filed before the queue)"""
+        with transaction.atomic():
+            ModerationQueueItem.objects.filter(status='pending').delete()
+            groups = SubforumReport.objects.filter(status='pending').values('subforum_id').annotate(
+                total=Count('id'), priority=Sum(reason_weight())
+            ).order_by()
+            items = ModerationQueueItem.objects.bulk_create([
+                ModerationQueueItem(subforum_id=group['subforum_id'], report_count=group['total'], priority=group['priority'])
+                for group in groups
+            ])
+            for item in items:
+                SubforumReport.objects.filter(subforum_id=item.subforum_id, status='pending').update(item=item)
+        return len(items)
+
+
+def reason_weight():
+    return Case(
+        *[When(reason=reason, then=Value(value)) for reason, value in REASON_WEIGHTS.items()],
+        default=Value(1), output_field=IntegerField(),
+    )
@@ -0,0 +1,64 @@
+import base64
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+#Keyset (cursor) pagination: seeks past the last row instead of using OFFSET
+class KeysetPaginator:
+    def __init__(self, queryset, ordering, page_size=20):
+        #ordering is a tuple like ('-post_count', '-id'); the last key must be unique
+        self.__queryset = queryset.order_by(*ordering)
+        self.__ordering = ordering
+        self.__page_size = page_size
+
+    #public
+    def paginate(self, cursor=None):
+        queryset = self.__queryset
+        if cursor:
+            queryset = queryset.filter(self.__seek(self.decode(cursor)))
+        rows = list(queryset[:self.__page_size + 1])
+        next_cursor = None
+        if len(rows) > self.__page_size:
+            rows = rows[:self.__page_size]
+            next_cursor = self.encode(rows[-1])
+        return rows, next_cursor
+
+    def encode(self, row):
+        values = [self.__field(row, key) for key in self.__ordering]
+        raw = json.dumps(values, default=str).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+        if not isinstance(values, list) or len(values) != len(self.__ordering):
+            raise ValueError("Invalid cursor")
+        model = self.__queryset.model
+        try:
+            return [
+                model._meta.get_field(key.lstrip('-')).to_python(value)
+                for key, value in zip(self.__ordering, values)
+            ]
+        except (ValidationError, FieldDoesNotExist, TypeError):
+            #A tampered cursor holds values the ordering fields cannot parse
+            raise ValueError("Invalid cursor")
+
+    #private
+    def __field(self, row, key):
+        name = key.lstrip('-')
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+    def __seek(self, values):
+        #(a, b) after (x, y) == a past x OR (a == x AND b past y)
+        condition = Q()
+        equal = {}
+        for key, value in zip(self.__ordering, values):
+            name = key.lstrip('-')
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
@@ -0,0 +1,74 @@
+from forum.models import Subforum, SubforumModerator
+from .cache import ReferenceCache
+
+#Subforum permission checks, answered from one moderator map per user
+ACTIONS = {
+    'moderate': lambda entry: True,
+    'manage_moderators': lambda entry: entry['role'] == 'creator',
+    'delete_posts': lambda entry: entry['can_delete_posts'],
+    'ban_users': lambda entry: entry['can_ban_users'],
+    'edit_rules': lambda entry: entry['can_edit_rules'],
+}
+
+permissions_cache = ReferenceCache("moderator_permissions")
+
+class PermissionService:
+    def __init__(self, user):
+        self.__user = user
+        self.__map = None
+
+    #public
+    def moderator_map(self):
+        #subforum id -> role and flags, loaded in one query and cached per user
+        if not self.__user.is_authenticated:
+            return {}
+        if self.__map is None:
+            self.__map = permissions_cache.get_or_set(self.__user.id, self.__load)
+        return self.__map
+
+    async def amoderator_map(self):
+        if not self.__user.is_authenticated:
+            return {}
+        if self.__map is None:
+            self.__map = await permissions_cache.aget_or_set(self.__user.id, self.__aload)
+        return self.__map
+
+    def role(self, subforum):
+        entry = self.moderator_map().get(self.__subforum_id(subforum))
+        return entry['role'] if entry else None
+
+    def is_moderator(self, subforum):
+        return self.__subforum_id(subforum) in self.moderator_map()
+
+    def has_perm(self, subforum, action):
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown subforum action: {action}")
+        if self.__user.is_authenticated and self.__user.is_staff:
+            return True
+        entry = self.moderator_map().get(self.__subforum_id(subforum))
+        if entry is None:
+            return False
+        return bool(ACTIONS[action](entry))
+
+    #private
+    def __subforum_id(self, subforum):
+        return subforum.id if isinstance(subforum, Subforum) else int(subforum)
+
+    def __rows(self):
+        return SubforumModerator.objects.filter(user=self.__user).values(
+            'subforum_id', 'role', 'can_delete_posts', 'can_ban_users', 'can_edit_rules'
+        )
+
+    def __load(self):
+        return {row['subforum_id']: row for row in self.__rows()}
+
+    async def __aload(self):
+        return {row['subforum_id']: row async for row in self.__rows()}
+
+
+def has_perm(user, subforum, action):
+    return PermissionService(user).has_perm(subforum, action)
+
+
+def invalidate_user(user_id):
+    permissions_cache.delete(user_id)
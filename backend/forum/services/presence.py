@@ -0,0 +1,84 @@
+import threading
+import time
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.functions import Greatest
+from forum.models import SubforumStat
+from .background import background
+
+WINDOW_MINUTES = 5
+SITE = 'site'
+SITE_PEAK_KEY = "presence:site:peak"
+
+#Who is online: per scope, the minute each user was last seen, plus per-minute sets of
+#the users first seen in that minute so expiry only touches users whose minute ran out.
+#A user is online in a scope if they were seen in any minute of the sliding window
+class PresenceTracker:
+    def __init__(self, window=WINDOW_MINUTES):
+        self.__window = window
+        self.__seen = {}      # scope -> {user id: last minute seen}
+        self.__minutes = {}   # minute -> {scope: user ids seen that minute}
+        self.__peaks = {}     # scope -> highest count already persisted
+        self.__lock = threading.Lock()
+
+    #public
+    def heartbeat(self, user_id, subforum_id=None):
+        #Only an enqueue happens on the request thread
+        background.submit(self.record, user_id, subforum_id, current_minute())
+
+    def record(self, user_id, subforum_id, minute):
+        scopes = [SITE] if subforum_id is None else [SITE, subforum_id]
+        joined = []
+        with self.__lock:
+            self.__expire(minute)
+            for scope in scopes:
+                seen = self.__seen.setdefault(scope, {})
+                last = seen.get(user_id)
+                if last is not None and last >= minute:
+                    continue
+                seen[user_id] = minute
+                self.__minutes.setdefault(minute, {}).setdefault(scope, set()).add(user_id)
+                if last is None:
+                    joined.append((scope, len(seen)))
+        for scope, count in joined:
+            self.__update_peak(scope, count)
+
+    def online(self, subforum_id=None):
+        scope = SITE if subforum_id is None else subforum_id
+        with self.__lock:
+            self.__expire(current_minute())
+            return len(self.__seen.get(scope, ()))
+
+    def site_peak(self):
+        return cache.get(SITE_PEAK_KEY, 0)
+
+    #private
+    def __expire(self, minute):
+        for past in [past for past in self.__minutes if past <= minute - self.__window]:
+            for scope, user_ids in self.__minutes.pop(past).items():
+                seen = self.__seen.get(scope, {})
+                for user_id in user_ids:
+                    #Users seen again in a later minute stay online
+                    if seen.get(user_id) == past:
+                        del seen[user_id]
+                if not seen:
+                    self.__seen.pop(scope, None)
+
+    def __update_peak(self, scope, count):
+        if count <= self.__peaks.get(scope, 0):
+            return
+        self.__peaks[scope] = count
+        if scope == SITE:
+            if count > cache.get(SITE_PEAK_KEY, 0):
+                cache.set(SITE_PEAK_KEY, count, None)
+            return
+        SubforumStat.objects.filter(subforum_id=scope).update(
+            peak_users_online=Greatest(F('peak_users_online'), count)
+        )
+
+
+def current_minute():
+    return int(time.time() // 60)
+
+
+presence = PresenceTracker()
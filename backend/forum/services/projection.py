@@ -0,0 +1,179 @@
+import asyncio
+from django.db.models import Count
+from rest_framework import serializers
+from forum.models import Post, Subforum, Likes, Comments, SavePost, Student, Faculty, SubforumTagging, SubforumSubscription
+from .cache import aget_subforum_moderators, get_subforum_moderators
+from .permissions import PermissionService
+
+DATETIME = serializers.DateTimeField()
+
+POST_VALUES = (
+    'id', 'user_id', 'subforum_id', 'title', 'body', 'event_start', 'link', 'image', 'created_at', 'updated_at',
+    'user__first_name', 'user__last_name', 'user__username',
+)
+SUBFORUM_VALUES = (
+    'id', 'name', 'description', 'rules', 'creator_id', 'creator__username', 'status', 'banner',
+    'created_at', 'post_count', 'subscriber_count',
+)
+
+#Read-only fast path for post lists: builds PostSerializer-shaped dicts from .values()
+#rows and one batch of queries per page, instead of model instances and the serializer's
+#queries per post. Keys, order and formats match PostSerializer/SubforumSerializer
+#Post rows come from post_rows(); extra subforum ids (a subforum page, search hits) can be added
+class PostProjection:
+    def __init__(self, rows, user, request=None, subforum_ids=(), author_ids=()):
+        self.__rows = list(rows)
+        self.__user = user
+        self.__request = request
+        self.__subforumIDs = sorted({row['subforum_id'] for row in self.__rows if row['subforum_id']} | set(subforum_ids))
+        self.__authorIDs = {row['user_id'] for row in self.__rows} | set(author_ids)
+        self.__context = None
+
+    #public
+    def load(self):
+        rows = {name: list(query) for name, query in self.__queries().items()}
+        moderators = {pk: get_subforum_moderators(pk) for pk in self.__subforumIDs}
+        moderator_map = PermissionService(self.__user).moderator_map() if self.__authenticated() else {}
+        self.__context = self.__build_context(rows, moderators, moderator_map)
+        return self
+
+    async def aload(self):
+        queries = self.__queries()
+        results = await asyncio.gather(*[collect(query) for query in queries.values()])
+        rows = dict(zip(queries, results))
+        moderators = await asyncio.gather(*[aget_subforum_moderators(pk) for pk in self.__subforumIDs])
+        moderator_map = await PermissionService(self.__user).amoderator_map() if self.__authenticated() else {}
+        self.__context = self.__build_context(rows, dict(zip(self.__subforumIDs, moderators)), moderator_map)
+        return self
+
+    def posts(self):
+        return [self.post(row) for row in self.__rows]
+
+    def post(self, row):
+        context = self.__context
+        post_id = row['id']
+        return {
+            "id": post_id,
+            "author": self.author(row['user_id'], row['user__first_name'], row['user__last_name'], row['user__username']),
+            "user_id": row['user_id'],
+            "comment_amt": context["comment_counts"].get(post_id, 0),
+            "like_amt": context["like_counts"].get(post_id, 0),
+            "liked": post_id in context["liked"],
+            "saved": post_id in context["saved"],
+            "subforum": self.subforum(row['subforum_id']) if row['subforum_id'] else None,
+            "title": row['title'],
+            "body": row['body'],
+            "event_start": timestamp(row['event_start']),
+            "link": row['link'],
+            "image": self.__file_url(Post, 'image', row['image']),
+            "created_at": timestamp(row['created_at']),
+            "updated_at": timestamp(row['updated_at']),
+        }
+
+    def author(self, user_id, first_name, last_name, username):
+        context = self.__context
+        student = context["students"].get(user_id)
+        faculty = context["faculty"].get(user_id)
+        if student is not None:
+            role = "Student"
+        elif faculty is not None:
+            role = "Faculty"
+        else:
+            role = None
+        return {
+            "id": user_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            "username": username,
+            "role": role,
+            "profile_picture": storage_url(Student, 'profile_picture', student) or storage_url(Faculty, 'profile_picture', faculty),
+        }
+
+    def subforum(self, subforum_id):
+        context = self.__context
+        row = context["subforums"][subforum_id]
+        return {
+            "id": subforum_id,
+            "name": row['name'],
+            "description": row['description'],
+            "rules": row['rules'],
+            "creator": {"id": row['creator_id'], "username": row['creator__username']},
+            "status": row['status'],
+            "banner": self.__file_url(Subforum, 'banner', row['banner']),
+            "banner_url": storage_url(Subforum, 'banner', row['banner']),
+            "created_at": timestamp(row['created_at']),
+            "post_count": row['post_count'],
+            "subscriber_count": row['subscriber_count'],
+            "moderators": [
+                {"id": moderator["user_id"], "username": moderator["username"]}
+                for moderator in context["moderators"].get(subforum_id, [])[:5]
+            ],
+            "tags": context["tags"].get(subforum_id, []),
+            "is_subscribed": subforum_id in context["subscribed"],
+            "is_moderator": subforum_id in context["moderator_map"],
+        }
+
+    #private
+    def __authenticated(self):
+        return self.__user is not None and self.__user.is_authenticated
+
+    def __queries(self):
+        post_ids = [row['id'] for row in self.__rows]
+        subforum_ids = self.__subforumIDs
+        user_id = self.__user.id if self.__authenticated() else None
+        return {
+            "subforums": Subforum.objects.filter(id__in=subforum_ids).values(*SUBFORUM_VALUES),
+            "like_counts": Likes.objects.filter(post_id__in=post_ids).values("post_id").annotate(total=Count("id")).values_list("post_id", "total"),
+            "comment_counts": Comments.objects.filter(post_id__in=post_ids).values("post_id").annotate(total=Count("id")).values_list("post_id", "total"),
+            "liked": Likes.objects.filter(post_id__in=post_ids, user_id=user_id).values_list("post_id", flat=True),
+            "saved": SavePost.objects.filter(post_id__in=post_ids, user_id=user_id).values_list("post_id", flat=True),
+            "students": Student.objects.filter(user_id__in=self.__authorIDs).values_list("user_id", "profile_picture"),
+            "faculty": Faculty.objects.filter(user_id__in=self.__authorIDs).values_list("user_id", "profile_picture"),
+            "tags": SubforumTagging.objects.filter(subforum_id__in=subforum_ids).order_by("id").values_list(
+                "subforum_id", "tag__id", "tag__name", "tag__description", "tag__color"
+            ),
+            "subscribed": SubforumSubscription.objects.filter(subforum_id__in=subforum_ids, user_id=user_id).values_list("subforum_id", flat=True),
+        }
+
+    def __build_context(self, rows, moderators, moderator_map):
+        tags = {}
+        for subforum_id, tag_id, name, description, color in rows["tags"]:
+            tags.setdefault(subforum_id, []).append({"id": tag_id, "name": name, "description": description, "color": color})
+        return {
+            "subforums": {row['id']: row for row in rows["subforums"]},
+            "like_counts": dict(rows["like_counts"]),
+            "comment_counts": dict(rows["comment_counts"]),
+            "liked": set(rows["liked"]),
+            "saved": set(rows["saved"]),
+            "students": dict(rows["students"]),
+            "faculty": dict(rows["faculty"]),
+            "tags": tags,
+            "subscribed": set(rows["subscribed"]),
+            "moderators": moderators,
+            "moderator_map": moderator_map,
+        }
+
+    def __file_url(self, model, field, name):
+        #Same as DRF's FileField: absolute when there is a request in the context
+        url = storage_url(model, field, name)
+        if url is None or self.__request is None:
+            return url
+        return self.__request.build_absolute_uri(url)
+
+
+def post_rows(queryset):
+    return queryset.values(*POST_VALUES)
+
+
+def timestamp(value):
+    return DATETIME.to_representation(value)
+
+
+def storage_url(model, field, name):
+    if not name:
+        return None
+    return model._meta.get_field(field).storage.url(name)
+
+
+async def collect(queryset):
+    return [row async for row in queryset]
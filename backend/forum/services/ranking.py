@@ -0,0 +1,146 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from forum.models import Post, Comments, Likes
+from .pagination import KeysetPaginator
+from .projection import PostProjection, post_rows
+
+#Keyset ordering per sort mode; each is backed by a (subforum, key, id) index on Post
+SORTS = {
+    'hot': ('-hot_score', '-id'),
+    'top': ('-like_count', '-id'),
+    'new': ('-created_at', '-id'),
+}
+PAGE_SIZE = 20
+#A comment is worth this many likes
+COMMENT_WEIGHT = 2
+#How quickly age drags a post down: score = (likes + 2 * comments + 1) / (hours + 2) ** GRAVITY
+GRAVITY = 1.8
+CHUNK_SIZE = 500
+RESCORED_KEY = 'ranking:rescored_at'
+
+#Ranked feeds: the home feed (subforum_id=None) or one subforum, sorted hot, top or new
+#and keyset-paginated over the stored columns, so no request scores posts itself.
+#Hot scores move between decay runs, so a hot cursor is a best-effort position
+class RankedFeedService:
+    def __init__(self, user, request=None, subforum_id=None):
+        self.__user = user
+        self.__request = request
+        self.__subforumID = subforum_id
+
+    #public
+    def page(self, sort, cursor=None):
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        scope = {'subforum_id': self.__subforumID} if self.__subforumID else {'subforum__isnull': True}
+        ordering = SORTS[sort]
+        keys = Post.objects.filter(**scope).values('id', ordering[0].lstrip('-'))
+        keys, next_cursor = KeysetPaginator(keys, ordering, PAGE_SIZE).paginate(cursor)
+        return self.__hydrate(keys), next_cursor
+
+    #private
+    def __hydrate(self, keys):
+        rows = {row['id']: row for row in post_rows(Post.objects.filter(id__in=[key['id'] for key in keys]))}
+        subforum_ids = [self.__subforumID] if self.__subforumID else []
+        projection = PostProjection(rows.values(), self.__user, self.__request, subforum_ids=subforum_ids).load()
+        return [projection.post(rows[key['id']]) for key in keys if key['id'] in rows]
+
+
+def hot_score(likes, comments, created_at, now=None):
+    return (likes + COMMENT_WEIGHT * comments + 1) / age_factor(created_at, now)
+
+
+def age_factor(created_at, now=None):
+    hours = max(((now or timezone.now()) - created_at).total_seconds() / 3600, 0)
+    return (hours + 2) ** GRAVITY
+
+
+def record(post_id, likes=0, comments=0):
+    """Applies like/comment deltas to a post and rescores it in one UPDATE"""
+    created_at = Post.objects.filter(id=post_id).values_list('created_at', flat=True).first()
+    if created_at is None:
+        return
+    like_count = Greatest(F('like_count') + likes, 0)
+    comment_count = Greatest(F('comment_count') + comments, 0)
+    #queryset.update() is a single UPDATE and does not touch updated_at
+    Post.objects.filter(id=post_id).update(
+        like_count=like_count,
+        comment_count=comment_count,
+        hot_score=ExpressionWrapper(
+            (like_count + COMMENT_WEIGHT * comment_count + 1) / Value(age_factor(created_at)), output_field=FloatField()
+        ),
+    )
+
+
+def decay(window_days=None):
+    """Rescores posts created inside the window; older posts have decayed to near zero. Returns posts rescored"""
+    if window_days is None:
+        window_days = getattr(settings, 'FORUM_HOT_WINDOW_DAYS', 14)
+    now = timezone.now()
+    posts = Post.objects.filter(created_at__gte=now - timedelta(days=window_days))
+    return rescore(posts, now)
+
+
+def rescore(posts, now=None, chunk_size=CHUNK_SIZE):
+    #A like landing between the read and the write is rescored by the next record() or run
+    now = now or timezone.now()
+    rescored = 0
+    last_id = 0
+    while True:
+        rows = list(
+            posts.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'like_count', 'comment_count', 'created_at')[:chunk_size]
+        )
+        if not rows:
+            #Hot pages reorder without a write signal; conditional GETs watch this stamp
+            backend().set(RESCORED_KEY, now.timestamp(), None)
+            return rescored
+        last_id = rows[-1][0]
+        #bulk_update leaves updated_at alone
+        Post.objects.bulk_update([
+            Post(id=post_id, hot_score=hot_score(likes, comments, created_at, now))
+            for post_id, likes, comments, created_at in rows
+        ], ['hot_score'])
+        rescored += len(rows)
+
+
+def recount(post_ids=None, chunk_size=CHUNK_SIZE):
+    """Recomputes like_count and comment_count from the source tables, for post_ids or every post
+    (after an import, or rows removed without signals); returns posts corrected"""
+    posts = Post.objects.all() if post_ids is None else Post.objects.filter(id__in=list(post_ids))
+    fixed = 0
+    last_id = 0
+    while True:
+        ids = list(posts.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return fixed
+        last_id = ids[-1]
+        likes = dict(
+            Likes.objects.filter(post_id__in=ids).values('post_id')
+            .annotate(total=Count('id')).values_list('post_id', 'total')
+        )
+        comments = dict(
+            Comments.objects.filter(post_id__in=ids).values('post_id')
+            .annotate(total=Count('id')).values_list('post_id', 'total')
+        )
+        now = timezone.now()
+        stale = []
+        for post in Post.objects.filter(id__in=ids).only('id', 'like_count', 'comment_count', 'created_at', 'hot_score'):
+            like_count, comment_count = likes.get(post.id, 0), comments.get(post.id, 0)
+            if (post.like_count, post.comment_count) != (like_count, comment_count):
+                post.like_count, post.comment_count = like_count, comment_count
+                post.hot_score = hot_score(like_count, comment_count, post.created_at, now)
+                stale.append(post)
+        Post.objects.bulk_update(stale, ['like_count', 'comment_count', 'hot_score'])
+        fixed += len(stale)
+
+
+def rescored_at():
+    return backend().get(RESCORED_KEY)
+
+
+def backend():
+    return caches[getattr(settings, 'FORUM_CACHE_ALIAS', 'default')]
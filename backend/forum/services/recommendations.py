@@ -0,0 +1,130 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Sum
+from forum.models import SubforumNeighbor, SubforumSubscription
+
+TOP_K = 20
+RECOMMENDATIONS = 10
+#Subscription rows are expanded into at most this many subforum pairs at a time when counting co-subscribers
+CHUNK_PAIRS = 4_000_000
+BATCH_SIZE = 1000
+
+#User-by-subforum subscription matrix in compressed sparse row form: the subforums user
+#row i subscribes to are columns indices[indptr[i]:indptr[i + 1]]. Only approved
+#subforums are included; user_ids and subforum_ids map rows and columns back to ids
+class SubscriptionMatrix:
+    def __init__(self, user_ids, subforum_ids, indptr, indices):
+        self.user_ids = user_ids
+        self.subforum_ids = subforum_ids
+        self.indptr = indptr
+        self.indices = indices
+
+    #public
+    @classmethod
+    def load(cls):
+        rows = SubforumSubscription.objects.filter(subforum__status='approved').values_list('user_id', 'subforum_id')
+        pairs = np.fromiter(
+            (value for row in rows.iterator(chunk_size=10000) for value in row), dtype=np.int64
+        ).reshape(-1, 2)
+        return cls.from_pairs(pairs)
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Builds the matrix from an (n, 2) array of (user id, subforum id) rows"""
+        user_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+        subforum_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+        order = np.lexsort((columns, rows))
+        indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(user_ids)), out=indptr[1:])
+        return cls(user_ids, subforum_ids, indptr, columns[order])
+
+    def cooccurrence(self):
+        """Non-zero off-diagonal cells of X^T X as (rows, columns, counts), sorted by row then column.
+        Each user row contributes the pairs of its subforums; pairs are counted a block of users at a time"""
+        size = len(self.subforum_ids)
+        lengths = np.diff(self.indptr)
+        ends = np.cumsum(lengths * lengths)
+        keys, counts = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+        start = 0
+        while start < len(lengths):
+            done = ends[start - 1] if start else 0
+            end = max(start + 1, int(np.searchsorted(ends, done + CHUNK_PAIRS, side='right')))
+            block_keys, block_counts = np.unique(self.__pairs(start, end, size), return_counts=True)
+            keys.append(block_keys)
+            counts.append(block_counts)
+            start = end
+        keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate(counts)).astype(np.int64)
+        return keys // size, keys % size, counts
+
+    def subscriber_counts(self):
+        """Subscribers per subforum column, the diagonal of X^T X"""
+        return np.bincount(self.indices, minlength=len(self.subforum_ids))
+
+    #private
+    def __pairs(self, start, end, size):
+        #row * size + column keys for every ordered pair of distinct subforums in user rows start..end
+        lengths = np.diff(self.indptr[start:end + 1])
+        entries = self.indices[self.indptr[start]:self.indptr[end]]
+        per_entry = np.repeat(lengths, lengths)
+        left = np.repeat(entries, per_entry)
+        first = np.repeat(np.repeat(self.indptr[start:end] - self.indptr[start], lengths), per_entry)
+        offset = np.arange(len(left)) - np.repeat(np.cumsum(per_entry) - per_entry, per_entry)
+        right = entries[first + offset]
+        distinct = left != right
+        return left[distinct] * size + right[distinct]
+
+
+#"Subforums you might like": an offline job stores each subforum's top-k neighbours by
+#co-subscription cosine similarity, and a user's recommendations are the neighbours of
+#their subscriptions summed in one indexed query, so requests never touch the matrix
+class SubforumRecommendationService:
+    def __init__(self, user):
+        self.__user = user
+
+    #public
+    def recommendations(self, limit=RECOMMENDATIONS):
+        subscribed = SubforumSubscription.objects.filter(user=self.__user).values('subforum_id')
+        return list(
+            SubforumNeighbor.objects.filter(subforum_id__in=subscribed, neighbor__status='approved')
+            .exclude(neighbor_id__in=subscribed)
+            .values('neighbor_id', 'neighbor__name', 'neighbor__description', 'neighbor__subscriber_count')
+            .annotate(total=Sum('score'), sources=Count('subforum_id'))
+            .order_by('-total', 'neighbor_id')[:limit]
+        )
+
+
+def similarity(rows, columns, counts, subscribers):
+    """Cosine similarity for each non-zero co-subscription cell"""
+    return counts / np.sqrt(subscribers[rows].astype(np.float64) * subscribers[columns])
+
+
+def top_neighbors(rows, columns, scores, k=TOP_K):
+    """Positions of each row's k best cells, best first with ties to the lowest column, and their ranks"""
+    order = np.lexsort((columns, -scores, rows))
+    ordered_rows = rows[order]
+    ranks = np.arange(len(order)) - np.searchsorted(ordered_rows, ordered_rows)
+    keep = ranks < k
+    return order[keep], ranks[keep]
+
+
+def rebuild(k=TOP_K):
+    """Recomputes every subforum's neighbours from the subscription table; returns subforums ranked"""
+    matrix = SubscriptionMatrix.load()
+    rows, columns, counts = matrix.cooccurrence()
+    scores = similarity(rows, columns, counts, matrix.subscriber_counts())
+    positions, ranks = top_neighbors(rows, columns, scores, k)
+    ids = matrix.subforum_ids.tolist()
+    neighbors = [
+        SubforumNeighbor(
+            subforum_id=ids[row], neighbor_id=ids[column], rank=rank, score=score, overlap=overlap,
+        )
+        for row, column, rank, score, overlap in zip(
+            rows[positions].tolist(), columns[positions].tolist(), ranks.tolist(),
+            scores[positions].tolist(), counts[positions].tolist(),
+        )
+    ]
+    with transaction.atomic():
+        SubforumNeighbor.objects.all().delete()
+        SubforumNeighbor.objects.bulk_create(neighbors, batch_size=BATCH_SIZE)
+    return len(ids)
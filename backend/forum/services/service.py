@@ -7,6 +7,14 @@ from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
 from django.db.models import Count
+from .activity import ActivityService
+from .cache import search_cache
+from .deletion import AccountDeletionService
+from .writes import toggle
+from .projection import PostProjection, post_rows, timestamp
+from .pagination import KeysetPaginator
+import hashlib
+import asyncio
 
 #Registering
 class RegisterService:
@@ -70,41 +78,105 @@ class DeleteService:
     
     #private
     def __delete(self):
-        try:
-            self.__user.delete()
-            return True
-        except User.DoesNotExist:
-            return False
+        #The account is deactivated now; its rows are removed in chunks in the background
+        if not User.objects.filter(id=self.__user.id).exists():
+            return None
+        return AccountDeletionService.schedule(self.__user)
 
 #Updated SearchService Class
+#Results are cached as id lists per normalized query and page, then hydrated in batch;
+#the cache generation is bumped whenever a Post, Subforum or User is written
 class SearchService:
+    PAGE_SIZE = 20
+
     def __init__(self, data):
         self.__data = self.__text(data)
+        self.__page = self.__page_number(data)
 
     #public
     def search(self):
-        people = self.__search_users()
-        posts = self.__search_posts()
-        subforums = self.__search_subforums()
+        ids = search_cache.get_or_set(self.__cache_key(), self.__search_ids)
+        return {
+            "People": self.__hydrate(User.objects.filter(is_active=True), ids["People"]),
+            "Posts": self.__hydrate(self.__visible_posts().select_related("user", "subforum"), ids["Posts"]),
+            "Subforums": self.__hydrate(Subforum.objects.filter(status="approved"), ids["Subforums"]),
+        }
+
+    async def asearch(self):
+        #Same as search() on the async ORM, for the ASGI views; posts come back as projection rows
+        ids = await search_cache.aget_or_set(self.__cache_key(), self.__asearch_ids)
+        people, posts, subforums = await asyncio.gather(
+            self.__ahydrate(User.objects.filter(is_active=True), ids["People"]),
+            self.__ahydrate_rows(post_rows(self.__visible_posts()), ids["Posts"]),
+            self.__ahydrate(Subforum.objects.filter(status="approved"), ids["Subforums"]),
+        )
         return {"People": people, "Posts": posts, "Subforums": subforums}
 
-    
     #private
     def __text(self, data):
-        return data.get("searchText", "").strip()
+        return " ".join(data.get("searchText", "").split()).lower()
+
+    def __page_number(self, data):
+        try:
+            return max(1, int(data.get("page", 1)))
+        except (TypeError, ValueError):
+            return 1
+
+    def __cache_key(self):
+        digest = hashlib.sha1(self.__data.encode()).hexdigest()
+        return f"{digest}:{self.__page}"
+
+    def __search_ids(self):
+        return {
+            "People": self.__page_ids(self.__search_users()),
+            "Posts": self.__page_ids(self.__search_posts()),
+            "Subforums": self.__page_ids(self.__search_subforums()),
+        }
+
+    def __page_ids(self, queryset):
+        offset = (self.__page - 1) * self.PAGE_SIZE
+        return list(queryset.values_list("id", flat=True)[offset:offset + self.PAGE_SIZE])
+
+    async def __asearch_ids(self):
+        people, posts, subforums = await asyncio.gather(
+            self.__apage_ids(self.__search_users()),
+            self.__apage_ids(self.__search_posts()),
+            self.__apage_ids(self.__search_subforums()),
+        )
+        return {"People": people, "Posts": posts, "Subforums": subforums}
+
+    async def __apage_ids(self, queryset):
+        offset = (self.__page - 1) * self.PAGE_SIZE
+        return [pk async for pk in queryset.values_list("id", flat=True)[offset:offset + self.PAGE_SIZE]]
+
+    def __hydrate(self, queryset, ids):
+        #Visibility is re-checked here, so a cached id that is no longer visible drops out
+        rows = queryset.in_bulk(ids)
+        return [rows[pk] for pk in ids if pk in rows]
+
+    async def __ahydrate(self, queryset, ids):
+        rows = await queryset.ain_bulk(ids)
+        return [rows[pk] for pk in ids if pk in rows]
+
+    async def __ahydrate_rows(self, queryset, ids):
+        rows = {row["id"]: row async for row in queryset.filter(id__in=ids)}
+        return [rows[pk] for pk in ids if pk in rows]
+
+    def __visible_posts(self):
+        return Post.objects.filter(Q(subforum__isnull=True) | Q(subforum__status="approved"))
 
     def __search_users(self):
-        return User.objects.filter(username__icontains=self.__data)
+        return User.objects.filter(username__icontains=self.__data, is_active=True).order_by("username")
 
     def __search_posts(self):
-        return Post.objects.filter(
+        return self.__visible_posts().filter(
             Q(title__icontains=self.__data) |
             Q(body__icontains=self.__data) |
             Q(user__username__icontains=self.__data)
-        )
+        ).order_by("-created_at", "-id")
     
     def __search_subforums(self):
-        return Subforum.objects.filter(name__icontains=self.__data)
+        return Subforum.objects.filter(name__icontains=self.__data, status="approved").order_by("-subscriber_count", "id")
 
 #Allows a user to reset password
 class ResetPassService:
@@ -204,13 +276,7 @@ class LikeService:
         return self.__send_like()
     
     def __send_like(self):
-        like, created = Likes.objects.get_or_create(post_id=self.__postID, user=self.__user)
-        print("liked: ", like)
-        print("created: ", created)
-        if not created:
-            like.delete()
-            return False
-        return True
+        return toggle(Likes, self.__postID, self.__user.id)
     
 #Allows you to delete your comment made on a post
 class CommentService:
@@ -251,11 +317,35 @@ class SaveService:
         return self.__save()
 
     def __save(self):
-        saved, created = SavePost.objects.get_or_create(post_id=self.__postID, user=self.__user)
-        if not created:
-            saved.delete()
-            return False
-        return True
+        return toggle(SavePost, self.__postID, self.__user.id)
+
+#A user's saved posts, most recently saved first, one keyset page at a time
+#Walks the (user, created_at) index, then hydrates the page's posts in one batch
+class SavedPostsService:
+    PAGE_SIZE = 20
+
+    def __init__(self, user, request=None):
+        self.__user = user
+        self.__request = request
+
+    #public
+    def page(self, cursor=None):
+        saves = SavePost.objects.filter(user=self.__user).values('id', 'post_id', 'created_at')
+        saves, next_cursor = KeysetPaginator(saves, ('-created_at', '-id'), self.PAGE_SIZE).paginate(cursor)
+        return self.__hydrate(saves), next_cursor
+
+    #private
+    def __hydrate(self, saves):
+        rows = {row['id']: row for row in post_rows(Post.objects.filter(id__in=[save['post_id'] for save in saves]))}
+        projection = PostProjection(rows.values(), self.__user, self.__request).load()
+        posts = []
+        for save in saves:
+            row = rows.get(save['post_id'])
+            if row is not None:
+                post = projection.post(row)
+                post['saved_at'] = timestamp(save['created_at'])
+                posts.append(post)
+        return posts
     
 #Allows you to follow a user 
 class FollowService:
@@ -330,18 +420,19 @@ class SubforumService:
         
         stats,_ = SubforumStat.objects.get_or_create(subforum=subforum)
         now = timezone.now()
-        today = now.replace(hour=0,minute=0,second=0,microsecond=0)
         week = now - timedelta(days=7)
 
-        posts = Post.objects.filter(subforum=subforum)
-        stats.posts_today = posts.filter(created_at__gte=today).count()
-        stats.posts_this_week = posts.filter(created_at__gte=week).count()
-        stats.total_posts = posts.count()
+        #Daily/weekly figures come from the hourly activity buckets, not a rescan
+        activity = ActivityService(subforum.id)
+        summary = activity.summary(now)
+        stats.posts_today = summary['posts_today']
+        stats.comments_today = summary['comments_today']
+        stats.new_subscribers_today = summary['new_subscribers_today']
+        stats.posts_this_week = summary['posts_this_week']
+        stats.total_posts = subforum.post_count
+        stats.total_comments = activity.total_comments()
 
         comments = Comments.objects.filter(post__subforum=subforum)
-        stats.comments_today = comments.filter(created_at__gte=today).count()
-        stats.total_comments = comments.count()
-
         active_users = (comments.filter(created_at__gte=week).values("user").distinct().count())
         stats.active_users_this_week = active_users
 
@@ -0,0 +1,220 @@
+import gzip
+import json
+from urllib.parse import urljoin
+from django.conf import settings
+from django.core.cache import caches
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.response import Response
+from forum.models import Post, Subforum, Likes, SavePost, SubforumSubscription
+from forum.renderers import FastJSONRenderer
+from .background import background
+from .permissions import PermissionService
+from .projection import PostProjection, post_rows
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+PER_PAGE = 20
+MAX_ORIGINS = 5
+
+#Precomputed feed pages: the home feed and the first FORUM_SNAPSHOT_PAGES pages of
+#each subforum are stored as rendered JSON plus gzip (and brotli) bytes, built for no
+#viewer in particular. A viewer with no likes, saves, subscriptions or moderator roles
+#on the page gets the stored bytes as is; anyone else gets them with their flags merged.
+#Writes in a scope bump its version and queue a rebuild on the background worker
+class FeedSnapshot:
+    def __init__(self, subforum_id=None, page=1):
+        self.__subforumID = subforum_id
+        self.__page = page
+
+    #public
+    @staticmethod
+    def applies(request, page=1, per_page=PER_PAGE):
+        pages = getattr(settings, 'FORUM_SNAPSHOT_PAGES', 3)
+        renderer = getattr(request, 'accepted_renderer', None)
+        return pages > 0 and 1 <= page <= pages and per_page == PER_PAGE and getattr(renderer, 'format', None) == 'json'
+
+    def respond(self, request):
+        remember_origin(request)
+        entry = self.__entry(request)
+        if entry is None:
+            return None
+        flags = viewer_flags(request.user, entry['post_ids'], entry['subforum_ids'])
+        if any(flags.values()):
+            return Response(apply_flags(json.loads(entry['identity']), flags))
+        return encoded_response(request, entry)
+
+    def build(self, request):
+        """Stores the viewer-neutral page for this request's origin; None if the page does not exist"""
+        #Keyed by the version read before the page, so a write landing mid-build leaves it under the old version
+        key = self.__key(origin(request))
+        if self.__subforumID is None:
+            data = home_feed(request, None)
+        else:
+            data = subforum_page(self.__subforumID, self.__page, PER_PAGE, request, None)
+            if data['page'] != self.__page:
+                return None
+        posts = data if isinstance(data, list) else data['posts']
+        identity = FastJSONRenderer().render(data)
+        entry = {
+            'post_ids': [post['id'] for post in posts],
+            'subforum_ids': sorted({post['subforum']['id'] for post in posts if post['subforum']} | (
+                {self.__subforumID} if self.__subforumID else set()
+            )),
+            'identity': identity,
+            'gzip': gzip.compress(identity, compresslevel=6),
+        }
+        if brotli is not None:
+            entry['br'] = brotli.compress(identity, quality=5)
+        backend().set(key, entry, timeout())
+        return entry
+
+    #private
+    def __entry(self, request):
+        entry = backend().get(self.__key(origin(request)))
+        return entry if entry is not None else self.build(request)
+
+    def __key(self, request_origin):
+        return f"snapshot:{scope(self.__subforumID)}:v{scope_version(self.__subforumID)}:{request_origin}:{self.__page}"
+
+
+#Stands in for a request when a rebuild renders pages outside any request
+#The projection only needs it to make media URLs absolute
+class OriginRequest:
+    def __init__(self, request_origin):
+        self.__origin = request_origin
+        self.scheme, self.__host = request_origin.split('://', 1)
+
+    #public
+    def get_host(self):
+        return self.__host
+
+    def build_absolute_uri(self, location):
+        return urljoin(f"{self.__origin}/", location)
+
+
+def home_feed(request, user):
+    rows = post_rows(Post.objects.filter(subforum__isnull=True))
+    return PostProjection(rows, user, request).load().posts()
+
+
+def subforum_page(subforum_id, page, per_page, request, user):
+    posts = post_rows(Post.objects.filter(subforum_id=subforum_id).order_by('-created_at'))
+    paginator = Paginator(posts, per_page)
+    try:
+        posts_page = paginator.page(page)
+    except PageNotAnInteger:
+        posts_page = paginator.page(1)
+    except EmptyPage:
+        posts_page = paginator.page(paginator.num_pages)
+    projection = PostProjection(posts_page.object_list, user, request, subforum_ids=[subforum_id]).load()
+    return {
+        'subforum': projection.subforum(subforum_id),
+        'posts': projection.posts(),
+        'page': posts_page.number,
+        'total_pages': paginator.num_pages,
+        'total_posts': paginator.count
+    }
+
+
+def viewer_flags(user, post_ids, subforum_ids):
+    moderated = PermissionService(user).moderator_map()
+    return {
+        'liked': set(Likes.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True)),
+        'saved': set(SavePost.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True)),
+        'subscribed': set(SubforumSubscription.objects.filter(user=user, subforum_id__in=subforum_ids).values_list('subforum_id', flat=True)),
+        'moderated': {subforum_id for subforum_id in subforum_ids if subforum_id in moderated},
+    }
+
+
+def apply_flags(data, flags):
+    def subforum_flags(subforum):
+        subforum['is_subscribed'] = subforum['id'] in flags['subscribed']
+        subforum['is_moderator'] = subforum['id'] in flags['moderated']
+
+    for post in data if isinstance(data, list) else data['posts']:
+        post['liked'] = post['id'] in flags['liked']
+        post['saved'] = post['id'] in flags['saved']
+        if post['subforum']:
+            subforum_flags(post['subforum'])
+    if isinstance(data, dict):
+        subforum_flags(data['subforum'])
+    return data
+
+
+def encoded_response(request, entry):
+    accepted = {part.split(';')[0].strip() for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')}
+    encoding = next((name for name in ('br', 'gzip') if name in accepted and name in entry), None)
+    response = HttpResponse(entry[encoding] if encoding else entry['identity'], content_type='application/json')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(response.content))
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def rebuild(subforum_id):
+    #Prewarms every page for the origins that have asked for snapshots recently
+    backend().delete(pending_key(subforum_id))
+    if subforum_id is not None and not Subforum.objects.filter(id=subforum_id, status='approved').exists():
+        return
+    pages = [1] if subforum_id is None else range(1, getattr(settings, 'FORUM_SNAPSHOT_PAGES', 3) + 1)
+    for request_origin in backend().get('snapshot:origins', []):
+        request = OriginRequest(request_origin)
+        for page in pages:
+            if FeedSnapshot(subforum_id, page).build(request) is None:
+                break
+
+
+def invalidate(subforum_id):
+    """Drops a scope's snapshots once the current transaction commits and queues their rebuild"""
+    transaction.on_commit(lambda: bump(subforum_id))
+
+
+def bump(subforum_id):
+    #One pending rebuild per scope; later writes only move the version on
+    cache = backend()
+    key = f"snapshot:{scope(subforum_id)}:version"
+    if not cache.add(key, 2, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+    if cache.add(pending_key(subforum_id), 1, 60):
+        background.submit(rebuild, subforum_id)
+
+
+def scope(subforum_id):
+    return 'home' if subforum_id is None else f"subforum:{subforum_id}"
+
+
+def scope_version(subforum_id):
+    return backend().get(f"snapshot:{scope(subforum_id)}:version", 1)
+
+
+def pending_key(subforum_id):
+    return f"snapshot:{scope(subforum_id)}:pending"
+
+
+def origin(request):
+    return f"{request.scheme}://{request.get_host()}"
+
+
+def remember_origin(request):
+    cache = backend()
+    origins = cache.get('snapshot:origins', [])
+    request_origin = origin(request)
+    if request_origin not in origins:
+        cache.set('snapshot:origins', ([request_origin] + origins)[:MAX_ORIGINS], None)
+
+
+def timeout():
+    return getattr(settings, 'FORUM_SNAPSHOT_TIMEOUT', 300)
+
+
+def backend():
+    return caches[getattr(settings, 'FORUM_CACHE_ALIAS', 'default')]
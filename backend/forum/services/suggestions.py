@@ -0,0 +1,206 @@
+import heapq
+from array import array
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import Lower, RowNumber, Trim
+from forum.models import FollowPerson, FollowSuggestion, Student, Faculty
+
+TOP_K = 20
+#A shared major/department is worth this many mutual follows
+AFFINITY_WEIGHT = 1.5
+#Only this many accounts each followed account follows are expanded (bounds hub cost)
+FANOUT_LIMIT = 500
+#Same-group accounts considered as fillers when friends-of-friends run short
+GROUP_FILL = 50
+CHUNK_SIZE = 500
+
+#Follow graph in compressed sparse row form: user ids map to dense indexes, and the
+#accounts user i follows are targets[offsets[i]:offsets[i + 1]]. Built once per batch run
+class FollowGraph:
+    def __init__(self):
+        self.__index = {}
+        self.__ids = array('q')
+        self.__offsets = array('l', [0])
+        self.__targets = array('l')
+        self.__indegree = array('l')
+
+    #public
+    @classmethod
+    def load(cls):
+        graph = cls()
+        followers, followings = array('q'), array('q')
+        edges = FollowPerson.objects.order_by('follower_id', 'id').values_list('follower_id', 'following_id')
+        for follower_id, following_id in edges.iterator(chunk_size=10000):
+            followers.append(follower_id)
+            followings.append(following_id)
+        #Followers are numbered first, in edge order, so their rows are contiguous
+        for follower_id in followers:
+            graph.node(follower_id)
+        for follower_id, following_id in zip(followers, followings):
+            graph.__close_rows(graph.node(follower_id))
+            following = graph.node(following_id)
+            graph.__targets.append(following)
+            graph.__indegree[following] += 1
+        graph.__close_rows(len(graph.__index))
+        return graph
+
+    def node(self, user_id):
+        index = self.__index.get(user_id)
+        if index is None:
+            index = self.__index[user_id] = len(self.__ids)
+            self.__ids.append(user_id)
+            self.__indegree.append(0)
+        return index
+
+    def user_ids(self):
+        return self.__ids
+
+    def following(self, user_id):
+        index = self.__index.get(user_id)
+        if index is None or index + 1 >= len(self.__offsets):
+            return []
+        return [self.__ids[target] for target in self.__targets[self.__offsets[index]:self.__offsets[index + 1]]]
+
+    def indegree(self, user_id):
+        index = self.__index.get(user_id)
+        return self.__indegree[index] if index is not None else 0
+
+    def mutual_counts(self, user_id):
+        counts = Counter()
+        for followed in self.following(user_id):
+            counts.update(self.following(followed)[:FANOUT_LIMIT])
+        return counts
+
+    #private
+    def __close_rows(self, upto):
+        #Rows are appended in follower order; users with no follows get empty rows
+        while len(self.__offsets) <= upto:
+            self.__offsets.append(len(self.__targets))
+
+
+#Friend-of-friend follow suggestions: the batch job ranks everyone from one in-memory
+#FollowGraph, a follow re-ranks just the follower from the database, and reads are one
+#indexed (user, rank) fetch of FollowSuggestion
+class SuggestionService:
+    def __init__(self, user):
+        self.__user = user
+
+    #public
+    def suggestions(self, limit=TOP_K):
+        return list(
+            FollowSuggestion.objects.filter(user=self.__user, suggested__is_active=True).order_by('rank').values(
+                'suggested_id', 'suggested__username', 'suggested__first_name', 'suggested__last_name',
+                'mutual_count', 'same_group', 'score',
+            )[:limit]
+        )
+
+    def refresh(self):
+        """Re-ranks this user from the current follow table (after they follow or unfollow)"""
+        user_id = getattr(self.__user, 'id', self.__user)
+        following = list(FollowPerson.objects.filter(follower_id=user_id).values_list('following_id', flat=True))
+        #Same FANOUT_LIMIT as the batch graph: each followed account's first follows by id
+        mutuals = Counter(
+            FollowPerson.objects.filter(follower_id__in=following)
+            .annotate(position=Window(RowNumber(), partition_by=F('follower_id'), order_by=F('id').asc()))
+            .filter(position__lte=FANOUT_LIMIT).values_list('following_id', flat=True)
+        )
+        groups = Groups.for_users([user_id])
+        fillers = groups.popular_members(groups.of(user_id), GROUP_FILL)
+        groups = Groups.for_users([user_id, *mutuals, *fillers])
+        store({user_id: rank(user_id, following, mutuals, groups, fillers)}, replace=[user_id])
+
+
+#Major (students) or department (faculty) per user, compared case-insensitively
+class Groups:
+    def __init__(self, groups):
+        self.__groups = groups
+
+    #public
+    @classmethod
+    def for_users(cls, user_ids=None):
+        groups = {}
+        for model, field in ((Student, 'major'), (Faculty, 'department')):
+            rows = model.objects.all() if user_ids is None else model.objects.filter(user_id__in=user_ids)
+            for user_id, name in rows.values_list('user_id', field):
+                if name and name.strip():
+                    groups[user_id] = f"{field}:{name.strip().lower()}"
+        return cls(groups)
+
+    def of(self, user_id):
+        return self.__groups.get(user_id)
+
+    def members(self):
+        by_group = {}
+        for user_id, group in self.__groups.items():
+            by_group.setdefault(group, []).append(user_id)
+        return by_group
+
+    @staticmethod
+    def popular_members(group, limit, indegree=None, members=None):
+        """The most-followed accounts in a group"""
+        if group is None:
+            return []
+        if members is not None:
+            return heapq.nlargest(limit, members, key=lambda user_id: (indegree(user_id), -user_id))
+        field, name = group.split(':', 1)
+        model = Student if field == 'major' else Faculty
+        return list(
+            model.objects.annotate(group=Lower(Trim(field))).filter(group=name)
+            .annotate(followers=Count('user__followers')).order_by('-followers', 'user_id').values_list('user_id', flat=True)[:limit]
+        )
+
+
+def rank(user_id, following, mutuals, groups, fillers, k=TOP_K):
+    """Top-k (suggested id, mutual count, same group, score), best first"""
+    excluded = set(following) | {user_id}
+    group = groups.of(user_id)
+    candidates = {}
+    for candidate, mutual in mutuals.items():
+        if candidate not in excluded:
+            same = group is not None and groups.of(candidate) == group
+            candidates[candidate] = (mutual, same, mutual + (AFFINITY_WEIGHT if same else 0))
+    for position, candidate in enumerate(fillers):
+        if candidate not in excluded and candidate not in candidates:
+            #Popularity order breaks ties among group members with no mutual follows
+            candidates[candidate] = (0, True, AFFINITY_WEIGHT - position / (len(fillers) * 10))
+    best = heapq.nsmallest(k, candidates.items(), key=lambda item: (-item[1][2], item[0]))
+    return [(candidate, mutual, same, score) for candidate, (mutual, same, score) in best]
+
+
+def store(ranked, replace):
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user_id__in=replace).delete()
+        FollowSuggestion.objects.bulk_create([
+            FollowSuggestion(user_id=user_id, suggested_id=suggested, rank=position, score=score, mutual_count=mutual, same_group=same)
+            for user_id, rows in ranked.items()
+            for position, (suggested, mutual, same, score) in enumerate(rows)
+        ])
+
+
+def rebuild(k=TOP_K):
+    """Recomputes every user's suggestions from one load of the follow graph; returns users ranked"""
+    graph = FollowGraph.load()
+    groups = Groups.for_users()
+    members = groups.members()
+    user_ids = set(graph.user_ids())
+    for group_members in members.values():
+        user_ids.update(group_members)
+    fillers = {
+        group: Groups.popular_members(group, GROUP_FILL, graph.indegree, group_members)
+        for group, group_members in members.items()
+    }
+    ranked = {}
+    for user_id in sorted(user_ids):
+        ranked[user_id] = rank(user_id, graph.following(user_id), graph.mutual_counts(user_id), groups, fillers.get(groups.of(user_id), []), k)
+        if len(ranked) >= CHUNK_SIZE:
+            store(ranked, replace=list(ranked))
+            ranked = {}
+    if ranked:
+        store(ranked, replace=list(ranked))
+    FollowSuggestion.objects.exclude(user_id__in=user_ids).delete()
+    return len(user_ids)
+
+
+def refresh_user(user_id):
+    SuggestionService(user_id).refresh()
@@ -0,0 +1,148 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+from forum.models import ChangeLog, Post, Comments, Likes, SavePost, SubforumSubscription
+from .projection import PostProjection, post_rows, timestamp
+
+COMMENT_VALUES = ('id', 'post_id', 'user_id', 'user__first_name', 'user__last_name', 'user__username', 'body', 'created_at', 'updated_at')
+
+#Delta sync: every write that changes what a feed shows appends a ChangeLog row, and a
+#client holding a watermark (the last row id it saw) gets back only what changed since,
+#limited to its scopes: the home feed, its subscribed subforums and its own saves.
+#Watermarks older than the retained log get a "resync" answer instead of a partial delta
+class SyncService:
+    def __init__(self, user, request=None):
+        self.__user = user
+        self.__request = request
+
+    #public
+    def changes(self, watermark):
+        latest = latest_watermark()
+        #Unknown, pruned-past or ahead-of-the-log (e.g. restored database) watermarks start over
+        if watermark is None or watermark < oldest_watermark() or watermark > latest:
+            return {'resync': True, 'watermark': latest}
+        limit = max_changes()
+        rows = list(self.__scoped(ChangeLog.objects.filter(id__gt=watermark)).order_by('id')[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if has_more:
+            latest = rows[-1].id
+        elif rows:
+            latest = max(latest, rows[-1].id)
+        return dict(self.__payload(rows), resync=False, watermark=latest, has_more=has_more)
+
+    #private
+    def __scoped(self, changes):
+        subscribed = SubforumSubscription.objects.filter(user=self.__user).values('subforum_id')
+        public = Q(user_id__isnull=True) & (Q(subforum_id__isnull=True) | Q(subforum_id__in=subscribed))
+        return changes.filter(public | Q(user_id=self.__user.id))
+
+    def __payload(self, rows):
+        #Only the latest state matters, so a row just marks its object as touched
+        posts, comments = {}, {}
+        liked_posts, saved_posts = set(), set()
+        for row in rows:
+            if row.kind == 'post':
+                posts[row.object_id] = row.deleted
+            elif row.kind == 'comment':
+                comments[row.object_id] = row.deleted
+            elif row.kind == 'like':
+                liked_posts.add(row.object_id)
+            elif row.kind == 'save':
+                saved_posts.add(row.object_id)
+
+        comment_rows = list(
+            Comments.objects.filter(id__in=[pk for pk, deleted in comments.items() if not deleted]).order_by('id').values(*COMMENT_VALUES)
+        )
+        projection = PostProjection(
+            post_rows(Post.objects.filter(id__in=[pk for pk, deleted in posts.items() if not deleted]).order_by('-created_at')),
+            self.__user, self.__request, author_ids=[comment['user_id'] for comment in comment_rows]
+        ).load()
+        changed_posts = projection.posts()
+        changed_comments = [
+            {
+                'id': comment['id'],
+                'post_id': comment['post_id'],
+                'author': projection.author(comment['user_id'], comment['user__first_name'], comment['user__last_name'], comment['user__username']),
+                'body': comment['body'],
+                'created_at': timestamp(comment['created_at']),
+                'updated_at': timestamp(comment['updated_at']),
+            }
+            for comment in comment_rows
+        ]
+        #Anything touched but gone by now is reported as deleted too
+        deleted_posts = set(posts) - {post['id'] for post in changed_posts}
+        deleted_comments = set(comments) - {comment['id'] for comment in changed_comments}
+
+        counted = (liked_posts - set(posts)) - deleted_posts
+        like_counts = dict(
+            Likes.objects.filter(post_id__in=counted).values('post_id').annotate(total=Count('id')).values_list('post_id', 'total')
+        )
+        liked = set(Likes.objects.filter(user=self.__user, post_id__in=counted).values_list('post_id', flat=True))
+        saved = set(SavePost.objects.filter(user=self.__user, post_id__in=saved_posts).values_list('post_id', flat=True))
+        return {
+            'posts': changed_posts,
+            'comments': changed_comments,
+            'likes': [
+                {'post_id': post_id, 'like_amt': like_counts.get(post_id, 0), 'liked': post_id in liked}
+                for post_id in sorted(counted)
+            ],
+            'saves': [{'post_id': post_id, 'saved': post_id in saved} for post_id in sorted(saved_posts)],
+            'deleted': {'posts': sorted(deleted_posts), 'comments': sorted(deleted_comments)},
+        }
+
+
+def record(kind, object_id, post_id=None, subforum_id=None, user_id=None, deleted=False):
+    ChangeLog.objects.create(
+        kind=kind, object_id=object_id, post_id=post_id, subforum_id=subforum_id, user_id=user_id, deleted=deleted
+    )
+
+
+def record_deleted_posts(rows):
+    """Tombstones for posts removed without signals; rows are (post id, subforum id) pairs"""
+    ChangeLog.objects.bulk_create([
+        ChangeLog(kind='post', object_id=post_id, post_id=post_id, subforum_id=subforum_id, deleted=True)
+        for post_id, subforum_id in rows
+    ])
+
+
+def record_deleted_comments(comment_ids):
+    """Tombstones for comments removed without signals"""
+    rows = Comments.objects.filter(id__in=comment_ids).values_list('id', 'post_id', 'post__subforum_id')
+    ChangeLog.objects.bulk_create([
+        ChangeLog(kind='comment', object_id=comment_id, post_id=post_id, subforum_id=subforum_id, deleted=True)
+        for comment_id, post_id, subforum_id in rows
+    ])
+
+
+def record_deleted_likes(post_ids):
+    """Like changes for posts whose likes were removed without signals"""
+    rows = Post.objects.filter(id__in=set(post_ids)).values_list('id', 'subforum_id')
+    ChangeLog.objects.bulk_create([
+        ChangeLog(kind='like', object_id=post_id, post_id=post_id, subforum_id=subforum_id)
+        for post_id, subforum_id in rows
+    ])
+
+
+def prune(hours=None):
+    """Drops changes older than the retention window, always keeping the newest row"""
+    if hours is None:
+        hours = getattr(settings, 'FORUM_SYNC_RETENTION_HOURS', 72)
+    latest = latest_watermark()
+    deleted, _ = ChangeLog.objects.filter(created_at__lt=timezone.now() - timedelta(hours=hours), id__lt=latest).delete()
+    return deleted
+
+
+def latest_watermark():
+    return ChangeLog.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def oldest_watermark():
+    #A client is complete up to its watermark only if nothing after it was pruned
+    oldest = ChangeLog.objects.order_by('id').values_list('id', flat=True).first()
+    return oldest - 1 if oldest else 0
+
+
+def max_changes():
+    return getattr(settings, 'FORUM_SYNC_MAX_CHANGES', 500)
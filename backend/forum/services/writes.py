@@ -0,0 +1,102 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from forum import routers
+
+RESULT_TIMEOUT = 10
+
+logger = logging.getLogger(__name__)
+
+#Single writer thread for hot, tiny writes (like/save toggles)
+#SQLite allows one writer at a time; instead of every request thread fighting for the
+#lock, queued writes are drained in batches and committed together in one transaction.
+#Each write gets its own savepoint, so one failure does not undo the rest of the batch
+class WriteQueue:
+    def __init__(self, name):
+        self.__name = name
+        self.__queue = queue.SimpleQueue()
+        self.__worker = None
+        self.__lock = threading.Lock()
+
+    #public
+    def submit(self, func, *args):
+        future = Future()
+        if getattr(settings, 'FORUM_BACKGROUND_SYNC', False):
+            try:
+                future.set_result(func(*args))
+            except Exception as error:
+                future.set_exception(error)
+            return future
+        self.__ensure_worker()
+        self.__queue.put((future, func, args))
+        return future
+
+    #private
+    def __ensure_worker(self):
+        if self.__worker is not None and self.__worker.is_alive():
+            return
+        with self.__lock:
+            if self.__worker is None or not self.__worker.is_alive():
+                self.__worker = threading.Thread(target=self.__run, name=self.__name, daemon=True)
+                self.__worker.start()
+
+    def __run(self):
+        while True:
+            batch = [self.__queue.get()]
+            limit = getattr(settings, 'FORUM_WRITE_QUEUE_BATCH', 100)
+            while len(batch) < limit:
+                try:
+                    batch.append(self.__queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.__commit(batch)
+            finally:
+                close_old_connections()
+
+    def __commit(self, batch):
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for future, func, args in batch:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, func(*args), None))
+                    except Exception as error:
+                        outcomes.append((future, None, error))
+        except Exception as error:
+            #The commit itself failed; nothing in the batch was written
+            logger.exception("Write batch of %s failed", len(batch))
+            for future, _, _ in batch:
+                future.set_exception(error)
+            return
+        #Results are only released once they are durable
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+write_queue = WriteQueue("forum-writer")
+
+
+def toggle_now(model, post_id, user_id):
+    """Deletes the (post, user) row if it exists, else creates it; True when created"""
+    deleted, _ = model.objects.filter(post_id=post_id, user_id=user_id).delete()
+    if deleted:
+        return False
+    model.objects.create(post_id=post_id, user_id=user_id)
+    return True
+
+
+def toggle(model, post_id, user_id):
+    if getattr(settings, 'FORUM_WRITE_QUEUE', False):
+        #The writer thread does not see this request's routing state, so pin the user's next reads here
+        routers.mark_written()
+        return write_queue.submit(toggle_now, model, post_id, user_id).result(timeout=RESULT_TIMEOUT)
+    with transaction.atomic():
+        return toggle_now(model, post_id, user_id)
@@ -0,0 +1,219 @@
+from django.core.signals import request_started
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.db import transaction
+from django.db.models import QuerySet
+from django.contrib.auth.models import User
+from .models import Subforum, SubforumTag, SubforumTagging, SubforumModerator, SubforumSubscription, SubforumReport, Post, Comments, Likes, SavePost, FollowPerson
+from .services import directory, permissions, snapshots, sync, ranking
+from .services.counters import CounterService
+from .services.activity import ActivityService
+from .services.moderation import ModerationQueueService
+from .services.duplicates import duplicate_index, post_text
+from .services.suggestions import refresh_user
+from .services.background import background
+from .services.cache import subforum_tags_cache, approved_subforums_cache, moderators_cache, directory_cache, search_cache
+
+#Keeps denormalized/cached data in step with the tables it is derived from
+
+@receiver(post_init, sender=Subforum)
+def remember_subforum_status(sender, instance, **kwargs):
+    instance._loaded_status = instance.status
+
+
+@receiver(post_save, sender=Subforum)
+def subforum_saved(sender, instance, created, **kwargs):
+    previous = None if created else instance._loaded_status
+    if (previous == 'approved') != (instance.status == 'approved'):
+        tag_ids = list(instance.tags.values_list('tag_id', flat=True))
+        directory.adjust_tag_counts(tag_ids, 1 if instance.status == 'approved' else -1)
+    instance._loaded_status = instance.status
+    directory.index_subforum(instance)
+    approved_subforums_cache.invalidate()
+    directory_cache.invalidate()
+
+
+@receiver(post_delete, sender=Subforum)
+def subforum_deleted(sender, instance, **kwargs):
+    approved_subforums_cache.invalidate()
+    directory_cache.invalidate()
+
+
+@receiver(post_save, sender=SubforumTag)
+@receiver(post_delete, sender=SubforumTag)
+def tag_changed(sender, instance, **kwargs):
+    subforum_tags_cache.invalidate()
+    directory_cache.invalidate()
+
+
+@receiver(post_save, sender=SubforumTagging)
+def tagging_saved(sender, instance, created, **kwargs):
+    if created and Subforum.objects.filter(id=instance.subforum_id, status='approved').exists():
+        directory.adjust_tag_counts([instance.tag_id], 1)
+    directory_cache.invalidate()
+
+
+@receiver(post_delete, sender=SubforumTagging)
+def tagging_deleted(sender, instance, **kwargs):
+    if Subforum.objects.filter(id=instance.subforum_id, status='approved').exists():
+        directory.adjust_tag_counts([instance.tag_id], -1)
+    directory_cache.invalidate()
+
+
+@receiver(post_save, sender=SubforumModerator)
+@receiver(post_delete, sender=SubforumModerator)
+def moderator_changed(sender, instance, **kwargs):
+    moderators_cache.delete(instance.subforum_id)
+    permissions.invalidate_user(instance.user_id)
+    directory_cache.invalidate()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        CounterService.incr(instance.subforum_id, 'post_count', 1)
+        if instance.subforum_id:
+            ActivityService(instance.subforum_id).record('posts', at=instance.created_at)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    CounterService.incr(instance.subforum_id, 'post_count', -1)
+
+
+@receiver(post_save, sender=SubforumSubscription)
+def subscription_saved(sender, instance, created, **kwargs):
+    if created:
+        CounterService.incr(instance.subforum_id, 'subscriber_count', 1)
+        ActivityService(instance.subforum_id).record('new_subscribers', at=instance.created_at)
+
+
+@receiver(post_delete, sender=SubforumSubscription)
+def subscription_deleted(sender, instance, **kwargs):
+    CounterService.incr(instance.subforum_id, 'subscriber_count', -1)
+
+
+@receiver(request_started)
+def duplicate_index_warmed(sender, **kwargs):
+    #The first request a process serves queues the index load; later ones return at once
+    duplicate_index.warm()
+
+
+@receiver(post_save, sender=Post)
+def post_duplicate_indexed(sender, instance, **kwargs):
+    duplicate_index.add(('post', instance.id), post_text(instance.title, instance.body), instance.created_at)
+
+
+@receiver(post_save, sender=Comments)
+def comment_duplicate_indexed(sender, instance, **kwargs):
+    duplicate_index.add(('comment', instance.id), instance.body, instance.created_at)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comments)
+def duplicate_source_deleted(sender, instance, **kwargs):
+    duplicate_index.remove(('post' if sender is Post else 'comment', instance.id))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_synced(sender, instance, **kwargs):
+    sync.record('post', instance.id, post_id=instance.id, subforum_id=instance.subforum_id, deleted=kwargs['signal'] is post_delete)
+
+
+@receiver(post_save, sender=Comments)
+@receiver(post_delete, sender=Comments)
+@receiver(post_save, sender=Likes)
+@receiver(post_delete, sender=Likes)
+def post_child_changed(sender, instance, **kwargs):
+    #One receiver for every like/comment write, so the post's subforum is looked up once
+    if deleted_with_post(kwargs):
+        return
+    deleted = kwargs['signal'] is post_delete
+    created = not deleted and kwargs['created']
+    subforum_id = Post.objects.filter(id=instance.post_id).values_list('subforum_id', flat=True).first()
+    if sender is Comments:
+        if created and subforum_id:
+            ActivityService(subforum_id).record('comments', at=instance.created_at)
+        sync.record('comment', instance.id, post_id=instance.post_id, subforum_id=subforum_id, deleted=deleted)
+    else:
+        sync.record('like', instance.post_id, post_id=instance.post_id, subforum_id=subforum_id)
+    #LikeService toggles and comments move the post's counts and rescore it
+    if created or deleted:
+        delta = -1 if deleted else 1
+        if sender is Likes:
+            ranking.record(instance.post_id, likes=delta)
+        else:
+            ranking.record(instance.post_id, comments=delta)
+    #like_amt/comment_amt are part of the stored feed pages
+    snapshots.invalidate(subforum_id)
+
+
+@receiver(post_save, sender=SavePost)
+@receiver(post_delete, sender=SavePost)
+def save_synced(sender, instance, **kwargs):
+    sync.record('save', instance.post_id, post_id=instance.post_id, user_id=instance.user_id)
+
+
+@receiver(post_save, sender=FollowPerson)
+@receiver(post_delete, sender=FollowPerson)
+def follow_changed(sender, instance, **kwargs):
+    #Only the follower's friends-of-friends changed enough to re-rank now; the batch job catches the rest.
+    #After commit, so the worker reads the new follow and a rolled-back one is never ranked
+    transaction.on_commit(lambda: background.submit(refresh_user, instance.follower_id))
+
+
+@receiver(post_save, sender=Post)
+def post_ranked(sender, instance, created, **kwargs):
+    if created:
+        ranking.record(instance.id)
+
+
+@receiver(post_save, sender=SubforumReport)
+def report_saved(sender, instance, created, **kwargs):
+    if created and instance.status == 'pending':
+        ModerationQueueService.record(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_snapshot_changed(sender, instance, **kwargs):
+    snapshots.invalidate(instance.subforum_id)
+
+
+@receiver(post_save, sender=Subforum)
+@receiver(post_delete, sender=Subforum)
+@receiver(post_save, sender=SubforumSubscription)
+@receiver(post_delete, sender=SubforumSubscription)
+@receiver(post_save, sender=SubforumModerator)
+@receiver(post_delete, sender=SubforumModerator)
+@receiver(post_save, sender=SubforumTagging)
+@receiver(post_delete, sender=SubforumTagging)
+def subforum_snapshot_changed(sender, instance, **kwargs):
+    snapshots.invalidate(instance.id if sender is Subforum else instance.subforum_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Subforum)
+@receiver(post_delete, sender=Subforum)
+@receiver(post_delete, sender=User)
+def search_source_changed(sender, **kwargs):
+    search_cache.invalidate()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, update_fields=None, **kwargs):
+    #Logins only touch last_login, which search never reads
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    search_cache.invalidate()
+
+
+def deleted_with_post(kwargs):
+    #Likes and comments removed by their post's cascade: the post's own post_delete
+    #(tombstone, snapshot bump) covers them, and there is nothing left to rescore
+    if kwargs['signal'] is not post_delete:
+        return False
+    origin = kwargs.get('origin')
+    return isinstance(origin, Post) or (isinstance(origin, QuerySet) and origin.model is Post)
@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from forum.models import Student, Subforum
+
+SPAM = "Cheap textbooks for sale, message me on telegram at bookdeals4u for the best campus prices"
+
+
+#A student (self.user, client self.c) and a staff member (self.staff, client self.a).
+#Background jobs run inline, so nothing outlives a test on the worker thread
+@override_settings(FORUM_BACKGROUND_SYNC=True)
+class ForumTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('u1', 'u1@wayne.edu', 'pw')
+        self.staff = User.objects.create_user('admin', 'a@wayne.edu', 'pw', is_staff=True)
+        Student.objects.create(user=self.user, major='CS', classification='Senior')
+        self.c = APIClient()
+        self.c.force_authenticate(self.user)
+        self.a = APIClient()
+        self.a.force_authenticate(self.staff)
+
+    def subforum(self, name, status='approved', creator=None, **fields):
+        fields.setdefault('description', f'{name} desc')
+        return Subforum.objects.create(name=name, creator=creator or self.staff, status=status, **fields)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.test import override_settings
+from django.utils import timezone
+
+from forum.models import Comments, Post, SubforumActivityBucket
+from forum.services import activity
+
+from .base import ForumTestCase
+
+
+class ActivityTests(ForumTestCase):
+    def test_statistics_come_from_rollups(self):
+        subforum = self.subforum('CS')
+        self.c.post(f'/subforums/{subforum.id}/subscribe')
+        post_id = self.c.post('/posts', {'title': 't', 'body': 'b', 'subforum_id': subforum.id}, format='json').json()['id']
+        self.c.post(f'/{post_id}/comments', {'body': 'hi'}, format='json')
+        self.c.post(f'/{post_id}/comments', {'body': 'hi'}, format='json')
+        stats = self.c.get(f'/subforums/{subforum.id}').json()['statistics']
+        self.assertEqual(
+            (stats['posts_today'], stats['comments_today'], stats['new_subscribers_today'], stats['total_posts'], stats['total_comments']),
+            (1, 2, 1, 1, 2),
+        )
+        self.assertEqual(SubforumActivityBucket.objects.count(), 1)
+        activity.rebuild()
+        self.assertEqual(activity.ActivityService(subforum.id).summary()['comments_today'], 2)
+
+    def test_compaction_and_admin_chart(self):
+        subforum = self.subforum('CS')
+        old = timezone.now() - timedelta(days=20)
+        activity.ActivityService(subforum.id).record('posts', at=old)
+        activity.ActivityService(subforum.id).record('posts', at=old + timedelta(hours=1))
+        self.assertEqual(activity.compact(), 2)
+        self.assertEqual(SubforumActivityBucket.objects.get(granularity='day').posts, 2)
+        self.assertEqual(len(self.a.get(f'/admin/subforums/{subforum.id}/activity', {'days': 30}).json()['days']), 1)
+        self.assertEqual(self.c.get(f'/admin/subforums/{subforum.id}/activity').status_code, 403)
+
+    @override_settings(TIME_ZONE='America/Los_Angeles')
+    def test_total_comments_and_local_days(self):
+        subforum = self.subforum('TZ')
+        post = Post.objects.create(user=self.user, subforum=subforum, title='t', body='b')
+        comment = Comments.objects.create(post=post, user=self.user, body='x')
+        self.assertEqual(activity.ActivityService(subforum.id).total_comments(), 1)
+        comment.delete()
+        self.assertEqual(activity.ActivityService(subforum.id).total_comments(), 0)
+        SubforumActivityBucket.objects.all().delete()
+        #03:00 UTC on the 10th is still the 9th in Los Angeles
+        activity.ActivityService(subforum.id).record('posts', at=datetime(2026, 3, 10, 3, tzinfo=dt_timezone.utc))
+        activity.compact(older_than_days=0)
+        bucket = SubforumActivityBucket.objects.get()
+        self.assertEqual(bucket.granularity, 'day')
+        self.assertEqual(timezone.localtime(bucket.bucket_start).date().isoformat(), '2026-03-09')
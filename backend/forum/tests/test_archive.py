@@ -0,0 +1,42 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from forum.models import Comments, Likes, Post, SavePost
+from forum.services import snapshots
+from forum.services.archive import ArchiveService
+
+from .base import ForumTestCase
+
+
+class ArchiveTests(ForumTestCase):
+    def test_moves_old_and_archived_posts(self):
+        live, archived = self.subforum('Live'), self.subforum('Old', status='archived')
+        old = Post.objects.create(user=self.user, subforum=live, title='old', body='b')
+        Post.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=400))
+        Comments.objects.create(user=self.staff, post=old, body='c')
+        Likes.objects.create(user=self.staff, post=old)
+        SavePost.objects.create(user=self.staff, post=old)
+        in_archived = Post.objects.create(user=self.user, subforum=archived, title='arch', body='b')
+        new = Post.objects.create(user=self.user, subforum=live, title='new', body='b')
+        out = StringIO()
+        call_command('archive_posts', '--chunk-size', '1', stdout=out)
+        self.assertIn('Archived 2', out.getvalue())
+        self.assertEqual(list(Post.objects.values_list('id', flat=True)), [new.id])
+        live.refresh_from_db()
+        self.assertEqual(live.post_count, 1)
+        data = self.c.get(f'/archive/posts/{old.id}').json()
+        self.assertEqual((data['like_count'], len(data['comments'])), (1, 1))
+        self.assertEqual([row['id'] for row in self.c.get(f'/subforums/{archived.id}/archive').json()['results']], [in_archived.id])
+        self.assertEqual(self.c.get('/archive/posts/9999').status_code, 404)
+        self.assertEqual(self.c.post('/search', {'searchText': 'old'}, format='json').json()['Posts'], [])
+
+    def test_archiving_invalidates_snapshots(self):
+        archived = self.subforum('Old', status='archived')
+        Post.objects.create(user=self.user, subforum=archived, title='arch', body='b')
+        version = snapshots.scope_version(archived.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            ArchiveService().run()
+        self.assertGreater(snapshots.scope_version(archived.id), version)
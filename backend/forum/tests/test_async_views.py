@@ -0,0 +1,65 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from forum.models import (
+    Comments, Faculty, Likes, Post, SavePost, SubforumModerator, SubforumSubscription, SubforumTag,
+    SubforumTagging,
+)
+from forum.services.cache import ReferenceCache
+
+from .base import ForumTestCase
+
+
+class AsyncViewTests(ForumTestCase):
+    def setUp(self):
+        super().setUp()
+        self.subforum_row = self.subforum('Async')
+        SubforumTagging.objects.create(subforum=self.subforum_row, tag=SubforumTag.objects.create(name='t1'))
+        SubforumModerator.objects.create(subforum=self.subforum_row, user=self.user, role='moderator')
+        SubforumSubscription.objects.create(subforum=self.subforum_row, user=self.user)
+        Faculty.objects.create(user=self.staff, department='CS')
+        for i in range(3):
+            self.post = Post.objects.create(
+                user=self.user if i % 2 else self.staff, subforum=self.subforum_row if i else None,
+                title=f'hello {i}', body='b', link='http://x.com',
+            )
+            Likes.objects.create(user=self.user, post=self.post)
+            Comments.objects.create(user=self.staff, post=self.post, body='c')
+        SavePost.objects.create(user=self.user, post=self.post)
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    async def test_payloads_match_the_sync_views(self):
+        client = AsyncClient()
+        subforum_id = self.subforum_row.id
+        for path in ['/posts', f'/subforums/{subforum_id}/posts', f'/subforums/{subforum_id}/posts?page=9&per_page=1']:
+            response = await client.get(f'/async{path}', headers=self.headers)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual((await sync_to_async(self.c.get)(path)).json(), response.json(), path)
+        response = await client.post('/async/search', {'searchText': 'hello'}, content_type='application/json', headers=self.headers)
+        expected = await sync_to_async(self.c.post)('/search', {'searchText': 'hello'}, format='json')
+        self.assertEqual(expected.json(), response.json())
+        response = await client.get(f'/async/posts/{self.post.id}', headers=self.headers)
+        self.assertEqual(len(response.json()['comments']), 1)
+
+    async def test_authentication_and_missing_posts(self):
+        self.assertEqual((await AsyncClient().get('/async/posts')).status_code, 401)
+        self.assertEqual((await AsyncClient().get('/async/posts/999', headers=self.headers)).status_code, 404)
+
+    async def test_one_task_runs_the_async_loader(self):
+        reference = ReferenceCache('async_single_flight')
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return [1]
+
+        values = await asyncio.gather(*[reference.aget_or_set('k', loader) for _ in range(5)])
+        self.assertEqual(values, [[1]] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(await reference.aversion(), await sync_to_async(reference.version)())
+        stats = await sync_to_async(reference.stats)()
+        self.assertEqual((stats['hits'], stats['misses']), (0, 5))
@@ -0,0 +1,68 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from forum.models import Comments, Likes, Post, SavePost, SubforumSubscription
+from forum.services import ranking
+
+from .base import ForumTestCase
+
+
+class ConditionalGetTests(ForumTestCase):
+    def assertChanges(self, url, mutate):
+        self.c.get(url)
+        response = self.c.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(self.c.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        if response.has_header('Last-Modified'):
+            self.assertEqual(self.c.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            mutate()
+        response = self.c.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_304_until_the_validator_changes(self):
+        subforum = self.subforum('S')
+        post = Post.objects.create(user=self.staff, subforum=subforum, title='a', body='b')
+        home = Post.objects.create(user=self.staff, title='h', body='b')
+        self.assertChanges(f'/posts/{post.id}', lambda: Comments.objects.create(user=self.staff, post=post, body='c'))
+        self.assertChanges(f'/posts/{post.id}', lambda: Likes.objects.create(user=self.staff, post=post))
+        self.assertChanges('/posts', lambda: Likes.objects.create(user=self.user, post=home))
+        self.assertChanges('/posts', lambda: SavePost.objects.create(user=self.user, post=home))
+        self.assertChanges(f'/subforums/{subforum.id}/posts', lambda: SubforumSubscription.objects.create(user=self.user, subforum=subforum))
+        self.assertChanges(f'/subforums/{subforum.id}', lambda: Comments.objects.create(user=self.staff, post=post, body='c'))
+        self.assertChanges(f'/subforums/{subforum.id}', lambda: Post.objects.filter(id=post.id).delete())
+
+    def test_tags_are_per_viewer_and_page(self):
+        subforum = self.subforum('S')
+        for i in range(25):
+            Post.objects.create(user=self.staff, subforum=subforum, title=f't{i}', body='b')
+        etag = self.c.get('/posts')['ETag']
+        self.assertNotEqual(self.a.get('/posts')['ETag'], etag)
+        self.assertEqual(self.c.get('/posts?page=2', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        etag = self.c.get(f'/subforums/{subforum.id}/posts')['ETag']
+        self.assertEqual(self.c.get(f'/subforums/{subforum.id}/posts?page=2', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_feed_validators_avoid_table_aggregates(self):
+        subforum = self.subforum('S')
+        Post.objects.create(user=self.staff, subforum=subforum, title='a', body='b')
+        for url in ['/posts', f'/subforums/{subforum.id}', f'/subforums/{subforum.id}/posts']:
+            self.c.get(url)
+            etag = self.c.get(url)['ETag']
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.c.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            for query in queries.captured_queries:
+                self.assertNotIn('SUM(', query['sql'].upper(), url)
+                self.assertNotIn('"forum_likes"', query['sql'], url)
+                self.assertNotIn('"forum_comments"', query['sql'], url)
+
+    def test_hot_pages_change_tag_after_a_decay_run(self):
+        subforum = self.subforum('S')
+        Post.objects.create(user=self.staff, subforum=subforum, title='a', body='b')
+        url = f'/subforums/{subforum.id}/posts?sort=hot'
+        etag = self.c.get(url)['ETag']
+        self.assertEqual(self.c.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        ranking.decay()
+        self.assertEqual(self.c.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
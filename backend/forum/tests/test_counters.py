@@ -0,0 +1,41 @@
+from django.core.management import call_command
+from django.test import override_settings
+
+from forum.models import Post, Subforum
+from forum.services.counters import CounterService
+
+from .base import ForumTestCase
+
+
+class CounterTests(ForumTestCase):
+    def test_counts_follow_posts_and_subscriptions(self):
+        subforum = self.subforum('CS')
+        before = Subforum.objects.get(id=subforum.id).updated_at
+        self.assertEqual(self.c.post(f'/subforums/{subforum.id}/subscribe').status_code, 201)
+        self.c.post('/posts', {'title': 't', 'body': 'b', 'subforum_id': subforum.id}, format='json')
+        subforum.refresh_from_db()
+        self.assertEqual((subforum.post_count, subforum.subscriber_count), (1, 1))
+        self.assertEqual(subforum.updated_at, before)
+        self.c.delete(f'/subforums/{subforum.id}/subscribe')
+        Post.objects.all().delete()
+        subforum.refresh_from_db()
+        self.assertEqual((subforum.post_count, subforum.subscriber_count), (0, 0))
+
+    def test_reconcile_fixes_drift(self):
+        subforum = self.subforum('CS')
+        Subforum.objects.filter(id=subforum.id).update(post_count=9)
+        call_command('reconcile_counters')
+        subforum.refresh_from_db()
+        self.assertEqual(subforum.post_count, 0)
+
+    @override_settings(FORUM_COUNTER_BUFFER=True, FORUM_COUNTER_FLUSH_SIZE=3, FORUM_COUNTER_FLUSH_INTERVAL=999)
+    def test_buffered_deltas_flush_in_batches(self):
+        subforum = self.subforum('CS')
+        CounterService.flush()
+        Post.objects.create(subforum=subforum, user=self.user, title='a', body='b')
+        Post.objects.create(subforum=subforum, user=self.user, title='a', body='b')
+        subforum.refresh_from_db()
+        self.assertEqual(subforum.post_count, 0)
+        Post.objects.create(subforum=subforum, user=self.user, title='a', body='b')
+        subforum.refresh_from_db()
+        self.assertEqual(subforum.post_count, 3)
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+
+from forum.models import (
+    AccountDeletionJob, ChangeLog, Comments, FollowPerson, Likes, Post, Subforum, SubforumModerator,
+    SubforumSubscription,
+)
+from forum.services import deletion, snapshots
+from forum.services.duplicates import duplicate_index
+
+from .base import SPAM, ForumTestCase
+
+
+class AccountDeletionTests(ForumTestCase):
+    def test_deletes_everything_the_user_owns(self):
+        other = User.objects.create_user('u2', 'u2@wayne.edu', 'pw')
+        mine = self.subforum('Mine', creator=self.user)
+        theirs = self.subforum('Theirs')
+        SubforumSubscription.objects.create(user=self.user, subforum=theirs)
+        SubforumModerator.objects.create(user=self.user, subforum=theirs, role='moderator', assigned_by=self.staff)
+        for i in range(5):
+            post = Post.objects.create(user=self.user, subforum=theirs, title=f't{i}', body='b')
+            Comments.objects.create(user=other, post=post, body='c')
+            Likes.objects.create(user=other, post=post)
+        Post.objects.create(user=other, subforum=mine, title='x', body='b')
+        kept = Post.objects.create(user=other, subforum=theirs, title='y', body='b')
+        Comments.objects.create(user=self.user, post=kept, body='c')
+        Likes.objects.create(user=self.user, post=kept)
+        FollowPerson.objects.create(follower=other, following=self.user)
+        with mock.patch.object(deletion, 'CHUNK_SIZE', 2):
+            response = self.c.delete('/delete')
+        self.assertEqual(response.status_code, 202, response.content)
+        job = AccountDeletionJob.objects.get(id=response.json()['job'])
+        self.assertEqual(job.status, 'done', job.error)
+        self.assertGreater(job.deleted_rows, 15)
+        self.assertFalse(User.objects.filter(id=self.user.id).exists())
+        self.assertFalse(Subforum.objects.filter(id=mine.id).exists())
+        theirs.refresh_from_db()
+        self.assertEqual((theirs.post_count, theirs.subscriber_count), (1, 0))
+        self.assertEqual((Post.objects.count(), Comments.objects.count(), Likes.objects.count()), (1, 0, 0))
+        kept.refresh_from_db()
+        self.assertEqual((kept.like_count, kept.comment_count), (0, 0))
+        self.assertTrue(ChangeLog.objects.filter(kind='like', object_id=kept.id, subforum_id=theirs.id).exists())
+        out = StringIO()
+        call_command('process_account_deletions', stdout=out)
+        self.assertIn('Processed 0', out.getvalue())
+
+    def test_raw_deletes_invalidate_derived_data(self):
+        duplicate_index.reset()
+        duplicate_index.load()
+        Post.objects.create(user=self.user, title='t', body=SPAM)
+        self.assertEqual(duplicate_index.size(), 1)
+        version = snapshots.scope_version(None)
+        job = AccountDeletionJob.objects.create(user_id=self.user.id, username='u1')
+        with self.captureOnCommitCallbacks(execute=True):
+            deletion.run_job(job.id)
+        self.assertEqual(duplicate_index.size(), 0)
+        self.assertGreater(snapshots.scope_version(None), version)
+        duplicate_index.reset()
+
+    def test_only_stale_running_jobs_are_resumed(self):
+        running = AccountDeletionJob.objects.create(user_id=self.user.id, username='u1', status='running')
+        self.assertEqual(deletion.run_pending(), 0)
+        AccountDeletionJob.objects.filter(id=running.id).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(deletion.run_pending(), 1)
+        self.assertEqual(AccountDeletionJob.objects.get(id=running.id).status, 'done')
+        with mock.patch.object(deletion, 'AccountDeletionService') as service:
+            deletion.run_job(running.id)
+        service.assert_not_called()
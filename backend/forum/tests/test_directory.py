@@ -0,0 +1,52 @@
+from forum.models import Subforum, SubforumSubscription, SubforumTag, SubforumTagging
+from forum.services.pagination import KeysetPaginator
+
+from .base import ForumTestCase
+
+
+class SubforumDirectoryTests(ForumTestCase):
+    def test_lists_approved_subforums_with_tag_facets(self):
+        cs, art = SubforumTag.objects.create(name='cs'), SubforumTag.objects.create(name='art')
+        algorithms = self.subforum('Algorithms', description='graph theory stuff', post_count=5)
+        painting = self.subforum('Painting', post_count=3)
+        hidden = self.subforum('Hidden', status='pending')
+        SubforumTagging.objects.create(subforum=algorithms, tag=cs)
+        SubforumTagging.objects.create(subforum=algorithms, tag=art)
+        SubforumTagging.objects.create(subforum=painting, tag=art)
+        SubforumTagging.objects.create(subforum=hidden, tag=cs)
+        data = self.c.get('/subforums').json()
+        self.assertEqual([row['name'] for row in data['results']], ['Algorithms', 'Painting'])
+        self.assertEqual({facet['name']: facet['count'] for facet in data['facets']}, {'cs': 1, 'art': 2})
+        hidden.status = 'approved'
+        hidden.save()
+        data = self.c.get('/subforums').json()
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual({facet['name']: facet['count'] for facet in data['facets']}, {'cs': 2, 'art': 2})
+        algorithms.delete()
+        data = self.c.get('/subforums').json()
+        self.assertEqual({facet['name']: facet['count'] for facet in data['facets']}, {'cs': 1, 'art': 1})
+
+    def test_cursor_search_and_tag_filter(self):
+        art = SubforumTag.objects.create(name='art')
+        self.subforum('Algorithms', description='graph theory stuff', post_count=5)
+        painting = self.subforum('Painting', post_count=3)
+        SubforumTagging.objects.create(subforum=painting, tag=art)
+        first = self.c.get('/subforums', {'page_size': 1}).json()
+        self.assertEqual(len(first['results']), 1)
+        second = self.c.get('/subforums', {'page_size': 1, 'cursor': first['next_cursor']}).json()
+        self.assertEqual(second['results'][0]['name'], 'Painting')
+        self.assertEqual([row['name'] for row in self.c.get('/subforums', {'search': 'grap'}).json()['results']], ['Algorithms'])
+        self.assertEqual(len(self.c.get('/subforums', {'tag': art.id}).json()['results']), 1)
+        SubforumSubscription.objects.create(user=self.user, subforum=painting)
+        rows = {row['name']: row for row in self.c.get('/subforums').json()['results']}
+        self.assertTrue(rows['Painting']['is_subscribed'])
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        self.subforum('Algorithms')
+        self.assertEqual(self.c.get('/subforums', {'cursor': 'zz'}).status_code, 400)
+
+    def test_decode_rejects_cursors_of_the_wrong_type(self):
+        paginator = KeysetPaginator(Subforum.objects.values('id', 'created_at'), ('-created_at', '-id'), 20)
+        cursor = paginator.encode({'id': 1, 'created_at': 'not a date'})
+        with self.assertRaises(ValueError):
+            paginator.decode(cursor)
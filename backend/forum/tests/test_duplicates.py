@@ -0,0 +1,92 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from forum.models import Post
+from forum.services import duplicates
+from forum.services.duplicates import DuplicateIndex, duplicate_index, minhash
+
+from .base import SPAM, ForumTestCase
+
+
+class DuplicateDetectionTests(ForumTestCase):
+    def setUp(self):
+        super().setUp()
+        duplicate_index.reset()
+
+    def tearDown(self):
+        duplicate_index.reset()
+
+    def test_minhash_estimates_similarity(self):
+        index = DuplicateIndex(threshold=0.8, from_db=False)
+        index.add(('post', 1), SPAM)
+        self.assertEqual(minhash(SPAM), minhash(SPAM.upper() + '!!'))
+        self.assertEqual(index.query(SPAM), [(('post', 1), 1.0)])
+        self.assertEqual(index.query(SPAM, exclude=('post', 1)), [])
+        self.assertEqual(index.query('Totally different comment about the exam schedule next week'), [])
+        self.assertEqual(index.query('ok'), [])
+        index.remove(('post', 1))
+        self.assertEqual(index.size(), 0)
+
+    @override_settings(FORUM_DUPLICATES={'ACTION': 'reject'})
+    def test_reject_mode_refuses_duplicates(self):
+        subforum = self.subforum('S')
+        self.assertEqual(self.c.post('/posts', {'title': 'Books', 'body': SPAM, 'subforum': subforum.id}, format='json').status_code, 201)
+        self.assertEqual(self.c.post('/posts', {'title': 'Books', 'body': SPAM}, format='json').status_code, 409)
+        post = Post.objects.get()
+        self.assertEqual(self.c.post(f'/{post.id}/comments', {'body': 'Books\n' + SPAM}, format='json').status_code, 409)
+        self.assertEqual(self.c.post(f'/{post.id}/comments', {'body': 'ok'}, format='json').status_code, 200)
+        self.assertEqual(self.c.post(f'/{post.id}/comments', {'body': 'ok'}, format='json').status_code, 200)
+        post.delete()
+        self.assertEqual(self.c.post('/posts', {'title': 'Books', 'body': SPAM}, format='json').status_code, 201)
+        call_command('rebuild_duplicate_index', stdout=StringIO())
+
+    def test_flag_mode_is_the_default_and_only_logs(self):
+        self.c.post('/posts', {'title': 'Books', 'body': SPAM}, format='json')
+        with self.assertLogs('forum.services.duplicates', 'WARNING'):
+            response = self.c.post('/posts', {'title': 'Books', 'body': SPAM}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(duplicate_index.groups()), 1)
+
+    def test_queries_never_load_on_the_request_thread(self):
+        Post.objects.create(user=self.user, title='Books', body=SPAM)
+        duplicate_index.reset()
+        with override_settings(FORUM_BACKGROUND_SYNC=False), mock.patch.object(duplicates.background, 'submit') as submit:
+            self.assertEqual(duplicate_index.query(SPAM), [])
+            self.assertEqual(duplicate_index.query(SPAM), [])
+        self.assertEqual(submit.call_count, 1)
+        load = submit.call_args[0][0]
+        load()
+        self.assertEqual(len(duplicate_index.query('Books\n' + SPAM)), 1)
+
+    def test_writes_during_a_rebuild_are_replayed(self):
+        read = DuplicateIndex._DuplicateIndex__read
+
+        def write_while_reading(index):
+            fresh = read(index)
+            index.add(('post', 99), SPAM)
+            index.remove(('post', 98))
+            return fresh
+
+        duplicate_index.load()
+        duplicate_index.add(('post', 98), 'Books\n' + SPAM)
+        with mock.patch.object(DuplicateIndex, '_DuplicateIndex__read', write_while_reading):
+            duplicate_index.rebuild()
+        self.assertEqual([key for key, _ in duplicate_index.query(SPAM)], [('post', 99)])
+
+    @override_settings(FORUM_DUPLICATES={'RELOAD_CHECK_SECONDS': 0})
+    def test_serving_processes_reload_when_the_version_moves(self):
+        duplicate_index.load()
+        Post.objects.bulk_create([Post(user=self.user, title='Books', body=SPAM)])
+        self.assertEqual(duplicate_index.query(SPAM), [])
+        version = duplicates.shared_version()
+        call_command('rebuild_duplicate_index', '--quiet-matches', stdout=StringIO())
+        self.assertGreater(duplicates.shared_version(), version)
+        duplicate_index.reset()
+        duplicate_index.load()
+        Post.objects.bulk_create([Post(user=self.user, title='More', body=SPAM)])
+        self.assertEqual(len(duplicate_index.query(SPAM)), 1)
+        duplicates.bump_version()
+        self.assertEqual(len(duplicate_index.query(SPAM)), 2)
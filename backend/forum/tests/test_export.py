@@ -0,0 +1,35 @@
+from io import StringIO
+import json
+
+from django.core.management import call_command
+
+from forum.models import Comments, Post
+
+from .base import ForumTestCase
+
+
+class ExportTests(ForumTestCase):
+    def test_streams_ndjson_and_csv(self):
+        subforum = self.subforum('CS')
+        post = Post.objects.create(user=self.user, title='a, "b"', body='x', subforum=subforum)
+        Post.objects.create(user=self.user, title='other', body='x')
+        Comments.objects.create(post=post, user=self.user, body='c')
+        response = self.a.get('/admin/export/posts')
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0])['title'], 'a, "b"')
+        response = self.a.get('/admin/export/posts', {'output': 'csv', 'subforum': subforum.id, 'start': '2000-01-01'})
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 2)
+        response = self.a.get('/admin/export/comments', {'subforum': subforum.id})
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 1)
+        call_command('export_data', 'subforums', '--format', 'csv', stdout=StringIO())
+
+    def test_rejects_bad_parameters(self):
+        self.assertEqual(self.a.get('/admin/export/nope').status_code, 400)
+        self.assertEqual(self.a.get('/admin/export/posts', {'end': 'bad'}).status_code, 400)
+        response = self.a.get('/admin/export/posts?subforum=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('subforum', response.json()['error'])
+        self.assertEqual(self.a.get('/admin/export/posts?subforum=').status_code, 200)
+        self.assertEqual(self.c.get('/admin/export/posts').status_code, 403)
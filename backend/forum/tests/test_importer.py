@@ -0,0 +1,57 @@
+from io import StringIO
+import json
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from forum.models import FollowPerson, ImportRun, Likes, Post, Subforum
+
+from .base import ForumTestCase
+
+
+class LegacyImportTests(ForumTestCase):
+    def test_resumes_a_run_and_rebuilds_derived_data(self):
+        records = [
+            {'type': 'user', 'id': 1, 'username': 'old1', 'role': 'student', 'major': 'CS', 'classification': 'x'},
+            {'type': 'user', 'id': 2, 'username': 'old2', 'first_name': None},
+            {'type': 'subforum', 'id': 7, 'name': 'Legacy', 'creator': 1},
+            {'type': 'post', 'id': 'a', 'user': 1, 'subforum': 7, 'title': 't', 'body': 'b', 'created_at': '2015-01-02T03:04:05Z'},
+            {'type': 'post', 'id': 'b', 'user': 2, 'title': 't2', 'body': 'b'},
+            {'type': 'comment', 'id': 1, 'user': 2, 'post': 'a', 'body': 'c'},
+            {'type': 'like', 'user': 2, 'post': 'a'},
+            {'type': 'like', 'user': 99, 'post': 'a'},
+            {'type': 'follow', 'follower': 1, 'following': 2},
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as source:
+            source.write(''.join(json.dumps(record) + '\n' for record in records[:4]))
+            source.flush()
+            call_command('import_legacy', source.name, '--name', 'r', '--chunk-size', '2', '--skip-rebuild', stdout=StringIO())
+            self.assertEqual(Post.objects.count(), 1)
+            ImportRun.objects.filter(name='r').update(finished=False)
+            source.write(''.join(json.dumps(record) + '\n' for record in records[4:]))
+            source.flush()
+            call_command('import_legacy', source.name, '--name', 'r', '--chunk-size', '2', stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(User.objects.filter(username__startswith='old').count(), 2)
+        self.assertEqual(Post.objects.get(title='t').created_at.year, 2015)
+        self.assertEqual((Likes.objects.count(), FollowPerson.objects.count()), (1, 1))
+        self.assertEqual(Subforum.objects.get(name='Legacy').post_count, 1)
+        self.assertEqual(len(self.c.get('/subforums', {'search': 'legacy'}).json()['results']), 1)
+        self.assertTrue(Post._meta.get_field('created_at').auto_now_add)
+
+    def test_skips_repeated_likes(self):
+        records = [
+            {'type': 'user', 'id': 1, 'username': 'old1'},
+            {'type': 'post', 'id': 'a', 'user': 1, 'title': 't', 'body': 'b'},
+            {'type': 'like', 'user': 1, 'post': 'a'},
+            {'type': 'like', 'user': 1, 'post': 'a'},
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as source:
+            source.write(''.join(json.dumps(record) + '\n' for record in records))
+            source.flush()
+            call_command('import_legacy', source.name, '--name', 'r', stdout=StringIO())
+            ImportRun.objects.filter(name='r').update(finished=False, lines_done=0)
+            call_command('import_legacy', source.name, '--name', 'r', stdout=StringIO())
+        self.assertEqual((Post.objects.count(), Likes.objects.count()), (1, 1))
+        self.assertEqual(Post.objects.get(title='t').like_count, 1)
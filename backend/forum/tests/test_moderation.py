@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from forum.admin import SubforumReportAdmin
+from forum.models import ModerationQueueItem, SubforumReport
+
+from .base import ForumTestCase
+
+
+class ModerationQueueTests(ForumTestCase):
+    def test_reports_group_into_prioritised_items(self):
+        first, second = self.subforum('A'), self.subforum('B')
+        users = [User.objects.create_user(f'r{i}') for i in range(5)]
+        for user in users:
+            SubforumReport.objects.create(subforum=first, reporter=user, reason='spam')
+        SubforumReport.objects.create(subforum=second, reporter=users[0], reason='other')
+        self.assertEqual(self.c.post(f'/subforums/{second.id}/report', {'reason': 'harassment'}, format='json').status_code, 201)
+        self.assertEqual(self.c.get('/admin/moderation/queue').status_code, 403)
+        results = self.a.get('/admin/moderation/queue').json()['results']
+        self.assertEqual([row['subforum'] for row in results], [first.id, second.id])
+        self.assertEqual((results[0]['report_count'], results[0]['priority']), (5, 10))
+        self.assertEqual(results[1]['reasons'], {'other': 1, 'harassment': 1})
+        ids = [row['id'] for row in results]
+        self.assertEqual(self.a.post('/admin/moderation/queue', {'ids': ids, 'action': 'x'}, format='json').status_code, 400)
+        self.assertEqual(self.a.post('/admin/moderation/queue', {'ids': ids, 'action': 'dismiss'}, format='json').json(), {'updated': 2})
+        self.assertEqual(SubforumReport.objects.filter(status='dismissed').count(), 7)
+        self.assertEqual(self.a.get('/admin/moderation/queue').json()['results'], [])
+        self.assertEqual(len(self.a.get('/admin/moderation/queue?status=dismissed').json()['results']), 2)
+        SubforumReport.objects.create(subforum=first, reporter=users[1], reason='other')
+        self.assertEqual(ModerationQueueItem.objects.filter(status='pending').count(), 1)
+
+    def test_rebuild_skips_dismissed_reports(self):
+        first, second = self.subforum('A'), self.subforum('B')
+        reporter = User.objects.create_user('r')
+        SubforumReport.objects.create(subforum=first, reporter=reporter, reason='other')
+        SubforumReport.objects.create(subforum=second, reporter=reporter, reason='spam', status='dismissed')
+        SubforumReport.objects.update(item=None)
+        ModerationQueueItem.objects.all().delete()
+        call_command('rebuild_moderation_queue')
+        item = ModerationQueueItem.objects.get()
+        self.assertEqual((item.subforum_id, item.report_count, item.priority), (first.id, 1, 1))
+
+    def test_report_admin_actions_update_the_queue_item(self):
+        subforum = self.subforum('A')
+        users = [User.objects.create_user(f'r{i}') for i in range(3)]
+        reports = [SubforumReport.objects.create(subforum=subforum, reporter=user, reason='spam') for user in users]
+        admin = SubforumReportAdmin(SubforumReport, site)
+        request = mock.Mock(user=self.staff)
+        with mock.patch.object(admin, 'message_user'):
+            admin.mark_as_resolved(request, SubforumReport.objects.filter(id__in=[reports[0].id, reports[1].id]))
+        item = ModerationQueueItem.objects.get()
+        self.assertEqual((item.status, item.report_count, item.priority), ('pending', 1, 2))
+        with mock.patch.object(admin, 'message_user') as message_user:
+            admin.mark_as_dismissed(request, SubforumReport.objects.all())
+        message_user.assert_called_once_with(request, "1 reports marked as dismissed.")
+        item.refresh_from_db()
+        self.assertEqual((item.status, item.report_count, item.reviewed_by), ('dismissed', 0, self.staff))
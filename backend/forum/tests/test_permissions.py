@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+
+from forum.models import Post, SubforumModerator
+from forum.services.permissions import PermissionService, has_perm
+
+from .base import ForumTestCase
+
+
+class PermissionTests(ForumTestCase):
+    def test_roles_grant_permissions_per_subforum(self):
+        subforum, other = self.subforum('CS', status='pending'), self.subforum('CS2')
+        self.assertEqual(self.c.get(f'/subforums/{subforum.id}').status_code, 404)
+        SubforumModerator.objects.create(subforum=subforum, user=self.user, role='creator', can_ban_users=True)
+        self.assertFalse(has_perm(self.user, other, 'moderate'))
+        user = User.objects.get(id=self.user.id)
+        with self.assertNumQueries(0):
+            permissions = PermissionService(user)
+            self.assertTrue(permissions.has_perm(subforum, 'manage_moderators'))
+            self.assertTrue(permissions.has_perm(subforum.id, 'ban_users'))
+            self.assertFalse(permissions.has_perm(subforum, 'edit_rules'))
+        self.assertTrue(has_perm(self.staff, other, 'edit_rules'))
+
+    def test_creator_appoints_moderators_once(self):
+        subforum = self.subforum('CS')
+        SubforumModerator.objects.create(subforum=subforum, user=self.user, role='creator')
+        moderator = User.objects.create_user('u2', 'u2@wayne.edu', 'pw')
+        response = self.c.post(f'/subforums/{subforum.id}/moderators', {'user_id': moderator.id}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(has_perm(moderator, subforum, 'delete_posts'))
+        response = self.c.post(f'/subforums/{subforum.id}/moderators', {'user_id': moderator.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_the_owner_deletes_a_post(self):
+        subforum = self.subforum('CS')
+        moderator = User.objects.create_user('u2', 'u2@wayne.edu', 'pw')
+        SubforumModerator.objects.create(subforum=subforum, user=moderator, role='moderator', can_delete_posts=True)
+        post = Post.objects.create(subforum=subforum, user=self.staff, title='x', body='y')
+        self.assertEqual(self.client_for(moderator).delete(f'/delete/post/{post.id}').status_code, 404)
+        self.assertTrue(Post.objects.filter(id=post.id).exists())
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+
+from forum.models import SubforumStat
+from forum.services.presence import PresenceTracker, current_minute, presence
+
+from .base import ForumTestCase
+
+
+class PresenceTests(ForumTestCase):
+    def test_views_record_presence_and_peaks(self):
+        presence.__init__()
+        subforum = self.subforum('CS')
+        SubforumStat.objects.create(subforum=subforum)
+        other = self.client_for(User.objects.create_user('u2', 'u2@wayne.edu', 'pw'))
+        self.c.get(f'/subforums/{subforum.id}')
+        other.get(f'/subforums/{subforum.id}')
+        other.get('/posts')
+        self.assertEqual(presence.online(subforum.id), 2)
+        self.assertGreaterEqual(self.c.get('/online').json()['online'], 2)
+        self.assertEqual(SubforumStat.objects.get(subforum=subforum).peak_users_online, 2)
+        self.assertEqual(self.c.get(f'/subforums/{subforum.id}').json()['statistics']['users_online'], 2)
+
+    def test_users_expire_after_the_window(self):
+        tracker = PresenceTracker(window=5)
+        minute = current_minute()
+        tracker.record(10 ** 12, None, minute - 6)
+        tracker.record(5, 7, minute - 4)
+        tracker.record(5, 7, minute - 1)
+        tracker.record(6, 7, minute - 5)
+        self.assertEqual(tracker.online(), 1)
+        self.assertEqual(tracker.online(7), 1)
+        tracker.record(8, 7, minute)
+        self.assertEqual((tracker.online(7), tracker.online()), (2, 2))
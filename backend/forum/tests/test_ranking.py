@@ -0,0 +1,87 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from forum.models import ChangeLog, Comments, Likes, Post
+from forum.services import ranking
+
+from .base import ForumTestCase
+
+
+class RankedFeedTests(ForumTestCase):
+    def test_sorts_and_like_deltas(self):
+        others = [User.objects.create_user(f'h{i}') for i in range(3)]
+        first = Post.objects.create(user=self.user, title='a', body='one')
+        second = Post.objects.create(user=self.user, title='b', body='two')
+        third = Post.objects.create(user=self.user, title='c', body='three')
+        first.refresh_from_db()
+        self.assertAlmostEqual(first.hot_score, 1 / 2 ** 1.8, places=3)
+        self.c.post(f'/{first.id}/likes')
+        for user in others[1:]:
+            Likes.objects.create(post=first, user=user)
+        Comments.objects.create(post=second, user=others[0], body='hi')
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.like_count, second.comment_count), (3, 1))
+        ids = lambda sort: [row['id'] for row in self.c.get('/posts', {'sort': sort}).json()['results']]
+        self.assertEqual(ids('top'), [first.id, third.id, second.id])
+        self.assertEqual(ids('hot'), [first.id, second.id, third.id])
+        self.assertEqual(ids('new'), [third.id, second.id, first.id])
+        self.c.post(f'/{first.id}/likes')
+        first.refresh_from_db()
+        self.assertEqual(first.like_count, 2)
+        Post.objects.filter(id=first.id).update(created_at=timezone.now() - timedelta(days=2))
+        call_command('decay_hot_scores', stdout=StringIO())
+        self.assertEqual(ids('hot'), [second.id, third.id, first.id])
+
+    def test_bad_sort_or_cursor(self):
+        self.assertEqual(self.c.get('/posts?sort=bad').status_code, 400)
+        self.assertEqual(self.c.get('/posts?sort=hot&cursor=zz').status_code, 400)
+
+    def test_keyset_pages_and_subforum_feeds(self):
+        posts = [Post.objects.create(user=self.user, title=f'p{i}', body='b') for i in range(3)]
+        with mock.patch.object(ranking, 'PAGE_SIZE', 2):
+            data = self.c.get('/posts?sort=new').json()
+            self.assertEqual(len(data['results']), 2)
+            data = self.c.get('/posts', {'sort': 'new', 'cursor': data['next_cursor']}).json()
+        self.assertEqual([row['id'] for row in data['results']], [posts[0].id])
+        self.assertIsNone(data['next_cursor'])
+        subforum = self.subforum('S')
+        in_subforum = Post.objects.create(user=self.user, title='s', body='sub', subforum=subforum)
+        self.assertEqual([row['id'] for row in self.c.get(f'/subforums/{subforum.id}/posts?sort=hot').json()['results']], [in_subforum.id])
+        self.assertNotIn('hot_score', self.c.get(f'/posts/{posts[0].id}').json())
+        self.assertIsInstance(self.c.get('/posts').json(), list)
+
+    def test_recount_repairs_counters(self):
+        post = Post.objects.create(user=self.user, title='a', body='b')
+        Likes.objects.create(post=post, user=self.staff)
+        Post.objects.filter(id=post.id).update(like_count=7)
+        self.assertEqual(ranking.recount([post.id]), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+        Post.objects.filter(id=post.id).update(like_count=99)
+        call_command('decay_hot_scores', '--recount', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+
+    def test_cascade_delete_skips_per_child_rescoring(self):
+        post = Post.objects.create(user=self.user, title='a', body='b')
+        for i in range(10):
+            user = User.objects.create_user(f'k{i}')
+            Likes.objects.create(post=post, user=user)
+            Comments.objects.create(post=post, user=user, body='c')
+        before = ChangeLog.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        self.assertEqual([query for query in queries.captured_queries if query['sql'].startswith('UPDATE "forum_post"')], [])
+        self.assertEqual(ChangeLog.objects.count() - before, 1)
+        other = Post.objects.create(user=self.user, title='a', body='b')
+        Likes.objects.create(post=other, user=self.staff).delete()
+        other.refresh_from_db()
+        self.assertEqual(other.like_count, 0)
@@ -0,0 +1,61 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+import numpy as np
+
+from forum.models import SubforumNeighbor, SubforumSubscription
+from forum.services import recommendations
+from forum.services.recommendations import SubscriptionMatrix, similarity, top_neighbors
+
+from .base import ForumTestCase
+
+
+class SubforumRecommendationTests(ForumTestCase):
+    def test_neighbours_by_co_subscription(self):
+        users = [User.objects.create_user(f'r{i}') for i in range(6)]
+        subforums = {name: self.subforum(name, creator=users[0]) for name in 'ABCD'}
+        subforums['P'] = self.subforum('P', status='pending', creator=users[0])
+
+        def subscribe(user, name):
+            SubforumSubscription.objects.create(user=user, subforum=subforums[name])
+
+        for user in users[:4]:
+            subscribe(user, 'A')
+            subscribe(user, 'B')
+        for user in users[2:5]:
+            subscribe(user, 'C')
+        subscribe(users[5], 'D')
+        subscribe(users[0], 'P')
+        subscribe(self.user, 'A')
+        call_command('compute_subforum_neighbors', stdout=StringIO())
+        data = self.c.get('/subforums/recommended').json()
+        self.assertEqual([row['name'] for row in data], ['B', 'C'])
+        self.assertGreater(data[0]['score'], data[1]['score'])
+        self.assertFalse(SubforumNeighbor.objects.filter(neighbor__name='P').exists())
+
+    def test_sparse_matrix_maths(self):
+        pairs = np.array([[1, 10], [1, 11], [2, 10], [2, 11], [3, 11], [3, 12], [4, 13]])
+        matrix = SubscriptionMatrix.from_pairs(pairs)
+        dense = np.zeros((len(matrix.user_ids), len(matrix.subforum_ids)))
+        for row in range(len(matrix.user_ids)):
+            dense[row, matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]] = 1
+        expected = dense.T @ dense
+        self.assertEqual(matrix.subscriber_counts().tolist(), np.diag(expected).tolist())
+        np.fill_diagonal(expected, 0)
+        with mock.patch.object(recommendations, 'CHUNK_PAIRS', 1):
+            rows, columns, counts = matrix.cooccurrence()
+        counted = np.zeros_like(expected)
+        counted[rows, columns] = counts
+        self.assertTrue(np.array_equal(counted, expected))
+        self.assertEqual(len(counts), np.count_nonzero(expected))
+        scores = similarity(rows, columns, counts, matrix.subscriber_counts())
+        #10 and 11 share two of 11's three subscribers: 2 / sqrt(2 * 3)
+        self.assertAlmostEqual(float(scores[(rows == 0) & (columns == 1)][0]), 2 / np.sqrt(6), places=5)
+        self.assertNotIn(3, rows.tolist())
+        positions, ranks = top_neighbors(rows, columns, scores, 1)
+        self.assertEqual(list(zip(rows[positions].tolist(), columns[positions].tolist())), [(0, 1), (1, 0), (2, 1)])
+        self.assertEqual(ranks.tolist(), [0, 0, 0])
+        positions, ranks = top_neighbors(rows, columns, scores, 2)
+        self.assertEqual(columns[positions][rows[positions] == 1].tolist(), [0, 2])
@@ -0,0 +1,78 @@
+import threading
+import time
+from unittest import mock
+
+from django.contrib.admin.sites import site
+
+from forum.admin import SubforumAdmin
+from forum.models import Subforum, SubforumModerator, SubforumTag
+from forum.services import snapshots
+from forum.services.cache import ReferenceCache, subforum_tags_cache
+
+from .base import ForumTestCase
+
+
+class ReferenceCacheTests(ForumTestCase):
+    def test_tags_are_served_from_cache_until_a_tag_changes(self):
+        SubforumTag.objects.create(name='cs')
+        self.assertEqual(len(self.c.get('/subforums/tags').json()), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.c.get('/subforums/tags').json()), 1)
+        SubforumTag.objects.create(name='art')
+        self.assertEqual(len(self.c.get('/subforums/tags').json()), 2)
+        stats = subforum_tags_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_posting_to_a_subforum_uses_the_approved_set(self):
+        subforum = self.subforum('CS')
+        response = self.c.post('/posts', {'title': 't', 'body': 'b', 'subforum_id': subforum.id}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['subforum']['name'], 'CS')
+        pending = self.subforum('P', status='pending')
+        response = self.c.post('/posts', {'title': 't', 'body': 'b', 'subforum_id': pending.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        pending.status = 'approved'
+        pending.save()
+        response = self.c.post('/posts', {'title': 't', 'body': 'b', 'subforum_id': pending.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_moderators_are_listed_with_the_directory(self):
+        subforum = self.subforum('CS')
+        SubforumModerator.objects.create(subforum=subforum, user=self.user, role='moderator')
+        self.assertEqual(self.c.get(f'/subforums/{subforum.id}/moderators').status_code, 200)
+        row = self.c.get('/subforums').json()['results'][0]
+        self.assertEqual(row['moderators'], [{'id': self.user.id, 'username': 'u1'}])
+        self.assertTrue(row['is_moderator'])
+
+    def test_one_thread_runs_the_loader(self):
+        reference = ReferenceCache('single_flight')
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.2)
+            return 5
+
+        threads = [threading.Thread(target=reference.get_or_set, args=('k', loader)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+
+    def test_admin_status_actions_refresh_derived_data(self):
+        admin = SubforumAdmin(Subforum, site)
+        request = mock.Mock()
+        pending = self.subforum('Pending', status='pending')
+        self.assertEqual(self.c.post('/posts', {'title': 't', 'body': 'b', 'subforum_id': pending.id}, format='json').status_code, 400)
+        self.assertEqual(self.c.post('/search', {'searchText': 'pending'}, format='json').json()['Subforums'], [])
+        version = snapshots.scope_version(pending.id)
+        with self.captureOnCommitCallbacks(execute=True), mock.patch.object(admin, 'message_user'):
+            admin.approve_selected(request, Subforum.objects.filter(id=pending.id))
+        self.assertGreater(snapshots.scope_version(pending.id), version)
+        self.assertEqual(self.c.post('/posts', {'title': 't', 'body': 'b', 'subforum_id': pending.id}, format='json').status_code, 201)
+        self.assertEqual(len(self.c.post('/search', {'searchText': 'pending'}, format='json').json()['Subforums']), 1)
+        with mock.patch.object(admin, 'message_user') as message_user:
+            admin.reject_selected(request, Subforum.objects.filter(id=pending.id))
+        message_user.assert_called_once_with(request, "1 subforums rejected.")
+        self.assertEqual(self.c.post('/posts', {'title': 't', 'body': 'b', 'subforum_id': pending.id}, format='json').status_code, 400)
@@ -0,0 +1,25 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from forum.models import Likes, Post, SubforumSubscription
+from forum.serializers import PostSerializer
+
+from .base import ForumTestCase
+
+
+class RendererTests(ForumTestCase):
+    def test_fast_renderer_matches_drf_bytes(self):
+        subforum = self.subforum('S')
+        SubforumSubscription.objects.create(subforum=subforum, user=self.user)
+        for i in range(4):
+            post = Post.objects.create(user=self.user, subforum=subforum if i % 2 else None, title=f'é  {i}', body='b')
+            Likes.objects.create(user=self.staff, post=post)
+        request = Request(APIRequestFactory().get('/posts'))
+        request.user = self.user
+        home = Post.objects.filter(subforum__isnull=True)
+        expected = JSONRenderer().render(PostSerializer(home, many=True, context={'request': request}).data)
+        self.assertEqual(self.c.get('/posts').content, expected)
+        self.assertTrue(self.c.get(f'/subforums/{subforum.id}/posts').json()['posts'][0]['subforum']['is_subscribed'])
+        self.assertEqual(self.c.get(f'/profile/{self.staff.id}').status_code, 200)
+        self.assertEqual(len(self.c.get('/profile').json()['Posts']), 4)
@@ -0,0 +1,62 @@
+from django.test import RequestFactory, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from forum import routers
+from forum.middleware import ReplicaPinningMiddleware
+from forum.models import Post, SubforumStat
+from forum.routers import ReplicaRouter
+
+from .base import ForumTestCase
+
+
+@override_settings(FORUM_REPLICAS=['replica_x'])
+class ReplicaRoutingTests(ForumTestCase):
+    def setUp(self):
+        super().setUp()
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def get(self, middleware, path, method='get', token=True):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'} if token else {}
+        return middleware(getattr(RequestFactory(), method)(path, **headers))
+
+    def test_reads_go_to_a_replica_until_the_request_writes(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), 'default')
+        token = routers.begin_request(False)
+        self.assertEqual(router.db_for_read(Post), 'replica_x')
+        router.db_for_write(Post)
+        self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertTrue(routers.end_request(token))
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_a_write_pins_the_user_to_the_primary(self):
+        seen = {}
+
+        def view(request):
+            seen['db'] = ReplicaRouter().db_for_read(Post)
+            if request.method == 'POST':
+                ReplicaRouter().db_for_write(Post)
+            return 'ok'
+
+        middleware = ReplicaPinningMiddleware(view)
+        self.get(middleware, '/posts')
+        self.assertEqual(seen['db'], 'replica_x')
+        self.get(middleware, '/posts', method='post')
+        self.assertEqual(seen['db'], 'default')
+        self.get(middleware, '/posts')
+        self.assertEqual(seen['db'], 'default')
+        self.get(middleware, '/posts', token=False)
+        self.assertEqual(seen['db'], 'replica_x')
+
+    def test_incidental_writes_on_reads_do_not_pin(self):
+        seen = []
+
+        def view(request):
+            ReplicaRouter().db_for_write(SubforumStat)
+            seen.append(ReplicaRouter().db_for_read(Post))
+            return 'ok'
+
+        self.get(ReplicaPinningMiddleware(view), '/subforums/1')
+        self.assertEqual(seen[-1], 'default')
+        self.get(ReplicaPinningMiddleware(lambda request: seen.append(ReplicaRouter().db_for_read(Post)) or 'ok'), '/posts')
+        self.assertEqual(seen[-1], 'replica_x')
@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from forum.models import Post, SavePost
+from forum.services.service import SavedPostsService
+
+from .base import ForumTestCase
+
+
+class SavedPostsTests(ForumTestCase):
+    def test_newest_saves_first_with_a_keyset_cursor(self):
+        subforum = self.subforum('S')
+        posts = [Post.objects.create(user=self.staff, subforum=subforum if i % 2 else None, title=f't{i}', body='b') for i in range(25)]
+        now = timezone.now()
+        for i, post in enumerate(posts):
+            saved = SavePost.objects.create(user=self.user, post=post)
+            SavePost.objects.filter(id=saved.id).update(created_at=now - timedelta(minutes=i))
+        SavePost.objects.create(user=self.staff, post=posts[0])
+        data = self.c.get('/saved').json()
+        self.assertEqual([row['title'] for row in data['results'][:3]], ['t0', 't1', 't2'])
+        self.assertEqual(len(data['results']), 20)
+        self.assertTrue(all(row['saved'] for row in data['results']))
+        self.assertIn('saved_at', data['results'][0])
+        data = self.c.get('/saved', {'cursor': data['next_cursor']}).json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(self.c.get('/saved?cursor=zz').status_code, 400)
+
+    def test_query_count_does_not_grow_with_saves(self):
+        SavePost.objects.create(user=self.user, post=Post.objects.create(user=self.staff, title='a', body='b'))
+        with CaptureQueriesContext(connection) as queries:
+            SavedPostsService(self.user).page()
+        count = len(queries)
+        SavePost.objects.create(user=self.user, post=Post.objects.create(user=self.user, title='x', body='b'))
+        with CaptureQueriesContext(connection) as queries:
+            SavedPostsService(self.user).page()
+        self.assertLessEqual(len(queries), count)
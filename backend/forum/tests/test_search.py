@@ -0,0 +1,23 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from forum.models import Post, Subforum
+
+from .base import ForumTestCase
+
+
+class SearchTests(ForumTestCase):
+    def test_search_uses_the_index(self):
+        chemistry = self.subforum('Chemistry')
+        Post.objects.create(user=self.user, title='chem exam', body='b')
+        Post.objects.create(user=self.user, title='chem hidden', body='b', subforum=self.subforum('X', status='pending'))
+        data = self.c.post('/search', {'searchText': '  CHEM '}, format='json').json()
+        self.assertEqual((len(data['Posts']), len(data['Subforums'])), (1, 1))
+        with CaptureQueriesContext(connection) as queries:
+            self.c.post('/search', {'searchText': 'chem'}, format='json')
+        self.assertFalse([query for query in queries.captured_queries if 'LIKE' in query['sql']])
+        Post.objects.create(user=self.user, title='chem 2', body='b')
+        self.assertEqual(len(self.c.post('/search', {'searchText': 'chem'}, format='json').json()['Posts']), 2)
+        self.assertEqual(len(self.c.post('/search', {'searchText': 'chem', 'page': 2}, format='json').json()['Posts']), 0)
+        Subforum.objects.filter(id=chemistry.id).update(status='archived')
+        self.assertEqual(len(self.c.post('/search', {'searchText': 'chem'}, format='json').json()['Subforums']), 0)
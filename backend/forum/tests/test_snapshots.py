@@ -0,0 +1,67 @@
+import gzip
+import json
+from unittest import mock
+
+from forum.models import Likes, Post, SubforumSubscription
+from forum.services import snapshots
+
+from .base import ForumTestCase
+
+
+class FeedSnapshotTests(ForumTestCase):
+    def test_serves_stored_pages_and_merges_viewer_flags(self):
+        subforum = self.subforum('S')
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(25):
+                Post.objects.create(user=self.staff, subforum=subforum, title=f't{i}', body='b')
+            Post.objects.create(user=self.staff, title='home', body='b')
+        response = self.c.get('/posts', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content))[0]['title'], 'home')
+        self.assertFalse(self.c.get('/posts').json()[0]['liked'])
+        self.assertEqual(len(self.c.get(f'/subforums/{subforum.id}/posts?page=2').json()['posts']), 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(user=self.staff, subforum=subforum, title='new', body='b')
+        data = self.c.get(f'/subforums/{subforum.id}/posts').json()
+        self.assertEqual((data['posts'][0]['title'], data['total_posts']), ('new', 26))
+        with self.captureOnCommitCallbacks(execute=True):
+            SubforumSubscription.objects.create(subforum=subforum, user=self.user)
+            Likes.objects.create(user=self.user, post=Post.objects.get(title='new'))
+        data = self.c.get(f'/subforums/{subforum.id}/posts').json()
+        self.assertTrue(data['subforum']['is_subscribed'])
+        self.assertTrue(data['posts'][0]['liked'])
+        self.assertEqual(data['posts'][0]['like_amt'], 1)
+        data = self.a.get(f'/subforums/{subforum.id}/posts').json()
+        self.assertFalse(data['subforum']['is_subscribed'])
+        self.assertEqual(data['subforum']['subscriber_count'], 1)
+
+    def test_pages_outside_the_snapshot_are_built_live(self):
+        subforum = self.subforum('S')
+        for i in range(25):
+            Post.objects.create(user=self.staff, subforum=subforum, title=f't{i}', body='b')
+        self.assertEqual(len(self.c.get(f'/subforums/{subforum.id}/posts?per_page=5').json()['posts']), 5)
+        self.assertEqual(self.c.get(f'/subforums/{subforum.id}/posts?page=9').json()['page'], 2)
+
+    def test_rebuild_renders_absolute_urls_for_remembered_origins(self):
+        Post.objects.create(user=self.staff, title='home', body='b', image='post_media/x.png')
+        live = self.c.get('/posts', secure=True).json()[0]['image']
+        self.assertEqual(live, 'https://testserver/media/post_media/x.png')
+        snapshots.backend().clear()
+        snapshots.remember_origin(mock.Mock(scheme='https', get_host=lambda: 'testserver'))
+        snapshots.rebuild(None)
+        entry = snapshots.backend().get('snapshot:home:v1:https://testserver:1')
+        self.assertEqual(json.loads(entry['identity'])[0]['image'], live)
+
+    def test_page_is_stored_under_the_version_read_before_building(self):
+        Post.objects.create(user=self.staff, title='home', body='b')
+        home_feed = snapshots.home_feed
+
+        def written_during_build(request, user):
+            data = home_feed(request, user)
+            snapshots.backend().set('snapshot:home:version', 2, None)
+            return data
+
+        with mock.patch.object(snapshots, 'home_feed', written_during_build):
+            snapshots.FeedSnapshot().build(snapshots.OriginRequest('http://testserver'))
+        self.assertIsNotNone(snapshots.backend().get('snapshot:home:v1:http://testserver:1'))
+        self.assertIsNone(snapshots.backend().get('snapshot:home:v2:http://testserver:1'))
@@ -0,0 +1,65 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from forum.models import Faculty, FollowPerson, FollowSuggestion, Student
+from forum.services import suggestions
+from forum.services.suggestions import FollowGraph
+
+from .base import ForumTestCase
+
+
+class FollowSuggestionTests(ForumTestCase):
+    def follow(self, follower, following):
+        FollowPerson.objects.create(follower=follower, following=following)
+
+    def test_friends_of_friends_ranked_with_group_fillers(self):
+        users = {name: User.objects.create_user(name) for name in 'abcdefg'}
+        users['u1'] = self.user
+        for name in 'ef':
+            Student.objects.create(user=users[name], major=' cs ', classification='x')
+        Faculty.objects.create(user=users['g'], department='Math')
+        for follower, following in [('u1', 'a'), ('u1', 'b'), ('a', 'c'), ('b', 'c'), ('a', 'd'), ('f', 'e'), ('c', 'u1')]:
+            self.follow(users[follower], users[following])
+        graph = FollowGraph.load()
+        self.assertEqual(sorted(graph.following(users['a'].id)), sorted([users['c'].id, users['d'].id]))
+        self.assertEqual(graph.following(users['d'].id), [])
+        self.assertEqual(graph.indegree(users['c'].id), 2)
+        call_command('compute_follow_suggestions', stdout=StringIO())
+        data = self.c.get('/follow/suggestions').json()
+        #c has two mutual follows; e and f share the major; d has one mutual follow
+        self.assertEqual([row['username'] for row in data], ['c', 'e', 'f', 'd'])
+        self.assertEqual(data[0]['mutual_count'], 2)
+        self.assertTrue(data[1]['same_group'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.c.post(f"/follow/{users['c'].id}")
+        self.assertEqual([row['username'] for row in self.c.get('/follow/suggestions').json()], ['e', 'f', 'd'])
+        users['d'].is_active = False
+        users['d'].save()
+        self.assertEqual([row['username'] for row in self.c.get('/follow/suggestions').json()], ['e', 'f'])
+
+    def test_refresh_matches_the_batch_fanout(self):
+        users = [User.objects.create_user(f'x{i}') for i in range(8)]
+        self.follow(self.user, users[0])
+        self.follow(self.user, users[1])
+        for user in users[2:]:
+            self.follow(users[0], user)
+        self.follow(users[1], users[7])
+        with mock.patch.object(suggestions, 'FANOUT_LIMIT', 3):
+            suggestions.rebuild()
+            batch = list(FollowSuggestion.objects.filter(user=self.user).order_by('rank').values_list('suggested_id', 'mutual_count'))
+            suggestions.refresh_user(self.user.id)
+            refreshed = list(FollowSuggestion.objects.filter(user=self.user).order_by('rank').values_list('suggested_id', 'mutual_count'))
+        self.assertEqual(batch, refreshed)
+        self.assertNotIn(users[6].id, dict(refreshed))
+
+    def test_follows_refresh_after_commit(self):
+        with mock.patch('forum.signals.background.submit') as submit:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                self.follow(self.user, User.objects.create_user('t'))
+            submit.assert_not_called()
+            for callback in callbacks:
+                callback()
+        submit.assert_called_once()
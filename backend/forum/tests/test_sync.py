@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from forum.models import ChangeLog, Comments, Likes, Post, SavePost, SubforumSubscription
+from forum.services import sync
+from forum.services.archive import ArchiveService
+
+from .base import ForumTestCase
+
+
+class DeltaSyncTests(ForumTestCase):
+    def setUp(self):
+        super().setUp()
+        self.subscribed, self.other = self.subforum('S'), self.subforum('O')
+        SubforumSubscription.objects.create(subforum=self.subscribed, user=self.user)
+        self.watermark = self.c.get('/sync').json()['watermark']
+
+    def since(self, watermark):
+        return self.c.get('/sync', {'since': watermark}).json()
+
+    def test_returns_changes_in_the_viewers_scopes(self):
+        post = Post.objects.create(user=self.staff, subforum=self.subscribed, title='a', body='b')
+        home = Post.objects.create(user=self.staff, title='home', body='b')
+        Post.objects.create(user=self.staff, subforum=self.other, title='hidden', body='b')
+        Likes.objects.create(user=self.staff, post=home)
+        comment = Comments.objects.create(user=self.staff, post=post, body='hi')
+        SavePost.objects.create(user=self.staff, post=post)
+        data = self.since(self.watermark)
+        self.assertFalse(data['resync'])
+        self.assertEqual({row['id'] for row in data['posts']}, {post.id, home.id})
+        self.assertEqual(data['comments'][0]['post_id'], post.id)
+        self.assertEqual(data['saves'], [])
+        watermark = data['watermark']
+        self.assertEqual(self.since(watermark)['posts'], [])
+        Likes.objects.create(user=self.user, post=post)
+        SavePost.objects.create(user=self.user, post=post)
+        comment_id = comment.id
+        comment.delete()
+        data = self.since(watermark)
+        self.assertEqual(data['likes'], [{'post_id': post.id, 'like_amt': 1, 'liked': True}])
+        self.assertEqual(data['saves'], [{'post_id': post.id, 'saved': True}])
+        self.assertEqual(data['deleted']['comments'], [comment_id])
+
+    def test_deletes_and_archiving_leave_tombstones(self):
+        post = Post.objects.create(user=self.staff, subforum=self.subscribed, title='a', body='b')
+        home = Post.objects.create(user=self.staff, title='home', body='b')
+        watermark = self.since(self.watermark)['watermark']
+        home_id = home.id
+        home.delete()
+        data = self.since(watermark)
+        self.assertIn(home_id, data['deleted']['posts'])
+        Post.objects.filter(id=post.id).update(created_at=timezone.now() - timedelta(days=400))
+        ArchiveService(older_than_days=365).run()
+        self.assertEqual(self.since(data['watermark'])['deleted']['posts'], [post.id])
+
+    @override_settings(FORUM_SYNC_MAX_CHANGES=2)
+    def test_large_change_sets_are_paged(self):
+        for i in range(3):
+            Post.objects.create(user=self.staff, title=f'x{i}', body='b')
+        data = self.since(self.watermark)
+        self.assertTrue(data['has_more'])
+        self.assertEqual(len(data['posts']), 2)
+        data = self.since(data['watermark'])
+        self.assertFalse(data['has_more'])
+        self.assertEqual(len(data['posts']), 1)
+
+    def test_stale_or_bad_watermarks(self):
+        self.assertTrue(self.c.get('/sync').json()['resync'])
+        for i in range(2):
+            Post.objects.create(user=self.staff, title=f'x{i}', body='b')
+        ChangeLog.objects.update(created_at=timezone.now() - timedelta(days=10))
+        sync.prune()
+        self.assertTrue(self.since(self.watermark)['resync'])
+        self.assertTrue(self.since(999999)['resync'])
+        self.assertEqual(self.c.get('/sync?since=x').status_code, 400)
+
+    def test_like_and_comment_writes_look_up_the_subforum_once(self):
+        post = Post.objects.create(user=self.user, subforum=self.subscribed, title='t', body='b')
+        for create in (lambda: Likes.objects.create(user=self.user, post=post), lambda: Comments.objects.create(user=self.user, post=post, body='c')):
+            with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+                create().delete()
+            lookups = [query['sql'] for query in queries if query['sql'].startswith('SELECT "forum_post"."subforum_id"')]
+            self.assertEqual(len(lookups), 2)
@@ -0,0 +1,34 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from forum import throttling
+from forum.models import Post
+
+from .base import ForumTestCase
+
+
+@override_settings(FORUM_THROTTLE={
+    'USER_CAPACITY': 10, 'USER_REFILL_PER_SECOND': 0.01, 'IP_CAPACITY': 100, 'IP_REFILL_PER_SECOND': 0.01,
+    'COSTS': {'search': 5, 'like': 1},
+})
+class ThrottleTests(ForumTestCase):
+    def test_bucket_runs_dry(self):
+        post = Post.objects.create(user=self.user, title='a', body='b')
+        for _ in range(10):
+            self.assertEqual(self.c.post(f'/{post.id}/likes').status_code, 200)
+        response = self.c.post(f'/{post.id}/likes')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+        self.assertEqual(throttling.rejection_counts(['like'])['like'], 1)
+        call_command('cache_stats', stdout=StringIO())
+
+    def test_refunds_are_capped_and_a_held_lock_fails_closed(self):
+        backend = throttling.backend()
+        self.assertTrue(throttling.take_tokens('tb:x', 1, 5, 1.0)[0])
+        throttling.take_tokens('tb:x', -3, 5, 1.0)
+        self.assertLessEqual(backend.get('tb:x')[0], 5)
+        backend.add('tb:x:lock', 1, 5)
+        self.assertFalse(throttling.take_tokens('tb:x', 1, 5, 1.0)[0])
+        self.assertTrue(backend.get('tb:x:lock'))
@@ -0,0 +1,28 @@
+from unittest import mock
+
+from django.test import override_settings
+
+from forum import routers
+from forum.models import Likes, Post, SavePost
+from forum.services import writes
+
+from .base import ForumTestCase
+
+
+@override_settings(FORUM_WRITE_QUEUE=True)
+class WriteQueueTests(ForumTestCase):
+    def test_like_toggle_and_save_go_through_the_queue(self):
+        post = Post.objects.create(user=self.user, title='t', body='b')
+        self.assertEqual(self.c.post(f'/{post.id}/likes').json()['Message'], 'Liked post')
+        self.assertEqual(Likes.objects.count(), 1)
+        self.assertEqual(self.c.post(f'/{post.id}/likes').json()['Message'], 'Unliked post')
+        self.assertEqual(Likes.objects.count(), 0)
+        self.c.post(f'/{post.id}/save')
+        self.assertEqual(SavePost.objects.count(), 1)
+
+    @override_settings(FORUM_BACKGROUND_SYNC=False)
+    def test_queued_write_pins_the_request_to_the_primary(self):
+        token = routers.begin_request(False)
+        with mock.patch.object(writes, 'toggle_now', return_value=True):
+            self.assertTrue(writes.toggle(Likes, 1, self.user.id))
+        self.assertTrue(routers.end_request(token))
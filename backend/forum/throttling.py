@@ -0,0 +1,89 @@
+import time
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+LOCK_TIMEOUT = 1
+LOCK_ATTEMPTS = 20
+LOCK_WAIT = 0.005
+
+DEFAULTS = {
+    'USER_CAPACITY': 60,
+    'USER_REFILL_PER_SECOND': 1.0,
+    'IP_CAPACITY': 120,
+    'IP_REFILL_PER_SECOND': 2.0,
+    'COSTS': {},
+}
+
+#Token-bucket throttle with a bucket per user and per client IP
+#Views set throttle_scope; FORUM_THROTTLE['COSTS'] says how many tokens a request in that scope takes
+class TokenBucketThrottle(BaseThrottle):
+    def __init__(self):
+        self.__wait = None
+
+    def allow_request(self, request, view):
+        config = {**DEFAULTS, **getattr(settings, 'FORUM_THROTTLE', {})}
+        scope = getattr(view, 'throttle_scope', None)
+        cost = config['COSTS'].get(scope, 1)
+        buckets = [(f"throttle:ip:{self.get_ident(request)}", config['IP_CAPACITY'], config['IP_REFILL_PER_SECOND'])]
+        if request.user and request.user.is_authenticated:
+            buckets.append((f"throttle:user:{request.user.id}", config['USER_CAPACITY'], config['USER_REFILL_PER_SECOND']))
+
+        taken = []
+        for key, capacity, refill in buckets:
+            allowed, wait = take_tokens(key, cost, capacity, refill)
+            if not allowed:
+                #Give back what the other bucket already spent on this request
+                for taken_key, taken_capacity, taken_refill in taken:
+                    take_tokens(taken_key, -cost, taken_capacity, taken_refill)
+                self.__wait = wait
+                count_rejection(scope)
+                return False
+            taken.append((key, capacity, refill))
+        return True
+
+    def wait(self):
+        return self.__wait
+
+
+def backend():
+    return caches[getattr(settings, 'FORUM_CACHE_ALIAS', 'default')]
+
+
+def take_tokens(key, cost, capacity, refill_per_second):
+    """Returns (allowed, seconds until enough tokens) after refilling the bucket; a negative cost refunds"""
+    cache = backend()
+    lock_key = f"{key}:lock"
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(lock_key, 1, LOCK_TIMEOUT):
+            break
+        time.sleep(LOCK_WAIT)
+    else:
+        #Fail closed: spending without the lock could overdraw the bucket.
+        #A refund that cannot get the lock is dropped, which only errs on the strict side
+        return False, LOCK_TIMEOUT
+    try:
+        now = time.time()
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+        if tokens < cost:
+            return False, (cost - tokens) / refill_per_second
+        #A full bucket expires on its own once it would have refilled anyway
+        cache.set(key, (min(capacity, tokens - cost), now), int(capacity / refill_per_second) + 1)
+        return True, None
+    finally:
+        cache.delete(lock_key)
+
+
+def count_rejection(scope):
+    cache = backend()
+    key = f"throttle:rejected:{scope or 'default'}"
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def rejection_counts(scopes):
+    return {scope: backend().get(f"throttle:rejected:{scope}", 0) for scope in scopes}
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 urlpatterns = [
     #Registration
@@ -14,6 +14,8 @@ urlpatterns = [
     path('posts', views.AllPostsViews.as_view(), name='post'),
     #Search tab (in homepage)
     path('search', views.SearchViews.as_view(), name='search'),
+    #Online users
+    path('online', views.OnlineViews.as_view(), name='online'),
     #Settings
     path('settings', views.SettingsViews.as_view(), name='settings'),
     #Profile
@@ -22,14 +24,22 @@ urlpatterns = [
     path('profile/<int:user_id>', views.ProfileViews.as_view(), name='nonself_profile'),
     #Delete a post
     path('delete/post/<int:post_id>', views.DeletePostViews.as_view(), name='delete_post'),
+    #People to follow (friends of friends, same major/department)
+    path('follow/suggestions', views.FollowSuggestionsViews.as_view(), name='follow_suggestions'),
     #Follow/unfollow a user
     path('follow/<int:user_id>', views.FollowViews.as_view(), name='follow'),
     #Like/unlike a post
     path('<int:post_id>/likes', views.PostLikeView.as_view(), name='like'),
     #Comment or delete comment on a post
     path('<int:post_id>/comments', views.PostCommentView.as_view(), name='comment'),
+    #Saved posts, newest saves first
+    path('saved', views.SavedPostsViews.as_view(), name='saved_posts'),
+    #Changes to posts, comments, likes and saves since a watermark
+    path('sync', views.SyncViews.as_view(), name='sync'),
     #View a single post in detail
     path('posts/<int:post_id>', views.SinglePostViews.as_view(), name='singlePost'),
+    #View an archived post (read-only)
+    path('archive/posts/<int:post_id>', views.ArchivedPostViews.as_view(), name='archived_post'),
     #New user activation
     path('activate/<uidb64>/<token>', views.ActivateAccount.as_view(), name='activate'),
     #Save post
@@ -39,14 +49,25 @@ urlpatterns = [
     path('subforums', views.SubforumViews.as_view(), name='subforums'),
     path('subforums/trending', views.TrendingSubforumsViews.as_view(), name='trending_subforums'),
     path('subforums/tags', views.SubforumTagsViews.as_view(), name='subforum_tags'),
+    path('subforums/recommended', views.SubforumRecommendationsViews.as_view(), name='recommended_subforums'),
     path('subforums/<int:subforum_id>', views.SingleSubforumViews.as_view(), name='single_subforum'),
     path('subforums/<int:subforum_id>/posts', views.SubforumPostsViews.as_view(), name='subforum_posts'),
     path('subforums/<int:subforum_id>/subscribe', views.SubforumSubscriptionViews.as_view(), name='subscribe_subforum'),
     path('subforums/<int:subforum_id>/report', views.SubforumReportViews.as_view(), name='report_subforum'),
     path('subforums/<int:subforum_id>/moderators', views.ModeratorManagementViews.as_view(), name='subforum_moderators'),
+    path('subforums/<int:subforum_id>/archive', views.ArchivedSubforumPostsViews.as_view(), name='subforum_archive'),
     path('subforums/activate/<uidb64>/<token>', views.ActivateSubforum.as_view(), name='activate_subforum'),
 
+    #Async (ASGI) versions of the hot read endpoints
+    path('async/posts', async_views.AsyncAllPostsViews.as_view(), name='async_posts'),
+    path('async/posts/<int:post_id>', async_views.AsyncSinglePostViews.as_view(), name='async_single_post'),
+    path('async/subforums/<int:subforum_id>/posts', async_views.AsyncSubforumPostsViews.as_view(), name='async_subforum_posts'),
+    path('async/search', async_views.AsyncSearchViews.as_view(), name='async_search'),
+
     # Admin URLs
     path('admin/subforums/pending', views.AdminSubforumApprovalViews.as_view(), name='pending_subforums'),
     path('admin/subforums/<int:subforum_id>/approve', views.AdminSubforumApprovalViews.as_view(), name='approve_subforum'),
+    path('admin/subforums/<int:subforum_id>/activity', views.AdminSubforumActivityViews.as_view(), name='subforum_activity'),
+    path('admin/export/<str:dataset>', views.AdminExportViews.as_view(), name='admin_export'),
+    path('admin/moderation/queue', views.AdminModerationQueueViews.as_view(), name='moderation_queue'),
 ]
@@ -14,6 +14,24 @@ from .services.notifications import *
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from .services.directory import SubforumDirectoryService
+from .services.cache import directory_cache, get_subforum_tags
+from .services.permissions import PermissionService, has_perm
+from .services.activity import ActivityService
+from .services.presence import presence
+from .throttling import TokenBucketThrottle
+from .services.export import ExportService
+from .services.archive import ArchiveReader
+from .services.projection import PostProjection, post_rows
+from .services.snapshots import FeedSnapshot, home_feed, subforum_page
+from .services.moderation import ModerationQueueService, STATUSES, MAX_BULK
+from .services import duplicates
+from .services.sync import SyncService
+from .services.suggestions import SuggestionService
+from .services.recommendations import SubforumRecommendationService
+from .services.ranking import RankedFeedService, SORTS
+from .services import conditional
+from django.http import StreamingHttpResponse
 
 ## Application follows SRP from SOLID Design ## 
 # Create your views here.
@@ -22,6 +40,8 @@ from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 #User Registration
 class UserRegistrationViews(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'register'
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
@@ -81,7 +101,7 @@ class DeleteAccountViews(APIView):
         deleteAccount = delete_service.delete_user()
         if not deleteAccount: #If user isnt found
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
-        return Response({'message': 'Account has been deleted.'}, status=status.HTTP_200_OK)
+        return Response({'message': 'Account deletion scheduled', 'job': deleteAccount.id}, status=status.HTTP_202_ACCEPTED)
     
 #Activation for newly registered account
 class ActivateAccount(APIView):
@@ -111,20 +131,34 @@ class AllPostsViews(APIView):
     def post(self, request):
         serializer = PostSerializer(data=request.data, context={"request": request})
         if serializer.is_valid():
+            text = duplicates.post_text(serializer.validated_data.get('title'), serializer.validated_data.get('body'))
+            if duplicates.rejects('post', text, request.user):
+                return Response({"Error": "This post is a near-duplicate of a recent post or comment"}, status=status.HTTP_409_CONFLICT)
             serializer.save(user=request.user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response({"Error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
     
-    #Get all posts that arent posted in a subforum
+    #Get all posts that arent posted in a subforum (?sort=hot|top|new&cursor= for a ranked page)
     def get(self, request):
-        all_posts = Post.objects.filter(subforum__isnull=True)
-        serializer = PostSerializer(all_posts, many=True, context={"request": request})
-        return Response(serializer.data)
+        sort = request.query_params.get('sort')
+        if sort is not None and sort not in SORTS:
+            return Response({"Error": f"sort must be one of: {', '.join(SORTS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        validator = conditional.feed_validator(request)
+        not_modified = validator.not_modified(request)
+        if not_modified:
+            return not_modified
+        if sort:
+            return validator.apply(ranked_page(request, sort))
+        if FeedSnapshot.applies(request):
+            return validator.apply(FeedSnapshot().respond(request))
+        return validator.apply(Response(home_feed(request, request.user)))
 
 #Like a post
 class PostLikeView(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'like'
     #Likes and unlikes
     def post(self, request, post_id):
         like_post = LikeService(request.user, post_id)
@@ -137,11 +171,15 @@ class PostLikeView(APIView):
 class PostCommentView(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'comment'
 
     #Post a comment 
     def post(self, request, post_id):
         serializer = CommentSerializer(data=request.data)
         if serializer.is_valid():
+            if duplicates.rejects('comment', serializer.validated_data.get('body'), request.user):
+                return Response({"Error": "This comment is a near-duplicate of a recent post or comment"}, status=status.HTTP_409_CONFLICT)
             serializer.save(user=request.user, post_id=post_id)
             return Response({"Message": "Commented on post"}, status=status.HTTP_200_OK)
         return Response({"Error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -154,29 +192,61 @@ class PostCommentView(APIView):
             return Response({"Message": "Comment has been deleted"})
         return Response({"Error": "Comment not found/not deleted"})
 
+#Viewer's saved posts, most recently saved first (?cursor= for the next page)
+class SavedPostsViews(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        try:
+            posts, next_cursor = SavedPostsService(request.user, request).page(request.query_params.get('cursor'))
+        except ValueError:
+            return Response({"Error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': posts,
+            'next_cursor': next_cursor,
+        })
+
+#Changes to the viewer's feeds since a watermark (?since=); resync: true means refetch everything
+class SyncViews(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if since is not None and not since.isdigit():
+            return Response({"Error": "since must be a watermark returned by this endpoint"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(SyncService(request.user, request).changes(int(since) if since is not None else None))
+
 #Click onto single post, view comments
 class SinglePostViews(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
 
     def get(self, request, post_id):
+        validator = conditional.post_validator(request, post_id)
+        not_modified = validator.not_modified(request)
+        if not_modified:
+            return not_modified
         post_service = SinglePostService(post_id)
         post = post_service.get_post()
         serializer = SinglePostSerializer(post)
-        return Response(serializer.data)
+        return validator.apply(Response(serializer.data))
     
 
 #Search Bar tied to homepage
 class SearchViews(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'search'
     def post(self, request):
         serializer = SearchSerializer(data=request.data)
         if serializer.is_valid():
-            search = SearchService.get(request.data)
+            search = SearchService(request.data).search()
             people = UserSerializer(search["People"], many=True).data
-            posts = PostSerializer(search["Posts"], many=True).data
-            subforums = SubforumSerializer(search["Subforums"], many=True).data
+            posts = PostSerializer(search["Posts"], many=True, context={"request": request}).data
+            subforums = SubforumSerializer(search["Subforums"], many=True, context={"request": request}).data
             return Response({
                 "People": people,
                 "Posts": posts,
@@ -184,6 +254,21 @@ class SearchViews(APIView):
             })
         return Response({"message": "error"})
 
+#Online user counts for the whole site or one subforum
+class OnlineViews(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        subforum_id = request.query_params.get('subforum')
+        if subforum_id is not None:
+            try:
+                subforum_id = int(subforum_id)
+            except ValueError:
+                return Response({"Error": "subforum must be an id"}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"subforum": subforum_id, "online": presence.online(subforum_id)})
+        return Response({"online": presence.online(), "peak": presence.site_peak()})
+
 #Settings
 class SettingsViews(APIView):
     permission_classes = [IsAuthenticated]
@@ -236,7 +321,7 @@ class ProfileViews(APIView):
             user = request.user
             saved = True
         else:
-            get_object_or_404(User, id=user_id)
+            user = get_object_or_404(User, id=user_id)
 
         get_profile = ProfileService(user, saved)
         profile = get_profile.get_profile()
@@ -247,7 +332,7 @@ class ProfileViews(APIView):
             saved_info = SavedPostSerializer(profile[2], many=True).data
 
         return Response({
-            "Posts": PostSerializer(profile[0], many=True).data, 
+            "Posts": PostProjection(post_rows(profile[0]), None).load().posts(),
             "Comments": PostCommentSerializer(profile[1], many=True).data,
             "Saved": saved_info,
             "Following": FollowingSerializer(profile[3], many=True).data,
@@ -266,6 +351,24 @@ class DeletePostViews(APIView):
             return Response({"Message": "Post Deleted"})
         return Response({"Message": "Post does not exist or cannot be deleted"})
     
+#People the viewer may want to follow, precomputed by compute_follow_suggestions
+class FollowSuggestionsViews(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        return Response([
+            {
+                "id": row['suggested_id'],
+                "username": row['suggested__username'],
+                "first_name": row['suggested__first_name'],
+                "last_name": row['suggested__last_name'],
+                "mutual_count": row['mutual_count'],
+                "same_group": row['same_group'],
+            }
+            for row in SuggestionService(request.user).suggestions()
+        ])
+
 #Follow/unfollow a person
 class FollowViews(APIView):
     permission_classes = [IsAuthenticated]
@@ -286,37 +389,36 @@ class SubforumViews(APIView):
     authentication_classes = [JWTAuthentication]
     
     def get(self, request):
-        """Get all approved subforums with optional filtering"""
-        status_filter = request.query_params.get('status', 'approved')
-        tag_filter = request.query_params.get('tag')
-        search_query = request.query_params.get('search')
-        
-        subforums = Subforum.objects.all()
-        
-        # Filter by status (admin can see all, users only approved)
-        if not request.user.is_staff:
-            subforums = subforums.filter(status='approved')
-        elif status_filter:
-            subforums = subforums.filter(status=status_filter)
-        
-        # Filter by tag
-        if tag_filter:
-            subforums = subforums.filter(tags__id=tag_filter)
-        
-        # Search
-        if search_query:
-            subforums = subforums.filter(
-                Q(name__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
-        
-        # Order by popularity
-        order_by = request.query_params.get('order_by', 'post_count')
-        if order_by in ['post_count', 'subscriber_count', 'created_at']:
-            subforums = subforums.order_by(f'-{order_by}')
-        
-        serializer = SubforumSerializer(subforums, many=True, context={'request': request})
-        return Response(serializer.data)
+        """Get a page of subforums with optional filtering, plus tag facet counts"""
+        directory = SubforumDirectoryService(request.user, request.query_params)
+
+        def load_page():
+            subforums, next_cursor = directory.paginator().paginate(request.query_params.get('cursor'))
+            # Serialized without the viewer so the page can be shared
+            return {
+                'results': SubforumSerializer(subforums, many=True).data,
+                'next_cursor': next_cursor,
+            }
+
+        try:
+            if directory.is_default_listing():
+                page = directory_cache.get_or_set(directory.cache_key(), load_page)
+            else:
+                page = load_page()
+        except ValueError:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [dict(row) for row in page['results']]
+        subscribed, moderated = directory.viewer_flags([row['id'] for row in results])
+        for row in results:
+            row['is_subscribed'] = row['id'] in subscribed
+            row['is_moderator'] = row['id'] in moderated
+
+        return Response({
+            'results': results,
+            'next_cursor': page['next_cursor'],
+            'facets': directory.facets(),
+        })
     
     def post(self, request):
         """Create a new subforum (requires admin approval)"""
@@ -343,31 +445,37 @@ class SingleSubforumViews(APIView):
             subforum = Subforum.objects.get(id=subforum_id)
             
             # Check if user can view (approved or user is moderator/admin)
-            if subforum.status != 'approved' and not (
-                request.user.is_staff or
-                subforum.moderators.filter(user=request.user).exists()
-            ):
+            if subforum.status != 'approved' and not has_perm(request.user, subforum, 'moderate'):
                 return Response(
                     {'error': 'Subforum not found or not approved'},
                     status=status.HTTP_404_NOT_FOUND
                 )
             
+            validator = conditional.subforum_validator(request, subforum.id)
+            not_modified = validator.not_modified(request)
+            if not_modified:
+                return not_modified
+            
             serializer = SubforumSerializer(subforum, context={'request': request})
             
             # Get statistics
-            stats = SubforumService.update_statistics(subforum_id)
+            stats = SubforumService(subforum_id).update_statistics()
             
             response_data = serializer.data
             if stats:
                 response_data['statistics'] = {
                     'posts_today': stats.posts_today,
+                    'comments_today': stats.comments_today,
+                    'new_subscribers_today': stats.new_subscribers_today,
                     'posts_this_week': stats.posts_this_week,
                     'active_users_this_week': stats.active_users_this_week,
                     'total_posts': stats.total_posts,
                     'total_comments': stats.total_comments,
+                    'users_online': presence.online(subforum.id),
+                    'peak_users_online': stats.peak_users_online,
                 }
             
-            return Response(response_data)
+            return validator.apply(Response(response_data))
             
         except Subforum.DoesNotExist:
             return Response(
@@ -380,32 +488,32 @@ class SubforumPostsViews(APIView):
     authentication_classes = [JWTAuthentication]
     
     def get(self, request, subforum_id):
-        """Get all posts in a subforum"""
+        """Get all posts in a subforum (?sort=hot|top|new&cursor= for a ranked page)"""
         try:
             subforum = Subforum.objects.get(id=subforum_id, status='approved')
-            posts = subforum.posts.all().order_by('-created_at')
             
             # Pagination
             page = request.query_params.get('page', 1)
             per_page = request.query_params.get('per_page', 20)
+            sort = request.query_params.get('sort')
+            if sort is not None and sort not in SORTS:
+                return Response({"Error": f"sort must be one of: {', '.join(SORTS)}"}, status=status.HTTP_400_BAD_REQUEST)
             
-            paginator = Paginator(posts, per_page)
-            try:
-                posts_page = paginator.page(page)
-            except PageNotAnInteger:
-                posts_page = paginator.page(1)
-            except EmptyPage:
-                posts_page = paginator.page(paginator.num_pages)
+            validator = conditional.subforum_posts_validator(request, subforum.id)
+            not_modified = validator.not_modified(request)
+            if not_modified:
+                return not_modified
             
-            serializer = PostSerializer(posts_page, many=True, context={'request': request})
+            if sort:
+                return validator.apply(ranked_page(request, sort, subforum.id))
             
-            return Response({
-                'subforum': SubforumSerializer(subforum, context={'request': request}).data,
-                'posts': serializer.data,
-                'page': posts_page.number,
-                'total_pages': paginator.num_pages,
-                'total_posts': paginator.count
-            })
+            # The first few default-sized pages are served from stored snapshots
+            if str(page).isdigit() and str(per_page).isdigit() and FeedSnapshot.applies(request, int(page), int(per_page)):
+                response = FeedSnapshot(subforum.id, int(page)).respond(request)
+                if response is not None:
+                    return validator.apply(response)
+            
+            return validator.apply(Response(subforum_page(subforum.id, page, per_page, request, request.user)))
             
         except Subforum.DoesNotExist:
             return Response(
@@ -429,10 +537,7 @@ class SubforumSubscriptionViews(APIView):
             )
             
             if created:
-                # Update subscriber count
-                subforum.subscriber_count += 1
-                subforum.save()
-                
+                # subscriber_count is bumped atomically by the post_save signal
                 return Response(
                     {'message': 'Subscribed to subforum'},
                     status=status.HTTP_201_CREATED
@@ -455,13 +560,9 @@ class SubforumSubscriptionViews(APIView):
                 user=request.user,
                 subforum_id=subforum_id
             )
+            # subscriber_count is decremented atomically by the post_delete signal
             subscription.delete()
             
-            # Update subscriber count
-            subforum = subscription.subforum
-            subforum.subscriber_count = max(0, subforum.subscriber_count - 1)
-            subforum.save()
-            
             return Response(
                 {'message': 'Unsubscribed from subforum'},
                 status=status.HTTP_200_OK
@@ -527,8 +628,7 @@ class ModeratorManagementViews(APIView):
             subforum = Subforum.objects.get(id=subforum_id)
             
             # Check permissions
-            if not (request.user.is_staff or 
-                   subforum.moderators.filter(user=request.user).exists()):
+            if not has_perm(request.user, subforum, 'moderate'):
                 return Response(
                     {'error': 'Permission denied'},
                     status=status.HTTP_403_FORBIDDEN
@@ -550,12 +650,7 @@ class ModeratorManagementViews(APIView):
             subforum = Subforum.objects.get(id=subforum_id)
             
             # Check if user is creator or admin
-            is_creator = subforum.moderators.filter(
-                user=request.user,
-                role='creator'
-            ).exists()
-            
-            if not (request.user.is_staff or is_creator):
+            if not has_perm(request.user, subforum, 'manage_moderators'):
                 return Response(
                     {'error': 'Only the creator or admin can add moderators'},
                     status=status.HTTP_403_FORBIDDEN
@@ -571,7 +666,7 @@ class ModeratorManagementViews(APIView):
                 )
             
             # Check if already moderator
-            if subforum.moderators.filter(user=user).exists():
+            if PermissionService(user).is_moderator(subforum):
                 return Response(
                     {'error': 'User is already a moderator'},
                     status=status.HTTP_400_BAD_REQUEST
@@ -651,6 +746,75 @@ class AdminSubforumApprovalViews(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+class AdminSubforumActivityViews(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request, subforum_id):
+        """Daily activity series for the admin charts, read from the activity buckets"""
+        try:
+            days = max(1, min(int(request.query_params.get('days', 30)), 365))
+        except ValueError:
+            return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not Subforum.objects.filter(id=subforum_id).exists():
+            return Response(
+                {'error': 'Subforum not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({
+            'subforum_id': subforum_id,
+            'days': ActivityService(subforum_id).chart(days=days),
+        })
+
+class AdminModerationQueueViews(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        """Reported subforums, highest priority first (?status=, ?cursor=)"""
+        queue_status = request.query_params.get('status', 'pending')
+        if queue_status not in STATUSES:
+            return Response({'error': 'Unknown status'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            items, next_cursor = ModerationQueueService(request.user).page(queue_status, request.query_params.get('cursor'))
+        except ValueError:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': ModerationQueueItemSerializer(items, many=True).data,
+            'next_cursor': next_cursor,
+        })
+
+    def post(self, request):
+        """Resolve or dismiss queue items and all their pending reports: {"ids": [...], "action": "resolve"|"dismiss"}"""
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids or len(ids) > MAX_BULK or not all(isinstance(pk, int) for pk in ids):
+            return Response({'error': f'ids must be a list of 1 to {MAX_BULK} item ids'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            closed = ModerationQueueService(request.user).bulk(ids, request.data.get('action'))
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'updated': closed})
+
+class AdminExportViews(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request, dataset):
+        """Stream a table as NDJSON or CSV (?output=, ?start=, ?end=, ?subforum=)"""
+        try:
+            export = ExportService(
+                dataset,
+                fmt=request.query_params.get('output', 'ndjson'),
+                start=request.query_params.get('start'),
+                end=request.query_params.get('end'),
+                subforum_id=request.query_params.get('subforum'),
+            )
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(export.stream(), content_type=export.content_type())
+        response['Content-Disposition'] = f'attachment; filename="{export.filename()}"'
+        return response
+
 class TrendingSubforumsViews(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
@@ -661,12 +825,65 @@ class TrendingSubforumsViews(APIView):
         serializer = SubforumSerializer(trending, many=True, context={'request': request})
         return Response(serializer.data)
 
+class SubforumRecommendationsViews(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request):
+        """Get subforums similar to the ones the user subscribes to"""
+        return Response([
+            {
+                "id": row['neighbor_id'],
+                "name": row['neighbor__name'],
+                "description": row['neighbor__description'],
+                "subscriber_count": row['neighbor__subscriber_count'],
+                "score": round(row['total'], 4),
+            }
+            for row in SubforumRecommendationService(request.user).recommendations()
+        ])
+
 class SubforumTagsViews(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
     
     def get(self, request):
         """Get all subforum tags"""
-        tags = SubforumTag.objects.all()
-        serializer = SubforumTagSerializer(tags, many=True)
-        return Response(serializer.data)
+        return Response(get_subforum_tags())
+
+#Archived posts are read through their own GET-only views; feeds and search only see the hot tables
+class ArchivedPostViews(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request, post_id):
+        post = ArchiveReader.get_post(post_id)
+        if post is None:
+            return Response({'error': 'Archived post not found'}, status=status.HTTP_404_NOT_FOUND)
+        data = ArchivedPostSerializer(post).data
+        data['comments'] = ArchivedCommentSerializer(ArchiveReader.comments(post_id), many=True).data
+        return Response(data)
+
+class ArchivedSubforumPostsViews(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def get(self, request, subforum_id):
+        try:
+            posts, next_cursor = ArchiveReader.subforum_posts(subforum_id, request.query_params.get('cursor'))
+        except ValueError:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': ArchivedPostSerializer(posts, many=True).data,
+            'next_cursor': next_cursor,
+        })
+
+
+def ranked_page(request, sort, subforum_id=None):
+    try:
+        posts, next_cursor = RankedFeedService(request.user, request, subforum_id).page(sort, request.query_params.get('cursor'))
+    except ValueError:
+        return Response({"Error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'results': posts,
+        'next_cursor': next_cursor,
+    })
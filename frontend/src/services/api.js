@@ -405,6 +405,11 @@ export const api = {
       }
     },
 
+    async getRanked(sort = "hot", cursor = null) {
+      const response = await client.get("/posts", cursor ? { sort, cursor } : { sort });
+      return { posts: response?.results || [], nextCursor: response?.next_cursor || null };
+    },
+
     async getById(postId) {
       // if (CONFIG.USE_MOCKS) {
       //   const post = MOCK_DATA.posts.find((p) => p.id === postId);
@@ -562,13 +567,13 @@ export const api = {
       return { user: response };
     },
 
-    async getSavedPosts() {
+    async getSavedPosts(cursor = null) {
       // if (CONFIG.USE_MOCKS) {
       //   const saved = MOCK_DATA.posts.filter((p) => p.saved);
       //   return { posts: saved };
       // }
-      const response = await client.get("/profile");
-      return { posts: response?.Saved || [] };
+      const response = await client.get("/saved", cursor ? { cursor } : {});
+      return { posts: response?.results || [], nextCursor: response?.next_cursor || null };
     },
   },
 
@@ -581,9 +586,13 @@ export const api = {
 
       try {
         const response = await client.get("/subforums", params);
-        return { subforums: response };
+        return {
+          subforums: response?.results || [],
+          nextCursor: response?.next_cursor || null,
+          facets: response?.facets || [],
+        };
       } catch (e) {
-        return { subforums: [] };
+        return { subforums: [], nextCursor: null, facets: [] };
       }
     },
 